@@ -0,0 +1,110 @@
+"""
+Benchmark and parity check for the NumPy indicator engine.
+Run this script directly: it checks services.indicators against the `ta`
+package on random price series, then times both for one symbol and for a
+batch of symbols.
+"""
+
+import sys
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from ta.trend import SMAIndicator, EMAIndicator, MACD
+from ta.momentum import RSIIndicator
+from ta.volatility import BollingerBands
+from ta.volume import VolumeWeightedAveragePrice
+
+# Add src to path to be able to import modules
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.indicators import compute_indicators
+
+SPECS = ['sma:50', 'sma:200', 'ema:20', 'rsi:14', 'macd:12,26,9', 'bollinger:20,2', 'vwap:14']
+
+
+def random_bars(symbols, bars, seed=42):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (symbols, bars)), axis=1))
+    high = close * (1 + rng.uniform(0, 0.02, close.shape))
+    low = close * (1 - rng.uniform(0, 0.02, close.shape))
+    volume = rng.integers(100_000, 10_000_000, close.shape).astype(np.float64)
+    return close, high, low, volume
+
+
+def ta_indicators(close, high, low, volume):
+    """The same indicator set computed the way the routes used to, with ta."""
+    close, high, low, volume = pd.Series(close), pd.Series(high), pd.Series(low), pd.Series(volume)
+    macd = MACD(close)
+    bands = BollingerBands(close)
+    return {
+        'sma_50': SMAIndicator(close, window=50).sma_indicator(),
+        'sma_200': SMAIndicator(close, window=200).sma_indicator(),
+        'ema_20': EMAIndicator(close, window=20).ema_indicator(),
+        'rsi_14': RSIIndicator(close).rsi(),
+        'macd_12_26_9': macd.macd(),
+        'macd_12_26_9_signal': macd.macd_signal(),
+        'macd_12_26_9_hist': macd.macd_diff(),
+        'bollinger_20_2_high': bands.bollinger_hband(),
+        'bollinger_20_2_mid': bands.bollinger_mavg(),
+        'bollinger_20_2_low': bands.bollinger_lband(),
+        'vwap_14': VolumeWeightedAveragePrice(high, low, close, volume).volume_weighted_average_price()
+    }
+
+
+def check_parity(symbols=20, bars=1000, tolerance=1e-9):
+    print("\n===== PARITY WITH ta =====")
+    close, high, low, volume = random_bars(symbols, bars)
+    ours = compute_indicators(close, SPECS, high, low, volume)
+    worst = {}
+    for row in range(symbols):
+        expected = ta_indicators(close[row], high[row], low[row], volume[row])
+        for name, values in expected.items():
+            values = values.to_numpy(dtype=np.float64)
+            mine = ours[name][row]
+            if not np.array_equal(np.isnan(values), np.isnan(mine)):
+                print(f"❌ {name}: warm-up NaNs differ")
+                return False
+            valid = ~np.isnan(values)
+            error = np.max(np.abs(values[valid] - mine[valid]) / np.maximum(np.abs(values[valid]), 1.0), initial=0.0)
+            worst[name] = max(worst.get(name, 0.0), error)
+    ok = True
+    for name, error in worst.items():
+        status = "✅" if error <= tolerance else "❌"
+        ok = ok and error <= tolerance
+        print(f"{status} {name:<22} max relative error {error:.2e}")
+    return ok
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def benchmark(symbols, bars, repeat):
+    close, high, low, volume = random_bars(symbols, bars)
+
+    def with_ta():
+        for row in range(symbols):
+            ta_indicators(close[row], high[row], low[row], volume[row])
+
+    def with_numpy():
+        compute_indicators(close, SPECS, high, low, volume)
+
+    ta_time = timed(with_ta, repeat)
+    numpy_time = timed(with_numpy, repeat)
+    print(f"{symbols:>5} symbols x {bars:>5} bars:  ta {ta_time * 1000:9.2f} ms   "
+          f"numpy {numpy_time * 1000:8.2f} ms   speedup {ta_time / numpy_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    if not check_parity():
+        sys.exit(1)
+    print("\n===== BENCHMARK =====")
+    benchmark(1, 252, repeat=50)
+    benchmark(1, 2520, repeat=20)
+    benchmark(50, 252, repeat=5)
+    benchmark(500, 252, repeat=2)
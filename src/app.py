@@ -3,6 +3,7 @@ from flask_caching import Cache
 from flask_htmlmin import HTMLMIN
 from utils.config import Config, DevelopmentConfig # Assuming DevelopmentConfig is the one you want
 from utils.db import db # Assuming db is initialized elsewhere or via init_db
+from services.price_hub import price_hub
 import re
 import os
 import traceback
@@ -14,11 +15,12 @@ from routes.trading import trading_bp
 from routes.portfolio import portfolio_bp
 from routes.leaderboard import leaderboard_bp
 from routes.market import market_bp
-from routes.api import api_bp
+from routes.api import api_bp, price_stream_url
 from routes.charts import charts_bp # Make sure this is used or remove
 from routes.watchlist import watchlist_bp
 from routes.debug import debug_bp
 from routes.test_routes import test_bp
+from routes.assets import assets_bp, plotly_js_url
 
 from utils.route_debugger import print_routes
 from utils.middleware import RequestDebugger # Assuming this is correctly set up
@@ -68,7 +70,7 @@ def create_app(config_class=DevelopmentConfig):
         (auth_bp, "auth_bp"), (user_bp, "user_bp"), (trading_bp, "trading_bp"),
         (watchlist_bp, "watchlist_bp"), (debug_bp, "debug_bp"), (test_bp, "test_bp"),
         (api_bp, "api_bp"), (charts_bp, "charts_bp"), (portfolio_bp, "portfolio_bp"),
-        (leaderboard_bp, "leaderboard_bp"), (market_bp, "market_bp")
+        (leaderboard_bp, "leaderboard_bp"), (market_bp, "market_bp"), (assets_bp, "assets_bp")
     ]
 
     for bp, name in blueprints_to_register:
@@ -84,6 +86,9 @@ def create_app(config_class=DevelopmentConfig):
     
     print("----- BLUEPRINT REGISTRATION COMPLETE -----\n")
 
+    # Feed streamed prices into this worker's tick store from the start
+    price_hub.start()
+
     return app
 
 app = create_app() # Create the app instance
@@ -111,6 +116,8 @@ def custom_flash_function(message, category='message'):
     original_flash(message, category)
 
 app.jinja_env.globals['flash'] = custom_flash_function
+app.jinja_env.globals['plotly_js_url'] = plotly_js_url
+app.jinja_env.globals['price_stream_url'] = price_stream_url
 
 def hex_to_rgb_filter_func(hex_color):
     hex_color = hex_color.lstrip('#')
@@ -137,6 +144,9 @@ def handle_internal_server_error(e):
 
 @app.after_request
 def add_no_cache_headers_after_request(response):
+    # Responses with their own cache policy (chart specs, fingerprinted assets) keep it
+    if response.cache_control.public or response.cache_control.private:
+        return response
     response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
@@ -145,7 +155,7 @@ def add_no_cache_headers_after_request(response):
 @app.before_request
 def check_authentication():
     """Clear session if trying to access protected routes while not properly authenticated"""
-    public_routes = ['auth.login', 'auth.register', 'static']
+    public_routes = ['auth.login', 'auth.register', 'static', 'assets.plotly_js']
     
     if not request.endpoint or request.endpoint.startswith('auth.'):
         session.clear()  # Always clear session on auth routes
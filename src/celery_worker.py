@@ -1,5 +1,9 @@
-from app import app
-from celery import Celery
+# src/celery_worker.py
+"""
+Celery entry point: `celery -A celery_worker.celery worker` (or `beat`).
 
-celery = Celery(app.name, broker='redis://localhost:6379/0')
-celery.conf.update(app.config)
+The tasks and the beat schedule are registered on services.task.celery_app,
+so this module re-exports that app instead of creating a second one.
+"""
+
+from services.task import celery_app as celery
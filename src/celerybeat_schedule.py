@@ -1,10 +1,22 @@
+import os
 from celery.schedules import crontab
-from services.task import update_stock_cache  # Import task
 
+# Tasks are referenced by name, so this module must not import services.task
 CELERYBEAT_SCHEDULE = {
     "update_stocks_every_minute": {
-        "task": "services.task.update_stock_cache",
+        "task": "services.task.update_stock_prices",
         "schedule": crontab(minute="*"),  # Runs every minute
-        "args": ("AAPL",)  # Example stock symbol
+    },
+    "update_market_overview": {
+        "task": "services.task.update_market_overview",
+        "schedule": float(os.environ.get('MARKET_OVERVIEW_INTERVAL', 60)),
+    },
+    "update_screener_snapshot": {
+        "task": "services.task.update_screener_snapshot",
+        "schedule": float(os.environ.get('SCREENER_INTERVAL', 300)),
+    },
+    "refresh_reference_data_nightly": {
+        "task": "services.task.refresh_reference_data",
+        "schedule": crontab(hour=2, minute=0),  # After the close settles, before pre-market
     }
 }
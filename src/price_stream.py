@@ -0,0 +1,109 @@
+# src/price_stream.py
+"""
+Server-Sent Events service for live prices.
+
+Holds the browsers' /api/stream/prices connections on one asyncio event loop,
+so thousands of open tabs cost a few KB each instead of a web app worker
+thread each, and the gunicorn thread pool stays free for page views and API
+requests. One pubsub listener task feeds the shared PriceHub fan-out
+(services/price_hub.py); every connection keeps only the newest pending
+update per symbol. Run it next to the web app:
+
+    python price_stream.py
+
+and point the web app at it with PRICE_STREAM_URL. It does not share the web
+app's origin or session cookie, so connections authenticate with the signed
+token in the URL the pages are given (services.live_prices.stream_token).
+"""
+
+import asyncio
+import json
+import os
+
+import redis.asyncio as aioredis
+from aiohttp import web
+
+from utils.db import REDIS_URL
+from services.live_prices import last_known_price, read_stream_token
+from services.price_hub import AsyncPriceSubscription, PriceHub
+
+PRICE_STREAM_PORT = int(os.environ.get('PORT', 8080))
+# Pages on the web app's origin open the stream cross-origin
+ALLOWED_ORIGIN = os.environ.get('PRICE_STREAM_ALLOWED_ORIGIN', '*')
+# Idle connections get a comment line this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
+MAX_SSE_SYMBOLS = 50
+
+# This process only relays prices; the web app keeps the tick store
+price_hub = PriceHub(record_ticks=False)
+
+
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def stream_prices(request):
+    """Server-Sent Events stream of live prices for ?symbols=AAPL,MSFT&token=..."""
+    cors = {'Access-Control-Allow-Origin': ALLOWED_ORIGIN}
+    if read_stream_token(request.query.get('token', '')) is None:
+        return web.json_response({'error': 'Not authenticated'}, status=401, headers=cors)
+
+    symbols = [s.strip().upper() for s in request.query.get('symbols', '').split(',') if s.strip()]
+    symbols = list(dict.fromkeys(symbols))[:MAX_SSE_SYMBOLS]
+    if not symbols:
+        return web.json_response({'error': 'No symbols provided'}, status=400, headers=cors)
+
+    response = web.StreamResponse(headers=dict(cors, **{
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    }))
+    await response.prepare(request)
+    subscription = price_hub.add(AsyncPriceSubscription(symbols))
+    try:
+        await response.write(b"retry: 5000\n\n")
+        # Redis reads are blocking; the initial prices come from a worker thread
+        initial = await asyncio.to_thread(lambda: [last_known_price(symbol) for symbol in symbols])
+        for price in initial:
+            if price:
+                await response.write(_sse_event('price', price).encode())
+        while True:
+            pending = await subscription.wait(SSE_HEARTBEAT_SECONDS)
+            if not pending:
+                await response.write(b": heartbeat\n\n")
+                continue
+            for update in pending.values():
+                await response.write(_sse_event('price', update).encode())
+    except ConnectionResetError:
+        # The client went away; the next write after a disconnect fails
+        pass
+    finally:
+        price_hub.unsubscribe(subscription)
+    return response
+
+
+async def health(request):
+    return web.json_response(price_hub.stats())
+
+
+async def _start_listener(app):
+    app['redis'] = aioredis.from_url(REDIS_URL, decode_responses=True)
+    app['listener'] = asyncio.ensure_future(price_hub.listen_async(app['redis']))
+
+
+async def _stop_listener(app):
+    app['listener'].cancel()
+    await app['redis'].aclose()
+
+
+def create_app():
+    app = web.Application()
+    app.router.add_get('/api/stream/prices', stream_prices)
+    app.router.add_get('/healthz', health)
+    app.on_startup.append(_start_listener)
+    app.on_cleanup.append(_stop_listener)
+    return app
+
+
+if __name__ == '__main__':
+    web.run_app(create_app(), port=PRICE_STREAM_PORT)
@@ -1,23 +1,32 @@
 # src/routes/api.py
-from flask import Blueprint, jsonify, session, request
+from flask import Blueprint, jsonify, session, request, Response, url_for
 from utils.db import db
-import requests
-from utils.constants import api_keys
 from google.cloud import firestore
 from datetime import datetime, timedelta
-from services.market_data import fetch_stock_data, fetch_crypto_data
+from services.market_data import fetch_stock_data, fetch_stock_quotes, acquire_api_key
+from services.http_clients import get_session, get_timeout
+from services.live_prices import request_subscription, last_known_price, stream_base_url, stream_token
+from services.price_hub import price_hub
+import json
 
 api_bp = Blueprint('api', __name__)
 
+# Idle SSE connections get a comment line this often so proxies keep them open
+SSE_HEARTBEAT_SECONDS = 15
+MAX_SSE_SYMBOLS = 50
+
 def get_finnhub_quote(symbol):
     """Get real-time quote from Finnhub using only free endpoints"""
     try:
+        api_key = acquire_api_key()
+        if not api_key:
+            return {'success': False, 'error': 'Finnhub quota exhausted'}
         url = f'https://finnhub.io/api/v1/quote'
         params = {
             'symbol': symbol,
-            'token': api_keys[0]  # Use the first API key
+            'token': api_key
         }
-        response = requests.get(url, params=params)
+        response = get_session('finnhub').get(url, params=params, timeout=get_timeout('finnhub'))
         if response.status_code == 200:
             data = response.json()
             if data and 'c' in data:  # 'c' is current price in Finnhub API
@@ -51,6 +60,63 @@ def get_price(symbol):
     
     return jsonify({'success': False, 'error': 'Unable to fetch price'})
 
+def _sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def price_stream_url():
+    """URL pages open their price EventSource on, for templates; None when logged out.
+
+    With PRICE_STREAM_URL set this is the price stream service, which takes a
+    signed token instead of the session cookie; otherwise this app's own
+    stream route.
+    """
+    if 'user_id' not in session:
+        return None
+    base = stream_base_url()
+    if not base:
+        return url_for('api.stream_prices')
+    return f"{base}/api/stream/prices?token={stream_token(session['user_id'])}"
+
+@api_bp.route('/api/stream/prices', methods=['GET'])
+def stream_prices():
+    """Server-Sent Events stream of live prices for ?symbols=AAPL,MSFT
+
+    Each connection holds a worker thread, so this route is for development
+    and single-process setups; deployments stream from price_stream.py.
+    """
+    if 'user_id' not in session:
+        return jsonify({'error': 'Not authenticated'}), 401
+
+    symbols = [s.strip().upper() for s in request.args.get('symbols', '').split(',') if s.strip()]
+    symbols = list(dict.fromkeys(symbols))[:MAX_SSE_SYMBOLS]
+    if not symbols:
+        return jsonify({'error': 'No symbols provided'}), 400
+
+    subscription = price_hub.subscribe(symbols)
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            for symbol in symbols:
+                price = last_known_price(symbol)
+                if price:
+                    yield _sse_event('price', price)
+            while True:
+                pending = subscription.wait(SSE_HEARTBEAT_SECONDS)
+                if not pending:
+                    yield ": heartbeat\n\n"
+                    continue
+                for update in pending.values():
+                    yield _sse_event('price', update)
+        finally:
+            # Runs when the client disconnects and the next write fails
+            price_hub.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
 @api_bp.route('/api/order_summary', methods=['POST'])
 def order_summary():
     """Calculate order summary including fees"""
@@ -119,6 +185,7 @@ def add_to_watchlist():
         watchlist_ref.set({'symbols': [symbol]})
         print(f"Created new watchlist for user {user_id} with symbol: {symbol}")  # Debugging line
 
+    request_subscription(symbol)
     return jsonify({'success': True, 'message': 'Added to watchlist'})
 
 @api_bp.route('/check-session')
@@ -156,19 +223,16 @@ def portfolio_history():
         portfolio_value = current_balance
         
         # Add value of current holdings
-        portfolio_items = db.collection('portfolios')\
+        portfolio_items = [item.to_dict() for item in db.collection('portfolios')\
             .where('user_id', '==', user_id)\
-            .stream()
-            
-        for item in portfolio_items:
-            item_data = item.to_dict()
-            symbol = item_data['symbol']
-            shares = item_data['shares']
-            
-            # Fetch price using unified method
-            price_data = fetch_stock_data(symbol)
+            .stream()]
+
+        # Fetch every holding's price in one concurrent batch
+        quotes = fetch_stock_quotes([item['symbol'] for item in portfolio_items])
+        for item_data in portfolio_items:
+            price_data = quotes.get(item_data['symbol'])
             if price_data and 'close' in price_data:
-                portfolio_value += price_data['close'] * shares
+                portfolio_value += price_data['close'] * item_data['shares']
 
         # Fill in historical points
         while current_date <= end_date:
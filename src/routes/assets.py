@@ -0,0 +1,75 @@
+# src/routes/assets.py
+"""
+Fingerprinted static assets.
+
+plotly.js is served from the bundle shipped with the plotly package, under a
+URL that contains a hash of its contents. Browsers cache it for a year and a
+plotly upgrade changes the URL, so pages load the library once instead of
+inlining it into every chart.
+"""
+
+import gzip
+import hashlib
+import os
+import threading
+
+from flask import Blueprint, Response, redirect, request, url_for
+
+assets_bp = Blueprint('assets', __name__)
+
+ASSET_MAX_AGE = 365 * 24 * 3600
+# Used when the plotly package (and so its bundle) is not installed
+PLOTLY_CDN_URL = os.environ.get('PLOTLY_CDN_URL', 'https://cdn.plot.ly/plotly-2.35.2.min.js')
+
+_plotly = {}
+_plotly_lock = threading.Lock()
+
+
+def _plotly_bundle():
+    """{'body', 'gzip', 'fingerprint'} for the bundled plotly.js, or None."""
+    with _plotly_lock:
+        if not _plotly:
+            try:
+                from plotly.offline import get_plotlyjs
+                body = get_plotlyjs().encode('utf-8')
+            except Exception as e:
+                print(f"[ASSETS] ⚠️ plotly.js bundle unavailable, using CDN: {str(e)}")
+                _plotly['bundle'] = None
+                return None
+            _plotly['bundle'] = {
+                'body': body,
+                'gzip': gzip.compress(body, 9),
+                'fingerprint': hashlib.sha256(body).hexdigest()[:12]
+            }
+            print(f"[ASSETS] ✅ plotly.js bundle ready ({len(body) // 1024} KB, "
+                  f"{len(_plotly['bundle']['gzip']) // 1024} KB gzipped)")
+        return _plotly['bundle']
+
+
+def plotly_js_url():
+    """URL of the fingerprinted plotly.js bundle, for templates."""
+    bundle = _plotly_bundle()
+    if bundle is None:
+        return PLOTLY_CDN_URL
+    return url_for('assets.plotly_js', fingerprint=bundle['fingerprint'])
+
+
+@assets_bp.route('/assets/plotly.<fingerprint>.min.js')
+def plotly_js(fingerprint):
+    bundle = _plotly_bundle()
+    if bundle is None:
+        return redirect(PLOTLY_CDN_URL)
+    if fingerprint != bundle['fingerprint']:
+        # Pages rendered before a plotly upgrade still get a working bundle
+        return redirect(url_for('assets.plotly_js', fingerprint=bundle['fingerprint']))
+
+    if 'gzip' in request.accept_encodings:
+        response = Response(bundle['gzip'], mimetype='application/javascript')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = Response(bundle['body'], mimetype='application/javascript')
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
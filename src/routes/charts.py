@@ -1,79 +1,102 @@
 # src/routes/charts.py
-from flask import Blueprint, render_template, session, redirect, url_for, request, jsonify
-import plotly.express as px
-import plotly.graph_objects as go
-from services.market_data import fetch_historical_data, fetch_stock_data
+from flask import Blueprint, Response, render_template, session, redirect, url_for, request, jsonify
+from services.market_overview import get_market_overview
+from services.http_clients import get_session, get_timeout
+from services.market_calendar import is_market_open
+from services.tick_store import tick_store, TS, PRICE, VOLUME
+from services.reference_data import get_reference
+from services.industry_index import related_symbols
 from utils.db import db
-from utils.constants import POPULAR_STOCKS, MARKET_INDICES
-from datetime import datetime, timedelta
-import pandas as pd
-import numpy as np
-from ta.trend import SMAIndicator, EMAIndicator, MACD
-from ta.momentum import RSIIndicator, StochasticOscillator
-from ta.volatility import BollingerBands, AverageTrueRange
-from ta.volume import VolumeWeightedAveragePrice
+from datetime import datetime
+from services.indicators import to_list
+from services.indicator_cache import bar_indicators
+from services.resample import get_bars, serialize_bars
+from services.chart_specs import get_chart_spec, DEFAULT_RANGE, DEFAULT_OVERLAYS
+from services.screener import get_screener_snapshot, screen
 import logging
 import yfinance as yf
-import random
+import asyncio
 
 charts_bp = Blueprint('charts', __name__)
 
 @charts_bp.route('/plot/<symbol>', methods=['GET'])
 def plot(symbol):
-    df = fetch_historical_data(symbol)
-    if df is not None:
-        fig = px.line(df, x=df.index, y='close', 
-                     title=f'Recent Price Changes for {symbol}')
-        fig.update_layout(
-            xaxis_title='Date',
-            yaxis_title='Close Price',
-            template='plotly_dark',
-            plot_bgcolor='rgba(0, 0, 0, 0)',
-            paper_bgcolor='rgba(0, 0, 0, 0)',
-            font=dict(color='white'),
-            xaxis=dict(gridcolor='gray'),
-            yaxis=dict(gridcolor='gray')
+    symbol = symbol.upper()
+    # Build the spec now so the page's chart request is served from the cache
+    try:
+        spec = get_chart_spec(symbol, 'line')
+    except Exception as e:
+        logging.error(f"Error building chart for {symbol}: {str(e)}")
+        spec = None
+    if spec is not None:
+        return render_template('plot.html.jinja2',
+                             chart_url=url_for('charts.chart_spec', symbol=symbol, chart='line', range=DEFAULT_RANGE),
+                             symbol=symbol)
+    return "Failed to fetch stock data."
+
+@charts_bp.route('/api/chart/<symbol>', methods=['GET'])
+def chart_spec(symbol):
+    """Plotly figure spec for one chart, as JSON with an ETag.
+
+    ?chart=price|line|rsi|macd, ?range=1D/5D/1M/3M/6M/YTD/1Y/5Y/MAX and, for
+    price charts, ?overlays=sma,ema,bollinger,volume. ?width is the chart's
+    width in pixels; longer series are downsampled to fit it. A request whose
+    If-None-Match holds the current ETag gets an empty 304.
+    """
+    try:
+        result = get_chart_spec(
+            symbol, request.args.get('chart', 'price'), request.args.get('range', DEFAULT_RANGE),
+            request.args.get('overlays'), width=request.args.get('width', type=int),
+            if_none_match=request.if_none_match
         )
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error building chart for {symbol}: {str(e)}")
+        result = None
+    if result is None:
+        return jsonify({'error': f'No chart data for {symbol.upper()}'}), 404
 
-        graph_html = fig.to_html(full_html=False)
+    etag, body = result
+    response = Response(body, mimetype='application/json') if body is not None else Response(status=304)
+    response.set_etag(etag)
+    # Browsers keep the spec and revalidate it with the ETag on every use
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
 
-        # Store the plot data
-        plot_ref = db.collection('plots').document(symbol)
-        if not plot_ref.get().exists:
-            plot_ref.set({
-                'symbol': symbol,
-                'graph_html': graph_html,
-                'timestamp': datetime.utcnow()
-            })
+def _chart_urls(symbol):
+    """Spec URLs for the lookup page's price, RSI and MACD charts."""
+    return {
+        'main': url_for('charts.chart_spec', symbol=symbol, chart='price', range=DEFAULT_RANGE,
+                        overlays=','.join(DEFAULT_OVERLAYS)),
+        'rsi': url_for('charts.chart_spec', symbol=symbol, chart='rsi', range=DEFAULT_RANGE),
+        'macd': url_for('charts.chart_spec', symbol=symbol, chart='macd', range=DEFAULT_RANGE)
+    }
 
-        return render_template('plot.html.jinja2', 
-                             graph_html=graph_html, 
-                             symbol=symbol)
-    return "Failed to fetch stock data."
+def _fetch_ticker_snapshot(symbol):
+    """(ticker, reference record, 2-day history) for the looked-up symbol."""
+    ticker = yf.Ticker(symbol, session=get_session('yfinance'))
+    # Company details come from the daily reference cache instead of ticker.info
+    reference = get_reference(symbol) or {}
+    hist = ticker.history(period='2d', timeout=get_timeout('yfinance')[1])
+    return ticker, reference, hist
 
 @charts_bp.route('/lookup', methods=['GET', 'POST'])
-def lookup():
+async def lookup():
     if 'user_id' not in session:
         return redirect(url_for('auth.login'))
     
     user_id = session['user_id']
     user = db.collection('users').document(user_id).get().to_dict()
-    graph_html = None
+    chart_urls = None
     error_message = None
     stock_data = None
-    rsi_html = None
-    macd_html = None
-    volume_html = None
     company_news = None
     related_stocks = None
     
-    # Check if market is open (simple approximation)
-    now = datetime.now()
-    market_is_open = (
-        now.weekday() < 5 and  # Monday-Friday
-        9 <= now.hour < 16 and  # 9am-4pm
-        not (now.hour == 9 and now.minute < 30)  # After 9:30am
-    )
+    # Check if the US market is in its regular session (holidays and early closes included)
+    market_is_open = is_market_open()
     
     symbol = request.form.get('symbol', request.args.get('symbol', '')).upper().strip()
     
@@ -82,131 +105,34 @@ def lookup():
     market_cap_filter = request.args.get('market_cap', '')
     exchange_filter = request.args.get('exchange', '')
     
-    # Get market overview data directly from APIs
-    market_overview = {}
-    try:
-        for index, name in MARKET_INDICES.items():
-            try:
-                # Use our fetch_stock_data which tries multiple sources
-                data = fetch_stock_data(index)
-                if 'error' not in data:
-                    market_overview[index] = {
-                        'name': name,
-                        'close': data['close'],
-                        'prev_close': data['prev_close'],
-                        'change': ((data['close'] - data['prev_close']) / data['prev_close'] * 100) if data['prev_close'] > 0 else 0
-                    }
-            except Exception as e:
-                logging.error(f"Error fetching market data for {index}: {str(e)}")
-                # Skip this index if we can't get data - no mock data
-                continue
-    except Exception as e:
-        logging.error(f"Error fetching market overview: {str(e)}")
-    
-    # Get real market data for gainers, losers, and volume leaders
-    gainers = []
-    losers = []
-    volume_leaders = []
-    
-    try:
-        # Use more reliable data source for popular stocks
-        sample_tickers = POPULAR_STOCKS[:20]  # Take a subset to avoid rate limits
-        
-        for stock in sample_tickers:
-            ticker = stock["symbol"]
-            try:
-                # Use fetch_stock_data which tries multiple sources
-                price_data = fetch_stock_data(ticker)
-                if 'error' not in price_data:
-                    current_price = price_data['close']
-                    prev_price = price_data['prev_close']
-                    change_pct = ((current_price - prev_price) / prev_price * 100) if prev_price > 0 else 0
-                    
-                    # Fetch recent volume from yfinance (can't avoid this API call)
-                    try:
-                        ticker_data = yf.Ticker(ticker)
-                        hist = ticker_data.history(period='1d')
-                        volume = int(hist['Volume'].iloc[-1]) if not hist.empty else 0
-                    except Exception:
-                        volume = 0
-                    
-                    stock_info = {
-                        'symbol': ticker,
-                        'name': stock["name"],
-                        'price': current_price,
-                        'change_pct': change_pct,
-                        'volume': volume
-                    }
-                    
-                    # Add to appropriate list
-                    if change_pct > 0:
-                        gainers.append(stock_info)
-                    else:
-                        losers.append(stock_info)
-                    
-                    # Add to volume leaders
-                    volume_leaders.append(stock_info)
-            except Exception as e:
-                logging.error(f"Error processing {ticker}: {str(e)}")
-                continue
-        
-        # Sort and limit
-        if gainers:
-            gainers = sorted(gainers, key=lambda x: x['change_pct'], reverse=True)[:5]
-        if losers:
-            losers = sorted(losers, key=lambda x: x['change_pct'])[:5]
-        if volume_leaders:
-            volume_leaders = sorted(volume_leaders, key=lambda x: x['volume'], reverse=True)[:5]
-    except Exception as e:
-        logging.error(f"Error getting market movers: {str(e)}")
-    
-    # Get sector performance
-    sector_performance = {}
-    sector_etfs = {
-        'Technology': 'XLK',
-        'Healthcare': 'XLV',
-        'Financial': 'XLF',
-        'Consumer Discretionary': 'XLY',
-        'Consumer Staples': 'XLP',
-        'Energy': 'XLE',
-        'Utilities': 'XLU',
-        'Materials': 'XLB',
-        'Industrial': 'XLI',
-        'Real Estate': 'XLRE',
-        'Communication': 'XLC'
-    }
-    
-    for sector, etf in sector_etfs.items():
-        try:
-            ticker = yf.Ticker(etf)
-            hist = ticker.history(period='2d')
-            
-            if len(hist) >= 2:
-                today = hist.iloc[-1]
-                yesterday = hist.iloc[-2]
-                change_pct = ((float(today['Close']) - float(yesterday['Close'])) / float(yesterday['Close'])) * 100
-                
-                sector_performance[sector] = {
-                    'symbol': etf,
-                    'price': float(today['Close']),
-                    'change_pct': change_pct
-                }
-        except Exception as e:
-            continue
-    
-    # Sort sectors by performance
-    sector_performance = dict(sorted(
-        sector_performance.items(), 
-        key=lambda item: item[1]['change_pct'], 
-        reverse=True
-    ))
+    # Indices, movers and sectors are the same for everyone; read the shared snapshot
+    # while the looked-up symbol's data is fetched and its price chart spec is cached
+    # for the page's chart request
+    results = await asyncio.gather(
+        asyncio.to_thread(get_market_overview),
+        asyncio.to_thread(_fetch_ticker_snapshot, symbol) if symbol else asyncio.sleep(0),
+        asyncio.to_thread(get_chart_spec, symbol, 'price') if symbol else asyncio.sleep(0),
+        return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, Exception):
+            logging.error(f"Error fetching lookup data: {str(result)}")
+    overview, ticker_snapshot, price_chart = [
+        None if isinstance(result, Exception) else result for result in results
+    ]
+
+    overview = overview or {}
+    market_overview = overview.get('market_overview', {})
+    gainers = overview.get('gainers', [])
+    losers = overview.get('losers', [])
+    volume_leaders = overview.get('volume_leaders', [])
+    sector_performance = overview.get('sector_performance', {})
     
     if symbol:
         try:
-            # Use yfinance for current stock data
-            ticker = yf.Ticker(symbol)
-            info = ticker.info
-            hist = ticker.history(period='2d')
+            if ticker_snapshot is None:
+                raise ValueError(f"Unable to load ticker data for {symbol}")
+            ticker, info, hist = ticker_snapshot
             
             if not hist.empty:
                 today = hist.iloc[-1]
@@ -217,20 +143,20 @@ def lookup():
                     'high': float(today['High']),
                     'low': float(today['Low']),
                     'volume': int(today['Volume']),
-                    'market_cap': info.get('marketCap'),
+                    'market_cap': info.get('market_cap'),
                     'sector': info.get('sector'),
                     'industry': info.get('industry'),
-                    'long_business_summary': info.get('longBusinessSummary'),
-                    'year_high': info.get('fiftyTwoWeekHigh'),
-                    'year_low': info.get('fiftyTwoWeekLow'),
-                    'forward_pe': info.get('forwardPE'),
-                    'dividend_yield': info.get('dividendYield'),
-                    'ex_dividend_date': info.get('exDividendDate'),
+                    'long_business_summary': info.get('long_business_summary'),
+                    'year_high': info.get('year_high'),
+                    'year_low': info.get('year_low'),
+                    'forward_pe': info.get('forward_pe'),
+                    'dividend_yield': info.get('dividend_yield'),
+                    'ex_dividend_date': info.get('ex_dividend_date'),
                     'beta': info.get('beta'),
-                    'eps': info.get('trailingEPS'),
-                    'target_price': info.get('targetMeanPrice'),
-                    'recommendation': info.get('recommendationKey', 'N/A').upper(),
-                    'company_name': info.get('shortName', symbol)
+                    'eps': info.get('eps'),
+                    'target_price': info.get('target_price'),
+                    'recommendation': info.get('recommendation') or 'N/A',
+                    'company_name': info.get('company_name') or symbol
                 }
                 
                 # Calculate recommendation color
@@ -256,198 +182,16 @@ def lookup():
                 except Exception as e:
                     logging.error(f"Error fetching news: {str(e)}")
                 
-                # Get related stocks in the same industry
+                # Get related stocks in the same industry from the precomputed index
                 try:
-                    industry = stock_data.get('industry')
-                    if industry:
-                        related = []
-                        for stock in POPULAR_STOCKS:
-                            try:
-                                if stock["symbol"] != symbol:
-                                    related_ticker = yf.Ticker(stock["symbol"])
-                                    related_info = related_ticker.info
-                                    if related_info.get('industry') == industry:
-                                        related.append({
-                                            'symbol': stock["symbol"],
-                                            'name': stock["name"]
-                                        })
-                                        if len(related) >= 5:  # Limit to 5 related stocks
-                                            break
-                            except Exception:
-                                continue
-                        related_stocks = related
+                    if stock_data.get('industry') or stock_data.get('sector'):
+                        related_stocks = related_symbols(symbol, limit=5)
                 except Exception as e:
                     logging.error(f"Error fetching related stocks: {str(e)}")
                 
-                # Fetch historical data for the graph
-                df = fetch_historical_data(symbol)
-                if df is not None and len(df) > 0:
-                    try:
-                        # Calculate technical indicators
-                        # Price chart with volume
-                        fig = go.Figure()
-                        
-                        # Add candlestick chart
-                        fig.add_trace(go.Candlestick(
-                            x=df.index,
-                            open=df['open'], 
-                            high=df['high'],
-                            low=df['low'], 
-                            close=df['close'],
-                            name='Price'
-                        ))
-                        
-                        # Add volume bars as a secondary y-axis
-                        fig.add_trace(go.Bar(
-                            x=df.index,
-                            y=df['volume'],
-                            name='Volume',
-                            marker={
-                                'color': 'rgba(100, 100, 100, 0.3)',
-                            },
-                            yaxis='y2'
-                        ))
-                        
-                        # Calculate moving averages
-                        sma50 = SMAIndicator(df['close'], window=50).sma_indicator()
-                        sma200 = SMAIndicator(df['close'], window=200).sma_indicator()
-                        
-                        # Add moving averages
-                        fig.add_trace(go.Scatter(
-                            x=df.index, 
-                            y=sma50, 
-                            name='SMA 50', 
-                            line=dict(color='blue', width=1)
-                        ))
-                        
-                        fig.add_trace(go.Scatter(
-                            x=df.index, 
-                            y=sma200, 
-                            name='SMA 200', 
-                            line=dict(color='red', width=1)
-                        ))
-                            
-                        # Setup the layout with two y-axes
-                        fig.update_layout(
-                            title=f'{symbol} - {stock_data["company_name"]} Price History',
-                            yaxis_title='Price',
-                            xaxis_title='Date',
-                            template='plotly_dark',
-                            height=600,
-                            xaxis_rangeslider_visible=False,
-                            plot_bgcolor='rgba(0, 0, 0, 0)',
-                            paper_bgcolor='rgba(0, 0, 0, 0)',
-                            font=dict(color='rgba(255, 255, 255, 0.8)'),
-                            legend=dict(
-                                orientation="h",
-                                yanchor="bottom",
-                                y=1.02,
-                                xanchor="right",
-                                x=1
-                            ),
-                            yaxis2=dict(
-                                title='Volume',
-                                titlefont=dict(color='rgba(100, 100, 100, 0.8)'),
-                                tickfont=dict(color='rgba(100, 100, 100, 0.8)'),
-                                overlaying='y',
-                                side='right',
-                                showgrid=False
-                            ),
-                            margin=dict(l=50, r=50, t=80, b=50)
-                        )
-                        
-                        graph_html = fig.to_html(full_html=False, include_plotlyjs='cdn')
-                        
-                        # RSI Chart
-                        rsi = RSIIndicator(df['close']).rsi()
-                        
-                        rsi_fig = go.Figure()
-                        rsi_fig.add_trace(go.Scatter(
-                            x=df.index, 
-                            y=rsi, 
-                            mode='lines', 
-                            name='RSI',
-                            line=dict(color='purple', width=1.5)
-                        ))
-                        
-                        # Add horizontal lines for overbought and oversold levels
-                        rsi_fig.add_shape(
-                            type="line", line_color="red", line_dash="dash",
-                            x0=df.index[0], x1=df.index[-1], y0=70, y1=70
-                        )
-                        rsi_fig.add_shape(
-                            type="line", line_color="green", line_dash="dash",
-                            x0=df.index[0], x1=df.index[-1], y0=30, y1=30
-                        )
-                        
-                        rsi_fig.update_layout(
-                            title='Relative Strength Index (RSI)',
-                            height=250,
-                            template='plotly_dark',
-                            plot_bgcolor='rgba(0, 0, 0, 0)',
-                            paper_bgcolor='rgba(0, 0, 0, 0)',
-                            yaxis=dict(range=[0, 100]),
-                            margin=dict(l=50, r=20, t=50, b=20)
-                        )
-                        
-                        rsi_html = rsi_fig.to_html(full_html=False, include_plotlyjs=False)
-                        
-                        # MACD Chart
-                        macd = MACD(df['close'])
-                        
-                        macd_fig = go.Figure()
-                        
-                        # MACD line
-                        macd_fig.add_trace(go.Scatter(
-                            x=df.index, 
-                            y=macd.macd(), 
-                            mode='lines',
-                            name='MACD',
-                            line=dict(color='blue', width=1.5)
-                        ))
-                        
-                        # Signal line
-                        macd_fig.add_trace(go.Scatter(
-                            x=df.index, 
-                            y=macd.macd_signal(), 
-                            mode='lines',
-                            name='Signal',
-                            line=dict(color='red', width=1.5)
-                        ))
-                        
-                        # MACD Histogram
-                        macd_hist = macd.macd() - macd.macd_signal()
-                        colors = ['green' if val >= 0 else 'red' for val in macd_hist]
-                        
-                        macd_fig.add_trace(go.Bar(
-                            x=df.index, 
-                            y=macd_hist,
-                            name='Histogram',
-                            marker_color=colors
-                        ))
-                        
-                        macd_fig.update_layout(
-                            title='Moving Average Convergence Divergence (MACD)',
-                            height=250,
-                            template='plotly_dark',
-                            plot_bgcolor='rgba(0, 0, 0, 0)',
-                            paper_bgcolor='rgba(0, 0, 0, 0)',
-                            margin=dict(l=50, r=20, t=50, b=20)
-                        )
-                        
-                        macd_html = macd_fig.to_html(full_html=False, include_plotlyjs=False)
-                        
-                        # Volume Analysis Chart
-                        vwap = VolumeWeightedAveragePrice(
-                            high=df['high'], 
-                            low=df['low'], 
-                            close=df['close'], 
-                            volume=df['volume']
-                        )
-                        
-                    except Exception as e:
-                        logging.error(f"Error calculating indicators: {str(e)}")
-                        error_message = "Error calculating technical indicators"
+                # Charts are drawn in the browser from cached JSON specs
+                if price_chart is not None:
+                    chart_urls = _chart_urls(symbol)
                 else:
                     error_message = "Unable to fetch historical data for this symbol"
             else:
@@ -463,12 +207,7 @@ def lookup():
             'success': error_message is None,
             'error': error_message,
             'stock_data': stock_data,
-            'graphs': {
-                'main': graph_html,
-                'rsi': rsi_html,
-                'macd': macd_html,
-                'volume': volume_html
-            },
+            'graphs': chart_urls,
             'news': company_news,
             'related_stocks': related_stocks,
             'market_overview': market_overview,
@@ -481,10 +220,7 @@ def lookup():
     
     return render_template('lookup.html.jinja2', 
                          user=user,
-                         graph_html=graph_html,
-                         rsi_html=rsi_html,
-                         macd_html=macd_html,
-                         volume_html=volume_html,
+                         chart_urls=chart_urls,
                          error_message=error_message,
                          symbol=symbol,
                          stock_data=stock_data,
@@ -498,6 +234,26 @@ def lookup():
                          market_is_open=market_is_open,
                          page_title=f"{symbol} Stock Analysis" if symbol else "Market Lookup")
 
+@charts_bp.route('/api/intraday/<symbol>', methods=['GET'])
+def intraday(symbol):
+    """Today's ticks for an intraday chart, as parallel ts/price/volume arrays.
+
+    ?minutes=N limits the response to the last N minutes.
+    """
+    symbol = symbol.upper()
+    minutes = request.args.get('minutes', type=float)
+    if minutes:
+        ticks = tick_store.window(symbol, seconds=minutes * 60)
+    else:
+        ticks = tick_store.session_ticks(symbol)
+    return jsonify({
+        'symbol': symbol,
+        'ts': ticks[:, TS].tolist(),
+        'price': ticks[:, PRICE].tolist(),
+        'volume': ticks[:, VOLUME].tolist(),
+        'session': tick_store.session_stats(symbol)
+    })
+
 @charts_bp.route('/market-analysis')
 def market_analysis():
     """Redirect to lookup which now serves as the unified market analysis page"""
@@ -505,49 +261,73 @@ def market_analysis():
 
 @charts_bp.route('/api/technical-analysis', methods=['POST'])
 def get_technical_analysis():
-    data = request.json
-    symbol = data.get('symbol')
-    timeframe = data.get('timeframe', 'D')  # D=daily, W=weekly, M=monthly
+    data = request.json or {}
+    symbol = (data.get('symbol') or '').upper().strip()
+    timeframe = data.get('timeframe', 'D')  # D/W/M, or an intraday bar size such as 5m or 1h
+    period = data.get('period')  # Defaults to 1y daily, 5y weekly, 10y monthly, 1d intraday
     indicators = data.get('indicators', [])
+    if not symbol:
+        return jsonify({'error': 'Symbol is required'}), 400
     
-    # Fetch historical data
-    historical_data = fetch_historical_data(symbol)
-    if historical_data is None:
+    # Bars at the requested timeframe, with earlier bars kept as indicator lookback
+    try:
+        bars, start = get_bars(symbol, timeframe, period)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        logging.error(f"Error fetching bars for {symbol}: {str(e)}")
+        bars, start = None, 0
+    if bars is None or len(bars) <= start:
         return jsonify({'error': 'Failed to fetch data'})
     
-    df = pd.DataFrame(historical_data)
-    results = {'price_data': historical_data}
+    results = {
+        'symbol': symbol,
+        'timeframe': timeframe,
+        'price_data': serialize_bars(bars[start:])
+    }
+    
+    # Calculate requested indicators in one pass, reusing cached series
+    specs = {
+        'sma': ['sma:20'],
+        'ema': ['ema:20'],
+        'rsi': ['rsi:14'],
+        'macd': ['macd:12,26,9'],
+        'bollinger': ['bollinger:20,2']
+    }
+    values = bar_indicators(symbol, timeframe, bars, start, [spec for name in indicators if name in specs for spec in specs[name]])
     
-    # Calculate requested indicators
     if 'sma' in indicators:
-        sma = SMAIndicator(df['close'], window=20)
-        results['sma'] = sma.sma_indicator().tolist()
+        results['sma'] = to_list(values['sma_20'])
     
     if 'ema' in indicators:
-        ema = EMAIndicator(df['close'], window=20)
-        results['ema'] = ema.ema_indicator().tolist()
+        results['ema'] = to_list(values['ema_20'])
     
     if 'rsi' in indicators:
-        rsi = RSIIndicator(df['close'])
-        results['rsi'] = rsi.rsi().tolist()
+        results['rsi'] = to_list(values['rsi_14'])
     
     if 'macd' in indicators:
-        macd = MACD(df['close'])
-        results['macd_line'] = macd.macd().tolist()
-        results['signal_line'] = macd.macd_signal().tolist()
+        results['macd_line'] = to_list(values['macd_12_26_9'])
+        results['signal_line'] = to_list(values['macd_12_26_9_signal'])
     
     if 'bollinger' in indicators:
-        bollinger = BollingerBands(df['close'])
-        results['bollinger_high'] = bollinger.bollinger_hband().tolist()
-        results['bollinger_mid'] = bollinger.bollinger_mavg().tolist()
-        results['bollinger_low'] = bollinger.bollinger_lband().tolist()
+        results['bollinger_high'] = to_list(values['bollinger_20_2_high'])
+        results['bollinger_mid'] = to_list(values['bollinger_20_2_mid'])
+        results['bollinger_low'] = to_list(values['bollinger_20_2_low'])
 
     return jsonify(results)
 
 @charts_bp.route('/api/stock-screener', methods=['POST'])
 def screen_stocks():
-    criteria = request.json
-    results = []
-    
-    # Get list of stocks to screen (e.g., S&P 500 components)
-    stocks = POPULAR_STOCKS  # From your constants.py
+    """Screen the S&P 500 snapshot with the criteria in the request JSON.
+
+    See services.screener.screen for the criteria; results come from the
+    background snapshot, never from upstream calls per request.
+    """
+    criteria = request.get_json(silent=True) or {}
+    snapshot = get_screener_snapshot()
+    if snapshot is None:
+        return jsonify({'error': 'Screener data is not available yet'}), 503
+    try:
+        return jsonify(screen(snapshot, criteria))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
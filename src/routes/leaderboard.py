@@ -1,14 +1,21 @@
 # src/routes/leaderboard.py
 from flask import Blueprint, render_template, session, redirect, url_for
 from utils.db import db
-from services.market_data import calculate_total_portfolio_value
+from services.market_data import calculate_total_portfolio_value, fetch_stock_quotes
+from services.async_market_data import gather_in_threads
 from datetime import datetime
+import asyncio
 import traceback
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
 
+def _held_symbol_quotes():
+    """{symbol: quote} for every symbol any user holds."""
+    held_symbols = {doc.to_dict().get('symbol') for doc in db.collection('portfolios').stream()}
+    return fetch_stock_quotes(held_symbols)
+
 @leaderboard_bp.route('/leaderboard')
-def leaderboard():
+async def leaderboard():
     """Display the leaderboard of users ranked by portfolio value."""
     print("\n" + "="*50)
     print("[LEADERBOARD] Route accessed!")
@@ -34,18 +41,30 @@ def leaderboard():
         # Get all users from database
         print("[LEADERBOARD] Fetching all users from database...")
         users = []
-        user_docs = db.collection('users').stream()
-        
+
+        # Quote every held symbol in one batch while the user list is read; the
+        # per-user valuations below reuse these quotes instead of fetching them again
+        user_docs, quotes = await asyncio.gather(
+            asyncio.to_thread(lambda: list(db.collection('users').stream())),
+            asyncio.to_thread(_held_symbol_quotes)
+        )
+
+        # Value all portfolios at once; each valuation still does blocking Firestore reads
+        portfolio_values = await gather_in_threads(
+            lambda user_doc_id: calculate_total_portfolio_value(user_doc_id, quotes),
+            [doc.id for doc in user_docs]
+        )
+
         user_count = 0
-        for user_doc in user_docs:
+        for user_doc, portfolio_value in zip(user_docs, portfolio_values):
             user_count += 1
             try:
                 user_data = user_doc.to_dict()
                 username = user_data.get('username', 'Unknown')
                 print(f"[LEADERBOARD] Processing user {user_count}: {username} (ID: {user_doc.id})")
-                
-                # Calculate portfolio value using the same method as portfolio route
-                portfolio_value = calculate_total_portfolio_value(user_doc.id)
+
+                if isinstance(portfolio_value, Exception):
+                    raise portfolio_value
                 print(f"[LEADERBOARD] Portfolio value for {username}: {portfolio_value}")
                 
                 # Fix avatar handling - return None if no custom profile picture
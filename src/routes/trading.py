@@ -18,9 +18,10 @@ from flask import url_for, flash, session, jsonify
 from google.cloud import firestore
 
 # Local imports
-from services.market_data import fetch_stock_data, fetch_user_portfolio
+from services.market_data import fetch_stock_data, fetch_stock_quotes, fetch_trade_quote, fetch_user_portfolio
 from utils.db import db
 from routes.watchlist import fetch_watchlist
+from services.live_prices import request_subscription
 
 print("\n\n!!!!!!!!!! --- LOADING trading.py - COMPLETE REWORK --- !!!!!!!!!!\n\n")
 
@@ -79,11 +80,11 @@ def buy():
             flash('Please provide a valid symbol and quantity.', 'error')
             return redirect(url_for('trading.buy'))
             
-        # Fetch stock price
+        # Fetch stock price (never execute a trade against a stale quote)
         try:
-            price_data = fetch_stock_data(symbol)
-            if not price_data or 'close' not in price_data or price_data['close'] <= 0:
-                flash(f"Unable to fetch valid price for {symbol}", 'error')
+            price_data = fetch_trade_quote(symbol)
+            if price_data is None:
+                flash(f"Unable to fetch a current price for {symbol}", 'error')
                 return redirect(url_for('trading.buy', symbol=symbol))
             current_price = price_data['close']
         except Exception as e:
@@ -127,6 +128,8 @@ def buy():
                     'purchase_price': current_price,
                     'purchase_date': datetime.now()
                 })
+                # New holding: have the stream worker start streaming it now
+                request_subscription(symbol)
             
             # 3. Record transaction
             db.collection('transactions').add({
@@ -214,9 +217,13 @@ def sell():
         
         print(f"[SELL-POST] ✅ Validation passed - selling {shares_to_sell} shares of {symbol}")
         
-        # Get current stock price
+        # Get current stock price (never execute a trade against a stale quote)
         try:
-            price_data = fetch_stock_data(symbol)
+            price_data = fetch_trade_quote(symbol)
+            if price_data is None:
+                print(f"[SELL-POST] ❌ No current price for {symbol}")
+                flash('Unable to get current stock price', 'error')
+                return redirect(url_for('trading.sell'))
             current_price = price_data['close']
             print(f"[SELL-POST] ✅ Current price: ${current_price}")
         except Exception as e:
@@ -306,15 +313,20 @@ def sell():
         
         # Get all portfolio positions
         portfolio_docs = db.collection('portfolios').where('user_id', '==', user_id).stream()
+        position_docs = [doc.to_dict() for doc in portfolio_docs]
+        
+        # Quote every held symbol in one batch instead of one request per position
+        quotes = fetch_stock_quotes([
+            p.get('symbol') for p in position_docs if float(p.get('shares', 0)) > 0
+        ])
         
-        for doc in portfolio_docs:
-            position_data = doc.to_dict()
+        for position_data in position_docs:
             symbol = position_data.get('symbol')
             shares = float(position_data.get('shares', 0))
             
             if shares > 0:
                 try:
-                    price_data = fetch_stock_data(symbol)
+                    price_data = quotes.get(symbol, {})
                     current_price = price_data.get('close', 0)
                     position_value = shares * current_price
                     total_value += position_value
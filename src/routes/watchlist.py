@@ -9,13 +9,16 @@ from google.cloud import firestore
 
 # Local imports
 from utils.db import db
+from services.live_prices import request_subscription
 # Assuming fetch_stock_data is available, if not, this will need a fallback or proper import
 try:
-    from services.market_data import fetch_stock_data
+    from services.market_data import fetch_stock_data, fetch_stock_quotes
 except ImportError:
     print("WARNING [watchlist.py]: services.market_data.fetch_stock_data not found. Using fallback.")
     def fetch_stock_data(symbol): # Fallback
         return {'symbol': symbol, 'close': 0.0, 'prev_close': 0.0}
+    def fetch_stock_quotes(symbols): # Fallback
+        return {symbol: fetch_stock_data(symbol) for symbol in symbols}
 
 # Create the blueprint with explicit url_prefix to ensure routes are registered properly
 watchlist_bp = Blueprint('watchlist', __name__, url_prefix='')
@@ -37,10 +40,9 @@ def fetch_watchlist(user_id):
             symbols = watchlist_data.get('symbols', [])
             print(f"[WATCHLIST_PY] User {user_id} has symbols: {symbols}")
 
+            quotes = fetch_stock_quotes(symbols) # Fetch real data in one batch
             for symbol in symbols:
-                # In a real scenario, you'd fetch current price data here
-                # For now, just returning symbol
-                price_data = fetch_stock_data(symbol) # Fetch real data
+                price_data = quotes.get(symbol, {})
                 current_price = price_data.get('close', 0)
                 prev_close = price_data.get('prev_close', 0)
                 price_change = current_price - prev_close
@@ -111,6 +113,9 @@ def api_add_to_watchlist():
                 'last_updated': firestore.SERVER_TIMESTAMP
             })
         
+        # Start streaming the symbol without waiting for the stream worker's next scan
+        request_subscription(symbol)
+        
         # Return successful response
         print(f"[WATCHLIST] Successfully added {symbol} to watchlist")
         return jsonify({
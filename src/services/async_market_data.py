@@ -0,0 +1,32 @@
+# src/services/async_market_data.py
+"""
+Asyncio helpers for async views.
+
+Flask runs every async view in an event loop of its own, so anything that
+blocks (Firestore reads, the services.market_data calls with their pooled
+HTTP sessions, quote cache, rate limiter, circuit breakers and Redis lease)
+runs on worker threads instead. An async view only pays off when it has
+several such calls to overlap; the leaderboard, for example, values every
+user's portfolio at once:
+
+    values = await gather_in_threads(value_portfolio, user_ids)
+
+Views that make a single blocking call stay synchronous.
+"""
+
+import asyncio
+import os
+
+# Upper bound on blocking calls one view runs at the same time
+MAX_ASYNC_CONCURRENCY = int(os.environ.get('MAX_ASYNC_CONCURRENCY', 20))
+
+
+async def gather_in_threads(fn, items, limit=MAX_ASYNC_CONCURRENCY):
+    """Run a blocking fn(item) for every item on worker threads, at most limit at a time."""
+    semaphore = asyncio.Semaphore(limit)
+
+    async def _run(item):
+        async with semaphore:
+            return await asyncio.to_thread(fn, item)
+
+    return await asyncio.gather(*(_run(item) for item in items), return_exceptions=True)
@@ -0,0 +1,280 @@
+# src/services/chart_specs.py
+"""
+Compact JSON figure specs for the price and indicator charts.
+
+Charts used to be built as Plotly figures in Python and rendered to HTML on
+every request. They are now plain {'data', 'layout'} dicts that plotly.js
+draws as-is, built from the stored bars and the incremental indicator cache.
+
+Long series are downsampled to the chart's pixel width before they are
+serialized (see services/downsample.py), so a spec stays a few tens of KB
+whatever the range.
+
+A spec is fully determined by (symbol, chart, range, overlays, width) and the
+bars it is drawn from, so a hash of those doubles as the cache key and the ETag.
+Browsers revalidating an unchanged chart get a 304 without the spec being
+rebuilt, and a new bar changes the hash on its own.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+
+from services.indicators import to_list
+from services.indicator_cache import bar_indicators
+from services.downsample import chart_width, envelope_bars, lttb_indices, max_candles, max_points
+from services.market_calendar import MARKET_TZ
+from services.quote_cache import QuoteCache
+from services.resample import get_bars, is_intraday
+from services.history_store import DATE, OPEN, HIGH, LOW, CLOSE, VOLUME
+
+# Bump when the spec layout changes so cached specs and browser ETags are dropped
+CHART_SPEC_VERSION = 2
+CHART_SPEC_TTL = int(os.environ.get('CHART_SPEC_TTL', 3600))
+
+# Range button -> (bar timeframe, period); downsampling keeps the finer bars affordable
+RANGES = {
+    '1D': ('1m', '1d'),
+    '5D': ('5m', '5d'),
+    '1M': ('D', '1mo'),
+    '3M': ('D', '3mo'),
+    '6M': ('D', '6mo'),
+    'YTD': ('D', 'ytd'),
+    '1Y': ('D', '1y'),
+    '5Y': ('D', '5y'),
+    'MAX': ('W', 'max')
+}
+DEFAULT_RANGE = '1Y'
+
+# Price chart overlay -> indicator specs it draws
+OVERLAYS = {
+    'sma': ['sma:50', 'sma:200'],
+    'ema': ['ema:20'],
+    'bollinger': ['bollinger:20,2'],
+    'volume': []
+}
+DEFAULT_OVERLAYS = ('sma', 'volume')
+
+# Chart -> indicator specs it always draws
+CHARTS = {
+    'price': [],
+    'line': [],
+    'rsi': ['rsi:14'],
+    'macd': ['macd:12,26,9']
+}
+
+# Series whose shape picks the points of each line chart (None: the close)
+LTTB_SERIES = {
+    'line': None,
+    'rsi': 'rsi_14',
+    'macd': 'macd_12_26_9'
+}
+
+BASE_LAYOUT = {
+    'plot_bgcolor': 'rgba(0, 0, 0, 0)',
+    'paper_bgcolor': 'rgba(0, 0, 0, 0)',
+    'font': {'color': 'rgba(255, 255, 255, 0.8)'},
+    'hovermode': 'x unified'
+}
+GRID_COLOR = 'rgba(128, 128, 128, 0.3)'
+
+spec_cache = QuoteCache('chart_spec', ttl=CHART_SPEC_TTL, max_entries=256)
+
+
+def _x_values(bars, timeframe):
+    """Bar timestamps as date strings, in market time for intraday bars."""
+    dates = bars[:, DATE].astype(np.int64)
+    if not is_intraday(timeframe):
+        return np.datetime_as_string(dates.astype('datetime64[s]'), unit='D').tolist()
+    # One UTC offset per calendar day covers the DST switch
+    days, inverse = np.unique(dates // 86400, return_inverse=True)
+    offsets = np.array([
+        datetime.fromtimestamp(int(day) * 86400 + 43200, MARKET_TZ).utcoffset().total_seconds()
+        for day in days
+    ], dtype=np.int64)
+    local = dates + offsets[inverse]
+    return np.datetime_as_string(local.astype('datetime64[s]'), unit='m').tolist()
+
+
+def _values(values, decimals=4):
+    return to_list(np.round(values, decimals))
+
+
+def _xaxis(timeframe):
+    axis = {'type': 'date', 'gridcolor': GRID_COLOR, 'rangeslider': {'visible': False}}
+    if timeframe == 'D':
+        axis['rangebreaks'] = [{'bounds': ['sat', 'mon']}]
+    elif is_intraday(timeframe):
+        axis['rangebreaks'] = [{'bounds': ['sat', 'mon']}, {'bounds': [16, 9.5], 'pattern': 'hour'}]
+    return axis
+
+
+def _layout(title, height, timeframe, **extra):
+    layout = dict(BASE_LAYOUT, title={'text': title}, height=height, xaxis=_xaxis(timeframe))
+    layout['yaxis'] = {'gridcolor': GRID_COLOR}
+    layout.update(extra)
+    return layout
+
+
+def _line(x, y, name, color, width=1.5):
+    return {'type': 'scatter', 'mode': 'lines', 'x': x, 'y': _values(y), 'name': name,
+            'line': {'color': color, 'width': width}}
+
+
+def _price_spec(symbol, bars, x, values, overlays, timeframe):
+    data = [{
+        'type': 'candlestick',
+        'x': x,
+        'open': _values(bars[:, OPEN]),
+        'high': _values(bars[:, HIGH]),
+        'low': _values(bars[:, LOW]),
+        'close': _values(bars[:, CLOSE]),
+        'name': 'Price'
+    }]
+    extra = {
+        'legend': {'orientation': 'h', 'yanchor': 'bottom', 'y': 1.02, 'xanchor': 'right', 'x': 1},
+        'margin': {'l': 50, 'r': 50, 't': 80, 'b': 50}
+    }
+    if 'volume' in overlays:
+        data.append({
+            'type': 'bar', 'x': x, 'y': bars[:, VOLUME].astype(np.int64).tolist(), 'name': 'Volume',
+            'marker': {'color': 'rgba(100, 100, 100, 0.3)'}, 'yaxis': 'y2'
+        })
+        extra['yaxis2'] = {
+            'title': {'text': 'Volume', 'font': {'color': 'rgba(100, 100, 100, 0.8)'}},
+            'tickfont': {'color': 'rgba(100, 100, 100, 0.8)'},
+            'overlaying': 'y', 'side': 'right', 'showgrid': False
+        }
+    if 'sma' in overlays:
+        data.append(_line(x, values['sma_50'], 'SMA 50', 'blue', 1))
+        data.append(_line(x, values['sma_200'], 'SMA 200', 'red', 1))
+    if 'ema' in overlays:
+        data.append(_line(x, values['ema_20'], 'EMA 20', 'orange', 1))
+    if 'bollinger' in overlays:
+        data.append(_line(x, values['bollinger_20_2_high'], 'Bollinger High', 'rgba(0, 188, 212, 0.7)', 1))
+        data.append(_line(x, values['bollinger_20_2_mid'], 'Bollinger Mid', 'rgba(0, 188, 212, 0.4)', 1))
+        data.append(_line(x, values['bollinger_20_2_low'], 'Bollinger Low', 'rgba(0, 188, 212, 0.7)', 1))
+    layout = _layout(f'{symbol} Price History', 600, timeframe, **extra)
+    layout['yaxis']['title'] = {'text': 'Price'}
+    return {'data': data, 'layout': layout}
+
+
+def _line_spec(symbol, bars, x, values, overlays, timeframe):
+    layout = _layout(f'Recent Price Changes for {symbol}', 450, timeframe)
+    layout['yaxis']['title'] = {'text': 'Close Price'}
+    return {'data': [_line(x, bars[:, CLOSE], 'Close', '#636efa', 2)], 'layout': layout}
+
+
+def _rsi_spec(symbol, bars, x, values, overlays, timeframe):
+    # Overbought and oversold levels span the plot, whatever the dates
+    levels = [
+        {'type': 'line', 'xref': 'paper', 'x0': 0, 'x1': 1, 'y0': level, 'y1': level,
+         'line': {'color': color, 'dash': 'dash'}}
+        for level, color in ((70, 'red'), (30, 'green'))
+    ]
+    layout = _layout('Relative Strength Index (RSI)', 250, timeframe, shapes=levels,
+                     margin={'l': 50, 'r': 20, 't': 50, 'b': 20})
+    layout['yaxis']['range'] = [0, 100]
+    return {'data': [_line(x, values['rsi_14'], 'RSI', 'purple')], 'layout': layout}
+
+
+def _macd_spec(symbol, bars, x, values, overlays, timeframe):
+    hist = values['macd_12_26_9_hist']
+    data = [
+        _line(x, values['macd_12_26_9'], 'MACD', 'blue'),
+        _line(x, values['macd_12_26_9_signal'], 'Signal', 'red'),
+        {'type': 'bar', 'x': x, 'y': _values(hist), 'name': 'Histogram',
+         'marker': {'color': np.where(hist >= 0, 'green', 'red').tolist()}}
+    ]
+    layout = _layout('Moving Average Convergence Divergence (MACD)', 250, timeframe,
+                     margin={'l': 50, 'r': 20, 't': 50, 'b': 20})
+    return {'data': data, 'layout': layout}
+
+
+def _downsample(chart, bars, values, width):
+    """Bars and indicator values reduced to what a chart width pixels wide can show."""
+    if chart == 'price':
+        # Merged candles keep every high and low; overlays are read at each candle's close
+        bars, picks = envelope_bars(bars, max_candles(width))
+    else:
+        series = bars[:, CLOSE] if LTTB_SERIES[chart] is None else values[LTTB_SERIES[chart]]
+        picks = lttb_indices(series, max_points(width))
+        bars = bars[picks]
+    return bars, {name: series[picks] for name, series in values.items()}
+
+
+BUILDERS = {
+    'price': _price_spec,
+    'line': _line_spec,
+    'rsi': _rsi_spec,
+    'macd': _macd_spec
+}
+
+
+def parse_overlays(chart, overlays):
+    """Sorted tuple of known overlays; only price charts have any."""
+    if chart != 'price':
+        return ()
+    if overlays is None:
+        return DEFAULT_OVERLAYS
+    if isinstance(overlays, str):
+        overlays = overlays.split(',')
+    overlays = {name.strip().lower() for name in overlays if name.strip()}
+    unknown = overlays - set(OVERLAYS)
+    if unknown:
+        raise ValueError(f"Unknown overlay: {', '.join(sorted(unknown))}")
+    return tuple(sorted(overlays))
+
+
+def chart_etag(symbol, chart, range_key, overlays, width, bars, start):
+    """Hash of everything a spec is built from."""
+    digest = hashlib.sha1()
+    digest.update(f"{CHART_SPEC_VERSION}|{symbol}|{chart}|{range_key}|{','.join(overlays)}|{width}|"
+                  f"{len(bars)}|{start}".encode())
+    # First and last bar: a new or still-forming bar, or a re-adjusted history, changes the tag
+    digest.update(np.ascontiguousarray(bars[[0, -1]]).tobytes())
+    return digest.hexdigest()[:24]
+
+
+def get_chart_spec(symbol, chart='price', range_key=DEFAULT_RANGE, overlays=None, width=None, if_none_match=()):
+    """(etag, JSON body) for one chart, or None when there are no bars.
+
+    width is the chart's width in CSS pixels (DEFAULT_CHART_WIDTH if not
+    given); it caps the number of points sent.
+
+    The body is None when etag is in if_none_match, so an unchanged chart is
+    answered without building or reading the spec. Raises ValueError for an
+    unknown chart, range or overlay.
+    """
+    if chart not in CHARTS:
+        raise ValueError(f"Unknown chart: {chart}")
+    if range_key not in RANGES:
+        raise ValueError(f"Unsupported range: {range_key}")
+    symbol = symbol.upper()
+    overlays = parse_overlays(chart, overlays)
+    width = chart_width(width)
+    timeframe, period = RANGES[range_key]
+
+    bars, start = get_bars(symbol, timeframe, period)
+    if bars is None or len(bars) <= start:
+        return None
+    etag = chart_etag(symbol, chart, range_key, overlays, width, bars, start)
+    if etag in if_none_match:
+        return etag, None
+
+    body = spec_cache.get(etag)
+    if body is None:
+        specs = CHARTS[chart] + [spec for name in overlays for spec in OVERLAYS[name]]
+        values = bar_indicators(symbol, timeframe, bars, start, specs) if specs else {}
+        shown, values = _downsample(chart, bars[start:], values, width)
+        spec = BUILDERS[chart](symbol, shown, _x_values(shown, timeframe), values, overlays, timeframe)
+        body = json.dumps(spec, separators=(',', ':'))
+        spec_cache.set(etag, body)
+    return etag, body
+
+
+def chart_spec_stats():
+    return spec_cache.stats()
@@ -0,0 +1,170 @@
+# src/services/circuit_breaker.py
+"""
+Circuit breakers and health scoring for market data providers.
+
+Each provider keeps a rolling window of recent calls (outcome and latency).
+When the error rate over the window crosses a threshold the breaker opens and
+callers skip that provider immediately. After a cool-down one probe call is let
+through (half-open); success closes the breaker, failure re-opens it.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class CircuitBreaker:
+    """Rolling-window breaker for one provider."""
+
+    def __init__(self, name, window_seconds=60, min_calls=5, error_threshold=0.5,
+                 cooldown_seconds=30, max_samples=500):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.error_threshold = error_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self._samples = deque(maxlen=max_samples)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+        self.times_opened = 0
+        self.rejected = 0
+
+    def _trim(self, now):
+        cutoff = now - self.window_seconds
+        while self._samples and self._samples[0][0] < cutoff:
+            self._samples.popleft()
+
+    def allow(self):
+        """True if a call may go to the provider right now."""
+        now = time.time()
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and now - self._opened_at >= self.cooldown_seconds:
+                self._state = HALF_OPEN
+                self._probe_in_flight = False
+            if self._state == HALF_OPEN and not self._probe_in_flight:
+                # Let exactly one probe through to test the provider
+                self._probe_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, success, latency):
+        """Record the outcome of a call that allow() let through."""
+        now = time.time()
+        with self._lock:
+            self._samples.append((now, bool(success), float(latency)))
+            self._trim(now)
+
+            if self._state == HALF_OPEN:
+                self._probe_in_flight = False
+                if success:
+                    print(f"[CIRCUIT_BREAKER] ✅ {self.name} probe succeeded, closing breaker")
+                    self._state = CLOSED
+                    # Start the closed state from a clean window
+                    self._samples.clear()
+                else:
+                    self._open(now)
+                return
+
+            if self._state == CLOSED and not success:
+                calls = len(self._samples)
+                errors = sum(1 for _, ok, _ in self._samples if not ok)
+                if calls >= self.min_calls and errors / calls >= self.error_threshold:
+                    self._open(now)
+
+    def _open(self, now):
+        self._state = OPEN
+        self._opened_at = now
+        self.times_opened += 1
+        print(f"[CIRCUIT_BREAKER] ⚠️ {self.name} breaker OPEN for {self.cooldown_seconds}s")
+
+    def call(self, fn, *args, **kwargs):
+        """Run fn through the breaker. Raises CircuitOpenError when it is open."""
+        if not self.allow():
+            raise CircuitOpenError(self.name)
+        start = time.time()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception:
+            self.record(False, time.time() - start)
+            raise
+        self.record(True, time.time() - start)
+        return result
+
+    @property
+    def state(self):
+        with self._lock:
+            if self._state == OPEN and time.time() - self._opened_at >= self.cooldown_seconds:
+                return HALF_OPEN
+            return self._state
+
+    def health(self):
+        """Snapshot of breaker state, error rate and latency percentiles."""
+        now = time.time()
+        with self._lock:
+            self._trim(now)
+            samples = list(self._samples)
+            state = self._state
+            opened_at = self._opened_at
+        if state == OPEN and now - opened_at >= self.cooldown_seconds:
+            state = HALF_OPEN
+
+        calls = len(samples)
+        errors = sum(1 for _, ok, _ in samples if not ok)
+        latencies = sorted(latency for _, _, latency in samples)
+        error_rate = errors / calls if calls else 0.0
+        p50 = _percentile(latencies, 50)
+        p95 = _percentile(latencies, 95)
+        # 0-100: penalize errors heavily and slow p95 latency mildly
+        score = 100.0 * (1.0 - error_rate)
+        if p95 is not None:
+            score -= min(20.0, p95 * 5.0)
+        if state == OPEN:
+            score = 0.0
+
+        return {
+            'state': state,
+            'calls': calls,
+            'errors': errors,
+            'error_rate': round(error_rate, 4),
+            'latency_p50_ms': round(p50 * 1000, 1) if p50 is not None else None,
+            'latency_p95_ms': round(p95 * 1000, 1) if p95 is not None else None,
+            'health_score': round(max(0.0, score), 1),
+            'times_opened': self.times_opened,
+            'rejected': self.rejected,
+            'retry_in_seconds': max(0, round(self.cooldown_seconds - (now - opened_at))) if state == OPEN else 0
+        }
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is short-circuited because the provider's breaker is open."""
+
+    def __init__(self, name):
+        super().__init__(f"{name} circuit breaker is open")
+        self.name = name
+
+
+_window = int(os.environ.get('BREAKER_WINDOW_SECONDS', 60))
+_cooldown = int(os.environ.get('BREAKER_COOLDOWN_SECONDS', 30))
+
+# One breaker per provider in the fallback chain
+breakers = {
+    name: CircuitBreaker(name, window_seconds=_window, cooldown_seconds=_cooldown)
+    for name in ('finnhub', 'yfinance', 'database', 'coinbase')
+}
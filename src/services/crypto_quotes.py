@@ -0,0 +1,254 @@
+# src/services/crypto_quotes.py
+"""
+Batched crypto quotes from Coinbase.
+
+One exchange-rates call prices every coin Coinbase lists, so any number of
+crypto symbols costs a single upstream request per CRYPTO_RATES_TTL seconds.
+A rolling 24h reference comes from price snapshots kept in Redis: every
+REFERENCE_SNAPSHOT_INTERVAL one worker records the current price of every
+tracked coin, and prev_close is the snapshot taken about 24 hours ago. Until a
+coin has a day of snapshots its reference comes from Coinbase Exchange's 24h
+stats endpoint instead.
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from utils.db import redis_client
+from services.circuit_breaker import breakers
+from services.http_clients import get_session, get_timeout
+from services.quote_cache import QuoteCache
+
+COINBASE_RATES_URL = 'https://api.coinbase.com/v2/exchange-rates'
+COINBASE_STATS_URL = 'https://api.exchange.coinbase.com/products/{base}-USD/stats'
+
+CRYPTO_RATES_TTL = int(os.environ.get('CRYPTO_RATES_TTL', 15))
+# Rates older than the TTL are still served, marked stale, when Coinbase is down
+CRYPTO_RATES_MAX_STALE = int(os.environ.get('CRYPTO_RATES_MAX_STALE', 600))
+REFERENCE_SNAPSHOT_INTERVAL = int(os.environ.get('CRYPTO_SNAPSHOT_INTERVAL', 300))
+REFERENCE_WINDOW = 24 * 3600
+STATS_TTL = int(os.environ.get('CRYPTO_STATS_TTL', 600))
+
+SNAPSHOTS_KEY = 'crypto:snapshots'
+SNAPSHOT_DUE_KEY = 'crypto:snapshot_due'
+TRACKED_KEY = 'crypto:tracked'
+
+rates_cache = QuoteCache('crypto_rates', ttl=CRYPTO_RATES_MAX_STALE, l1_ttl=CRYPTO_RATES_TTL, max_entries=4)
+stats_cache = QuoteCache('crypto_stats', ttl=STATS_TTL, max_entries=256)
+
+
+def base_currency(symbol):
+    """'CRYPTO:BTC', 'BTC-USD' and 'BTC' all map to 'BTC'."""
+    base = symbol.upper()
+    if base.startswith('CRYPTO:'):
+        base = base[len('CRYPTO:'):]
+    if base.endswith('-USD'):
+        base = base[:-len('-USD')]
+    return base
+
+
+def _error_quote(symbol, message):
+    return {
+        'symbol': symbol,
+        'error': message,
+        'close': 0,
+        'source': 'error',
+        'as_of': None,
+        'stale': False
+    }
+
+
+class CryptoQuoteService:
+    """Spot prices for many coins per request plus a rolling 24h reference."""
+
+    def __init__(self, redis=None):
+        self.redis = redis if redis is not None else redis_client
+        self._references = {}
+        self._references_lock = threading.Lock()
+        self.rate_fetches = 0
+        self.stats_fetches = 0
+
+    def _fetch_rates(self):
+        """{coin: USD price} for every coin Coinbase quotes."""
+        breaker = breakers['coinbase']
+        if not breaker.allow():
+            raise RuntimeError('Coinbase circuit breaker is open')
+        start = time.time()
+        try:
+            response = get_session('coinbase').get(
+                COINBASE_RATES_URL, params={'currency': 'USD'}, timeout=get_timeout('coinbase')
+            )
+        except Exception:
+            breaker.record(False, time.time() - start)
+            raise
+        breaker.record(response.status_code < 500, time.time() - start)
+        response.raise_for_status()
+        self.rate_fetches += 1
+
+        prices = {}
+        for coin, rate in response.json()['data']['rates'].items():
+            try:
+                rate = float(rate)
+            except (TypeError, ValueError):
+                continue
+            if rate > 0:
+                prices[coin] = 1.0 / rate
+        return prices
+
+    def spot_prices(self):
+        """(prices, as_of, stale) using the cached table when it is fresh enough."""
+        entry = rates_cache.get_entry('USD', max_age=CRYPTO_RATES_TTL)
+        if entry is not None:
+            return entry['data'], entry['as_of'], False
+        try:
+            prices = self._fetch_rates()
+        except Exception as e:
+            print(f"[CRYPTO_QUOTES] ❌ Coinbase rates fetch failed: {str(e)}")
+            entry = rates_cache.get_entry('USD')
+            if entry is None:
+                raise
+            return entry['data'], entry['as_of'], True
+        entry = rates_cache.set('USD', prices)
+        self._maybe_snapshot(prices, entry['as_of'])
+        return prices, entry['as_of'], False
+
+    def _maybe_snapshot(self, prices, now):
+        """Record tracked coins' prices if no worker has done so this interval."""
+        try:
+            if not self.redis.set(SNAPSHOT_DUE_KEY, '1', nx=True, ex=REFERENCE_SNAPSHOT_INTERVAL):
+                return
+            tracked = self.redis.smembers(TRACKED_KEY)
+            snapshot = {coin: prices[coin] for coin in tracked if coin in prices}
+            if not snapshot:
+                return
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.zadd(SNAPSHOTS_KEY, {json.dumps({'ts': now, 'prices': snapshot}): now})
+            # Keep a little more than one window so the 24h-ago snapshot is always there
+            pipe.zremrangebyscore(SNAPSHOTS_KEY, '-inf', now - REFERENCE_WINDOW - 2 * REFERENCE_SNAPSHOT_INTERVAL)
+            pipe.execute()
+        except Exception as e:
+            print(f"[CRYPTO_QUOTES] ⚠️ Could not record reference snapshot: {str(e)}")
+
+    def _track(self, coins):
+        try:
+            self.redis.sadd(TRACKED_KEY, *coins)
+        except Exception:
+            pass
+
+    def _snapshot_references(self, now):
+        """{coin: price} from the snapshot closest to 24 hours ago, or {}."""
+        target = now - REFERENCE_WINDOW
+        try:
+            members = self.redis.zrangebyscore(
+                SNAPSHOTS_KEY, target - REFERENCE_SNAPSHOT_INTERVAL, target + REFERENCE_SNAPSHOT_INTERVAL,
+                withscores=True
+            )
+        except Exception:
+            return {}
+        if not members:
+            return {}
+        closest = min(members, key=lambda member: abs(member[1] - target))[0]
+        try:
+            return json.loads(closest)['prices']
+        except (TypeError, ValueError, KeyError):
+            return {}
+
+    def _stats_reference(self, base):
+        """24h open/high/low from Coinbase Exchange stats, or None."""
+        cached = stats_cache.get(base)
+        if cached is not None:
+            return cached
+        breaker = breakers['coinbase']
+        if not breaker.allow():
+            return None
+        start = time.time()
+        try:
+            response = get_session('coinbase').get(
+                COINBASE_STATS_URL.format(base=base), timeout=get_timeout('coinbase')
+            )
+            breaker.record(response.status_code < 500, time.time() - start)
+            if response.status_code != 200:
+                return None
+            data = response.json()
+            stats = {'open': float(data['open']), 'high': float(data['high']), 'low': float(data['low'])}
+        except Exception as e:
+            breaker.record(False, time.time() - start)
+            print(f"[CRYPTO_QUOTES] ⚠️ 24h stats unavailable for {base}: {str(e)}")
+            return None
+        self.stats_fetches += 1
+        stats_cache.set(base, stats)
+        return stats
+
+    def _references_for(self, coins, now):
+        """{coin: {'open', 'high', 'low'}}; snapshot references are memoized per interval."""
+        with self._references_lock:
+            computed_at, references = self._references.get('snapshot', (0, {}))
+            if now - computed_at >= REFERENCE_SNAPSHOT_INTERVAL / 5:
+                references = self._snapshot_references(now)
+                self._references['snapshot'] = (now, references)
+
+        result = {}
+        for coin in coins:
+            if coin in references:
+                result[coin] = {'open': references[coin], 'high': None, 'low': None}
+            else:
+                stats = self._stats_reference(coin)
+                if stats:
+                    result[coin] = stats
+        return result
+
+    def get_quotes(self, symbols):
+        """{symbol: quote} in the same shape as equity quotes from fetch_stock_data."""
+        symbols = list(dict.fromkeys(s for s in symbols if s))
+        if not symbols:
+            return {}
+        coins = {symbol: base_currency(symbol) for symbol in symbols}
+        # Tracked before fetching so the snapshot this fetch may record includes them
+        self._track(sorted(set(coins.values())))
+        try:
+            prices, as_of, stale = self.spot_prices()
+        except Exception:
+            return {symbol: _error_quote(symbol, f'Unable to fetch crypto price for {symbol}') for symbol in symbols}
+
+        known = sorted({coin for coin in coins.values() if coin in prices})
+        references = self._references_for(known, as_of)
+
+        quotes = {}
+        for symbol, coin in coins.items():
+            price = prices.get(coin)
+            if price is None:
+                quotes[symbol] = _error_quote(symbol, f'Coinbase does not quote {coin}')
+                continue
+            reference = references.get(coin, {})
+            # Without any 24h reference the day change is reported as flat
+            prev_close = reference.get('open') or price
+            quotes[symbol] = {
+                'symbol': symbol,
+                'open': prev_close,
+                'high': reference.get('high'),
+                'low': reference.get('low'),
+                'prev_close': prev_close,
+                'close': price,
+                'source': 'coinbase',
+                'as_of': datetime.utcfromtimestamp(as_of).isoformat() + 'Z',
+                'stale': stale
+            }
+        return quotes
+
+    def stats(self):
+        return {
+            'rate_fetches': self.rate_fetches,
+            'stats_fetches': self.stats_fetches,
+            'rates_cache': rates_cache.stats()
+        }
+
+
+crypto_quotes = CryptoQuoteService()
+
+
+def fetch_crypto_quotes(symbols):
+    """Quotes for many crypto symbols from one cached Coinbase rates table."""
+    return crypto_quotes.get_quotes(symbols)
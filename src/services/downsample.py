@@ -0,0 +1,144 @@
+# src/services/downsample.py
+"""
+Downsampling of long price series to what a chart can actually draw.
+
+A chart a few hundred pixels wide cannot show more than about one line
+point per pixel or one candle per few pixels, so series are reduced before
+they are serialized and payload size stays bounded whatever the range:
+
+- Line series use Largest-Triangle-Three-Buckets (LTTB): the points are
+  split into equal buckets and each bucket keeps the point forming the
+  largest triangle with the previously kept point and the next bucket's
+  average, which preserves peaks and troughs. The point kept in a bucket
+  only depends on which point of the previous bucket was kept. For the
+  narrow buckets of a typical chart the areas of every candidate against
+  every possible anchor are computed for all buckets in one array pass, and
+  walking the buckets only follows an index table. Very wide buckets (long
+  series on a small chart) would make that table too large; there each
+  bucket's areas are one NumPy row computed once its anchor is known.
+- Candlesticks use a min/max envelope: consecutive bars are merged into one
+  (first open, highest high, lowest low, last close, summed volume), so no
+  high or low is lost.
+
+Points are bucketed by bar position rather than time, matching charts that
+hide nights and weekends.
+"""
+
+import os
+
+import numpy as np
+
+from services.resample import aggregate_bars
+
+DEFAULT_CHART_WIDTH = int(os.environ.get('DEFAULT_CHART_WIDTH', 1200))
+MIN_CHART_WIDTH = 200
+MAX_CHART_WIDTH = int(os.environ.get('MAX_CHART_WIDTH', 4000))
+# Widths are rounded up to this step so cached specs are shared between similar screens
+CHART_WIDTH_STEP = 100
+LINE_POINTS_PER_PIXEL = float(os.environ.get('LINE_POINTS_PER_PIXEL', 1.0))
+CANDLE_PIXELS = int(os.environ.get('CANDLE_PIXELS', 3))
+# Widest bucket whose picks are precomputed for every anchor; the table grows with the
+# square of the width, so wider buckets are scanned one at a time instead
+LTTB_TABLE_MAX_WIDTH = int(os.environ.get('LTTB_TABLE_MAX_WIDTH', 20))
+
+
+def chart_width(width=None):
+    """Requested width in pixels, clamped and rounded up to CHART_WIDTH_STEP."""
+    if not width:
+        width = DEFAULT_CHART_WIDTH
+    width = min(max(int(width), MIN_CHART_WIDTH), MAX_CHART_WIDTH)
+    return -(-width // CHART_WIDTH_STEP) * CHART_WIDTH_STEP
+
+
+def max_points(width):
+    """Line points worth sending for a chart width."""
+    return max(int(width * LINE_POINTS_PER_PIXEL), 3)
+
+
+def max_candles(width):
+    """Candles worth sending for a chart width."""
+    return max(width // CANDLE_PIXELS, 1)
+
+
+def _lttb(x, y, n_out):
+    n = len(y)
+    # n_out - 2 buckets over the points between the fixed first and last ones
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    starts, ends = edges[:-1], edges[1:]
+    counts = ends - starts
+
+    # Each bucket's triangles close on the average of the next bucket
+    sum_x = np.concatenate([[0.0], np.cumsum(x)])
+    sum_y = np.concatenate([[0.0], np.cumsum(y)])
+    next_x = np.append(((sum_x[ends] - sum_x[starts]) / counts)[1:], x[-1])
+    next_y = np.append(((sum_y[ends] - sum_y[starts]) / counts)[1:], y[-1])
+
+    # Bucket members as rows; short buckets repeat their last point
+    columns = np.minimum(starts[:, None] + np.arange(counts.max()), (ends - 1)[:, None])
+    rows_x, rows_y = x[columns], y[columns]
+
+    picks = np.empty(n_out, dtype=np.int64)
+    picks[0], picks[-1] = 0, n - 1
+    # Twice the triangle area; the factor does not change the argmax
+    width = rows_x.shape[1]
+    if width > LTTB_TABLE_MAX_WIDTH:
+        kept = 0
+        for bucket in range(len(starts)):
+            ax, ay = x[kept], y[kept]
+            area = np.abs((ax - next_x[bucket]) * (rows_y[bucket] - ay) - (ax - rows_x[bucket]) * (next_y[bucket] - ay))
+            kept = columns[bucket, np.argmax(area)]
+            picks[bucket + 1] = kept
+        return picks
+
+    # best[b, j]: column kept in bucket b when column j of bucket b - 1 was kept;
+    # the first bucket's triangles all start at the first point
+    ax = np.vstack([np.full((1, width), x[0]), rows_x[:-1]])[:, :, None]
+    ay = np.vstack([np.full((1, width), y[0]), rows_y[:-1]])[:, :, None]
+    nx, ny = next_x[:, None, None], next_y[:, None, None]
+    area = np.abs((ax - nx) * (rows_y[:, None, :] - ay) - (ax - rows_x[:, None, :]) * (ny - ay))
+    best = np.argmax(area, axis=2)
+    column = 0
+    for bucket in range(len(starts)):
+        column = best[bucket, column]
+        picks[bucket + 1] = columns[bucket, column]
+    return picks
+
+
+def lttb_indices(y, n_out, x=None):
+    """Sorted indices of at most n_out points of y chosen by LTTB.
+
+    x defaults to the point positions. Leading NaNs (indicator warm-up) are
+    represented by their first point only, so the x range still starts at
+    the first bar.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= n_out:
+        return np.arange(n)
+    x = np.arange(n, dtype=np.float64) if x is None else np.asarray(x, dtype=np.float64)
+
+    finite = np.flatnonzero(np.isfinite(y))
+    if len(finite) == n:
+        return _lttb(x, y, max(n_out, 3))
+    if len(finite) == 0:
+        return np.linspace(0, n - 1, max(n_out, 2)).astype(np.int64)
+    lead = [0] if finite[0] > 0 else []
+    budget = max(n_out - len(lead), 3)
+    if len(finite) <= budget:
+        picks = finite
+    else:
+        picks = finite[_lttb(x[finite], y[finite], budget)]
+    return np.concatenate([np.array(lead, dtype=np.int64), picks])
+
+
+def envelope_bars(bars, n_out):
+    """(bars merged into at most n_out candles, index of the last bar of each).
+
+    Values of other series at the returned indices line up with the merged
+    candles' closes.
+    """
+    n = len(bars)
+    if n <= n_out:
+        return bars, np.arange(n)
+    starts = np.unique(np.linspace(0, n, n_out, endpoint=False).astype(np.int64))
+    return aggregate_bars(bars, starts), np.append(starts[1:], n) - 1
@@ -0,0 +1,252 @@
+# src/services/history_store.py
+"""
+Local on-disk cache of daily OHLCV bars.
+
+Each symbol is one .npy file holding an (n, 6) float64 array of
+(date, open, high, low, close, volume) rows, date as epoch seconds at UTC
+midnight, plus a small JSON sidecar. Files are opened memory-mapped, so a
+repeat chart load is a page-cache read rather than a yfinance download.
+
+Only completed sessions are stored. When the market calendar says a newer
+session has closed, just the missing bars are downloaded and appended. If the
+overlapping bar no longer matches (a split or dividend re-adjusted the
+history) the whole file is downloaded again.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import yfinance as yf
+
+from services.circuit_breaker import breakers
+from services.http_clients import get_session, get_timeout
+from services.market_calendar import last_close, CLOSE_SETTLE
+
+DATE, OPEN, HIGH, LOW, CLOSE, VOLUME = range(6)
+
+HISTORY_CACHE_DIR = os.environ.get(
+    'HISTORY_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'cache', 'history')
+)
+# How much history a symbol's first download covers, at least
+HISTORY_BACKFILL_PERIOD = os.environ.get('HISTORY_BACKFILL_PERIOD', '2y')
+# Don't ask yfinance again for a missing bar more often than this
+HISTORY_RECHECK_SECONDS = int(os.environ.get('HISTORY_RECHECK_SECONDS', 900))
+# Relative close difference on the overlapping bar that means history was re-adjusted.
+# A typical quarterly dividend moves adjusted closes by 0.1-1%, so this sits well below
+# that and only above float noise
+ADJUSTMENT_TOLERANCE = float(os.environ.get('HISTORY_ADJUSTMENT_TOLERANCE', 1e-4))
+# Symbols kept memory-mapped at once; the least recently read are unmapped first
+HISTORY_MMAP_MAX = int(os.environ.get('HISTORY_MMAP_MAX', 256))
+
+# Calendar-day lengths of yfinance periods; 'Nd' periods count trading bars instead
+PERIOD_DAYS = {'1mo': 31, '3mo': 92, '6mo': 183, '1y': 366, '2y': 731, '5y': 1827, '10y': 3653}
+PERIOD_BARS = {'1d': 1, '5d': 5}
+
+
+def _day_epoch(day):
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc).timestamp()
+
+
+def period_start(period, now=None):
+    """Epoch seconds of the first day a period covers; 0 for 'max'."""
+    now = now or datetime.now(timezone.utc)
+    if period == 'max':
+        return 0.0
+    if period == 'ytd':
+        return _day_epoch(now.replace(month=1, day=1))
+    if period in PERIOD_BARS:
+        # A week comfortably contains the last few trading days
+        return _day_epoch(now - timedelta(days=7 + PERIOD_BARS[period]))
+    if period not in PERIOD_DAYS:
+        raise ValueError(f"Unsupported period: {period}")
+    return _day_epoch(now - timedelta(days=PERIOD_DAYS[period]))
+
+
+def _settled_close(now):
+    """Close of the most recent session whose closing prints have settled."""
+    return last_close(now - CLOSE_SETTLE)
+
+
+def _wider(a, b):
+    """Whichever of two periods reaches further back."""
+    if b is None:
+        return a
+    return a if period_start(a) <= period_start(b) else b
+
+
+def frame_to_bars(hist, daily=True):
+    """(n, 6) bar array from a yfinance history DataFrame, dropping rows without a close.
+
+    Daily bars are stamped with their UTC midnight; intraday bars keep their
+    own timestamp.
+    """
+    if hist is None or hist.empty:
+        return np.empty((0, 6), dtype=np.float64)
+    if daily:
+        index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+        stamps = index.normalize().values.astype('datetime64[s]')
+    else:
+        index = hist.index.tz_convert('UTC').tz_localize(None) if hist.index.tz is not None else hist.index
+        stamps = index.values.astype('datetime64[s]')
+    bars = np.column_stack([
+        stamps.astype(np.int64).astype(np.float64),
+        hist['Open'].to_numpy(dtype=np.float64),
+        hist['High'].to_numpy(dtype=np.float64),
+        hist['Low'].to_numpy(dtype=np.float64),
+        hist['Close'].to_numpy(dtype=np.float64),
+        hist['Volume'].to_numpy(dtype=np.float64)
+    ])
+    return bars[~np.isnan(bars[:, CLOSE])]
+
+
+class HistoryStore:
+    """Memory-mapped per-symbol daily bar files with incremental updates."""
+
+    def __init__(self, root=HISTORY_CACHE_DIR, max_open=HISTORY_MMAP_MAX):
+        self.root = root
+        self.max_open = max_open
+        self._mmaps = OrderedDict()
+        self._mmaps_lock = threading.Lock()
+        self._locks = {}
+        self._locks_lock = threading.Lock()
+        self.downloads = 0
+        self.hits = 0
+
+    def _paths(self, symbol):
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', symbol.upper())
+        return os.path.join(self.root, f"{name}.npy"), os.path.join(self.root, f"{name}.json")
+
+    def _lock(self, symbol):
+        with self._locks_lock:
+            return self._locks.setdefault(symbol, threading.Lock())
+
+    def _load(self, symbol):
+        """(bars, meta) from disk with bars memory-mapped, or (None, {})."""
+        data_path, meta_path = self._paths(symbol)
+        try:
+            mtime = os.stat(data_path).st_mtime_ns
+        except FileNotFoundError:
+            return None, {}
+        with self._mmaps_lock:
+            cached = self._mmaps.get(symbol)
+            if cached is not None:
+                self._mmaps.move_to_end(symbol)
+        if cached is None or cached[0] != mtime:
+            bars = np.load(data_path, mmap_mode='r')
+            try:
+                with open(meta_path) as f:
+                    meta = json.load(f)
+            except (OSError, ValueError):
+                meta = {}
+            cached = (mtime, bars, meta)
+            with self._mmaps_lock:
+                self._mmaps[symbol] = cached
+                self._mmaps.move_to_end(symbol)
+                # Dropping the last reference unmaps the file once callers are done with their views
+                while len(self._mmaps) > self.max_open:
+                    self._mmaps.popitem(last=False)
+        return cached[1], cached[2]
+
+    def _save(self, symbol, bars, meta):
+        os.makedirs(self.root, exist_ok=True)
+        data_path, meta_path = self._paths(symbol)
+        # Write beside the target and rename so readers never see a partial file
+        tmp_data = f"{data_path}.{os.getpid()}.tmp.npy"
+        tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+        np.save(tmp_data, np.ascontiguousarray(bars, dtype=np.float64))
+        with open(tmp_meta, 'w') as f:
+            json.dump(meta, f)
+        os.replace(tmp_meta, meta_path)
+        os.replace(tmp_data, data_path)
+        with self._mmaps_lock:
+            self._mmaps.pop(symbol, None)
+
+    def _download(self, symbol, **kwargs):
+        """Daily bars from yfinance as an (n, 6) array, oldest first."""
+        ticker = yf.Ticker(symbol, session=get_session('yfinance'))
+        hist = breakers['yfinance'].call(
+            ticker.history, interval='1d', timeout=get_timeout('yfinance')[1], **kwargs
+        )
+        self.downloads += 1
+        return frame_to_bars(hist)
+
+    def _completed(self, bars, now):
+        """Drop bars for a session that has not closed yet."""
+        closed = _settled_close(now)
+        if closed is None:
+            return bars
+        cutoff = _day_epoch(closed.date())
+        return bars[bars[:, DATE] <= cutoff]
+
+    def _refresh(self, symbol, period, bars, meta):
+        """Bring a symbol's file up to date for period; returns the bars to serve."""
+        now = datetime.now(timezone.utc)
+        start = period_start(period, now)
+        covered_from = meta.get('covered_from')
+
+        if bars is None or covered_from is None or start < covered_from:
+            backfill = _wider(_wider(period, HISTORY_BACKFILL_PERIOD), meta.get('period'))
+            fresh = self._completed(self._download(symbol, period=backfill), now)
+            meta = {'covered_from': period_start(backfill, now), 'period': backfill, 'checked_at': time.time()}
+            self._save(symbol, fresh, meta)
+            print(f"[HISTORY_STORE] Downloaded {len(fresh)} bars for {symbol} ({backfill})")
+            return self._load(symbol)[0]
+
+        closed = _settled_close(now)
+        latest_closed = _day_epoch(closed.date()) if closed else 0
+        last_stored = bars[-1, DATE] if len(bars) else 0
+        if last_stored >= latest_closed or time.time() - meta.get('checked_at', 0) < HISTORY_RECHECK_SECONDS:
+            self.hits += 1
+            return bars
+
+        # Fetch from the last stored bar so the overlap shows whether history was re-adjusted
+        since = datetime.fromtimestamp(last_stored, timezone.utc).date() if len(bars) else now.date()
+        try:
+            new = self._completed(self._download(symbol, start=since.isoformat()), now)
+        except Exception as e:
+            print(f"[HISTORY_STORE] ⚠️ Update of {symbol} failed, serving stored bars: {str(e)}")
+            return bars
+        meta = dict(meta, checked_at=time.time())
+        if len(new) and len(bars):
+            overlap = new[new[:, DATE] == last_stored]
+            if len(overlap) and abs(overlap[0, CLOSE] - bars[-1, CLOSE]) > ADJUSTMENT_TOLERANCE * bars[-1, CLOSE]:
+                print(f"[HISTORY_STORE] {symbol} history was re-adjusted, downloading it again")
+                return self._refresh(symbol, period, None, meta)
+            new = new[new[:, DATE] > last_stored]
+        merged = np.concatenate([bars, new]) if len(new) else np.asarray(bars)
+        self._save(symbol, merged, meta)
+        if len(new):
+            print(f"[HISTORY_STORE] Appended {len(new)} bar(s) to {symbol}")
+        return self._load(symbol)[0]
+
+    def get_with_lookback(self, symbol, period='1y'):
+        """(every stored bar, index of the first bar in period).
+
+        Indicators computed over the whole file and then sliced at the index
+        have a stable starting point and no warm-up gap inside the period.
+        """
+        with self._lock(symbol):
+            bars = self._refresh(symbol, period, *self._load(symbol))
+        if bars is None or not len(bars):
+            return bars, 0
+        if period in PERIOD_BARS:
+            return bars, max(len(bars) - PERIOD_BARS[period], 0)
+        return bars, int(np.searchsorted(bars[:, DATE], period_start(period), side='left'))
+
+    def get(self, symbol, period='1y'):
+        """(n, 6) bars for period, oldest first; a read-only view of the mapped file."""
+        bars, start = self.get_with_lookback(symbol, period)
+        return bars if bars is None else bars[start:]
+
+    def stats(self):
+        return {'symbols_open': len(self._mmaps), 'max_open': self.max_open, 'downloads': self.downloads, 'hits': self.hits}
+
+
+history_store = HistoryStore()
@@ -0,0 +1,88 @@
+# src/services/http_clients.py
+"""
+Registry of pooled HTTP clients for market data providers.
+
+Each provider gets one requests.Session per process with a keep-alive
+connection pool sized for that host and explicit connect/read timeouts, so
+repeated quotes skip TCP/TLS setup and a hung upstream cannot pin a worker.
+"""
+
+import os
+import threading
+
+import finnhub
+import requests
+from requests.adapters import HTTPAdapter
+
+# Pool size and (connect, read) timeouts per provider host
+PROVIDER_SETTINGS = {
+    'finnhub': {
+        'pool_maxsize': int(os.environ.get('FINNHUB_POOL_SIZE', 16)),
+        'timeout': (3.05, 8)
+    },
+    'coinbase': {
+        'pool_maxsize': int(os.environ.get('COINBASE_POOL_SIZE', 8)),
+        'timeout': (3.05, 6)
+    },
+    'yfinance': {
+        'pool_maxsize': int(os.environ.get('YFINANCE_POOL_SIZE', 16)),
+        'timeout': (3.05, 15)
+    }
+}
+
+_sessions = {}
+_adapters = {}
+_finnhub_clients = {}
+_lock = threading.Lock()
+
+
+def _get_adapter(provider):
+    adapter = _adapters.get(provider)
+    if adapter is None:
+        settings = PROVIDER_SETTINGS[provider]
+        # Each provider talks to a single host, so one pool of pool_maxsize connections
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings['pool_maxsize'], pool_block=False)
+        _adapters[provider] = adapter
+    return adapter
+
+
+def get_timeout(provider):
+    """(connect, read) timeout tuple for a provider."""
+    return PROVIDER_SETTINGS[provider]['timeout']
+
+
+def get_session(provider):
+    """Shared keep-alive session for a provider."""
+    session = _sessions.get(provider)
+    if session is not None:
+        return session
+
+    with _lock:
+        session = _sessions.get(provider)
+        if session is None:
+            session = requests.Session()
+            adapter = _get_adapter(provider)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+            _sessions[provider] = session
+            print(f"[HTTP_CLIENTS] Created pooled session for {provider}")
+    return session
+
+
+def get_finnhub_client(api_key):
+    """Reusable finnhub.Client for an API key, sharing the Finnhub connection pool."""
+    client = _finnhub_clients.get(api_key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _finnhub_clients.get(api_key)
+        if client is None:
+            client = finnhub.Client(api_key=api_key)
+            # finnhub.Client keeps its own session for the token header; point it at the shared pool
+            adapter = _get_adapter('finnhub')
+            client._session.mount('https://', adapter)
+            client._session.mount('http://', adapter)
+            client.DEFAULT_TIMEOUT = get_timeout('finnhub')
+            _finnhub_clients[api_key] = client
+    return client
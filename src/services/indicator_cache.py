@@ -0,0 +1,218 @@
+# src/services/indicator_cache.py
+"""
+Incremental cache of indicator series per symbol.
+
+Entries are keyed by (symbol, interval, indicator spec, first bar timestamp)
+and remember the timestamp and values of their last bar. A request whose bars
+end on that same bar is a hit. When new bars have arrived since, only the new
+tail is computed: EMA, RSI and MACD continue from their stored recurrence
+state, and windowed indicators (SMA, Bollinger, VWAP) are recomputed over the
+last window of bars. An intraday bar that is still forming changes on every
+tick; entries also keep the recurrence state from before their last bar, so
+that bar is rewound and recomputed in place. If an older bar no longer
+matches (history was re-adjusted) the series is recomputed from scratch.
+
+Entries live in process memory as NumPy arrays and the least recently used
+ones are evicted once their total size passes INDICATOR_CACHE_BYTES.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from services import indicators as ind
+from services.history_store import DATE, HIGH, LOW, CLOSE, VOLUME
+
+INDICATOR_CACHE_BYTES = int(os.environ.get('INDICATOR_CACHE_BYTES', 64 * 1024 * 1024))
+
+
+def _output_keys(name, key):
+    if name == 'macd':
+        return [key, f"{key}_signal", f"{key}_hist"]
+    if name == 'bollinger':
+        return [f"{key}_high", f"{key}_mid", f"{key}_low"]
+    return [key]
+
+
+def _states(series, before=None):
+    """(state at the last bar, state at the bar before it) from recurrence series.
+
+    before is the state preceding the first value, for series that only cover
+    newly added bars; None when there is no earlier bar.
+    """
+    last = {name: values[-1] for name, values in series.items()}
+    if not series:
+        return last, {}
+    if len(next(iter(series.values()))) > 1:
+        return last, {name: values[-2] for name, values in series.items()}
+    return last, before
+
+
+def _compute(name, params, close, high, low, volume):
+    """(outputs, (state, previous state)) for a whole series."""
+    key = ind.spec_key(name, params)
+    if name == 'ema':
+        values = ind.ema(close, params[0])
+        return {key: values}, _states({'ema': values})
+    if name == 'rsi':
+        avg_up, avg_down = ind.rsi_averages(close, params[0])
+        return {key: ind.rsi_from_averages(avg_up, avg_down)}, _states({'up': avg_up, 'down': avg_down})
+    if name == 'macd':
+        fast, slow, signal = params
+        fast_ema = ind.ema(close, fast)
+        slow_ema = ind.ema(close, slow)
+        line, signal_line, hist = ind.macd(close, fast, slow, signal, fast_ema, slow_ema)
+        states = _states({'fast': fast_ema, 'slow': slow_ema, 'signal': signal_line})
+        return dict(zip(_output_keys(name, key), (line, signal_line, hist))), states
+    return ind.compute_indicators(close, [(name, params)], high, low, volume), ({}, {})
+
+
+def _window(name, params):
+    """Bars of history a windowed indicator needs before the first new bar."""
+    return {'sma': params[0], 'bollinger': params[0], 'vwap': params[0]}.get(name, 0)
+
+
+def _extend(name, params, state, close, high, low, volume, start):
+    """(outputs for bars[start:], (state, previous state)) continuing from state at bar start - 1."""
+    key = ind.spec_key(name, params)
+    new = close[start:]
+    if name == 'ema':
+        values = ind.ewm_extend(state['ema'], new, 2.0 / (params[0] + 1))
+        return {key: values}, _states({'ema': values}, state)
+    if name == 'rsi':
+        values, up, down = ind.rsi_extend(close[start - 1], state['up'], state['down'], new, params[0])
+        return {key: values}, _states({'up': up, 'down': down}, state)
+    if name == 'macd':
+        fast, slow, signal = params
+        fast_ema = ind.ewm_extend(state['fast'], new, 2.0 / (fast + 1))
+        slow_ema = ind.ewm_extend(state['slow'], new, 2.0 / (slow + 1))
+        line = fast_ema - slow_ema
+        signal_line = ind.ewm_extend(state['signal'], line, 2.0 / (signal + 1))
+        states = _states({'fast': fast_ema, 'slow': slow_ema, 'signal': signal_line}, state)
+        return dict(zip(_output_keys(name, key), (line, signal_line, line - signal_line))), states
+
+    # Windowed indicators only look back one window, so recompute over that tail
+    begin = max(start - _window(name, params) + 1, 0)
+    tail = lambda values: None if values is None else values[begin:]
+    outputs = ind.compute_indicators(tail(close), [(name, params)], tail(high), tail(low), tail(volume))
+    return {out: values[start - begin:] for out, values in outputs.items()}, ({}, {})
+
+
+def _bar(i, close, high, low, volume):
+    """Values of bar i that indicators read, to tell whether a cached bar changed."""
+    return tuple(None if values is None else float(values[i]) for values in (close, high, low, volume))
+
+
+class IndicatorCache:
+    """LRU of per-symbol indicator series bounded by total array size."""
+
+    def __init__(self, max_bytes=INDICATOR_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self._stats = {'hits': 0, 'extended': 0, 'updated': 0, 'computed': 0, 'evictions': 0}
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def _store(self, key, entry):
+        entry['bytes'] = sum(values.nbytes for values in entry['outputs'].values())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old['bytes']
+            self._entries[key] = entry
+            self._bytes += entry['bytes']
+            while self._bytes > self.max_bytes and len(self._entries) > 1:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted['bytes']
+                self._stats['evictions'] += 1
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _series(self, symbol, interval, spec, ts, close, high, low, volume):
+        name, params = ind.parse_spec(spec) if isinstance(spec, str) else spec
+        n = len(close)
+        key = (symbol, interval, ind.spec_key(name, params), float(ts[0]))
+        entry = self._lookup(key)
+
+        if entry is not None:
+            cached = entry['length']
+            # The cached series must be a prefix of these bars, ending on the same bar
+            if cached <= n and ts[cached - 1] == entry['last_ts']:
+                if _bar(cached - 1, close, high, low, volume) == entry['last_bar']:
+                    if cached == n:
+                        self._count('hits')
+                        return entry['outputs']
+                    start, state, stat = cached, entry['state'], 'extended'
+                else:
+                    # The last cached bar was still forming: rewind it and compute it again
+                    start, state, stat = cached - 1, entry['prev_state'], 'updated'
+                warm = state is not None and start > 0 and all(
+                    np.isfinite(values[start - 1]) for values in entry['outputs'].values()
+                )
+                if warm:
+                    tail, (state, prev_state) = _extend(name, params, state, close, high, low, volume, start)
+                    outputs = {
+                        out: np.concatenate([entry['outputs'][out][:start], tail[out]])
+                        for out in entry['outputs']
+                    }
+                    self._store(key, self._entry(outputs, state, prev_state, ts, close, high, low, volume))
+                    self._count(stat)
+                    return outputs
+
+        outputs, (state, prev_state) = _compute(name, params, close, high, low, volume)
+        self._store(key, self._entry(outputs, state, prev_state, ts, close, high, low, volume))
+        self._count('computed')
+        return outputs
+
+    @staticmethod
+    def _entry(outputs, state, prev_state, ts, close, high, low, volume):
+        return {
+            'outputs': outputs, 'state': state, 'prev_state': prev_state, 'length': len(close),
+            'last_ts': ts[-1], 'last_bar': _bar(-1, close, high, low, volume)
+        }
+
+    def get(self, symbol, interval, ts, close, specs, high=None, low=None, volume=None):
+        """{output name: array aligned with ts} for every spec, as compute_indicators returns.
+
+        ts holds bar timestamps (epoch seconds), oldest first. Returned arrays are
+        shared with the cache and must not be modified.
+        """
+        if len(close) == 0:
+            return ind.compute_indicators(close, specs, high, low, volume)
+        ts = np.asarray(ts, dtype=np.float64)
+        close = ind.as_series(close)
+        high, low, volume = (None if values is None else ind.as_series(values) for values in (high, low, volume))
+        results = {}
+        for spec in specs:
+            results.update(self._series(symbol, interval, spec, ts, close, high, low, volume))
+        return results
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries), bytes=self._bytes, max_bytes=self.max_bytes)
+
+
+indicator_cache = IndicatorCache()
+
+
+def bar_indicators(symbol, timeframe, bars, start, specs):
+    """Indicators over (n, 6) bars, sliced to the bars from start on."""
+    if bars is None or not len(bars):
+        return {}
+    outputs = indicator_cache.get(
+        symbol, timeframe, bars[:, DATE], bars[:, CLOSE], specs,
+        high=bars[:, HIGH], low=bars[:, LOW], volume=bars[:, VOLUME]
+    )
+    return {name: values[start:] for name, values in outputs.items()}
+
@@ -0,0 +1,287 @@
+# src/services/indicators.py
+"""
+Vectorized technical indicators on float64 NumPy arrays.
+
+Every function accepts a 1-D series or a 2-D (symbols, bars) array and works
+along the last axis, so one call prices an indicator for many symbols at
+once. Rows of different lengths are left-padded with NaN. Output values
+follow the `ta` package with fillna=False: the same warm-up NaNs and the same
+recurrences, to floating-point rounding (see benchmark_indicators.py).
+
+Rolling windows come from prefix sums. EMAs are evaluated in fixed-size
+blocks: inside a block the recurrence is a small matrix product, and only the
+carry between blocks is sequential, so a year of bars is a handful of matmuls
+instead of a Python loop per bar.
+
+compute_indicators() evaluates a list of specs such as 'sma:50' or
+'macd:12,26,9' in one pass, sharing prefix sums and EMAs between them.
+"""
+
+import numpy as np
+
+# Bars per EMA block; the block matrix is EMA_BLOCK x EMA_BLOCK
+EMA_BLOCK = 64
+
+# Indicator name -> default parameters, in the order they are written in a spec
+DEFAULT_PARAMS = {
+    'sma': (20,),
+    'ema': (20,),
+    'rsi': (14,),
+    'macd': (12, 26, 9),
+    'bollinger': (20, 2),
+    'vwap': (14,)
+}
+
+
+def as_series(values):
+    """Contiguous float64 copy-free view where possible."""
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _first_valid(x):
+    """Index of the first finite value along the last axis (length if none)."""
+    finite = np.isfinite(x)
+    first = np.argmax(finite, axis=-1)
+    return np.where(finite.any(axis=-1), first, x.shape[-1])
+
+
+def _positions(x):
+    return np.arange(x.shape[-1])
+
+
+def _row_seed(x, first):
+    """Each row's first finite value, shaped to broadcast along the last axis."""
+    index = np.minimum(first, max(x.shape[-1] - 1, 0))[..., None]
+    return np.take_along_axis(np.where(np.isfinite(x), x, 0.0), index, axis=-1)
+
+
+def rolling_sum(x, window):
+    """Sum of the last `window` values; NaN until a full window of finite values."""
+    x = as_series(x)
+    out = np.full(x.shape, np.nan)
+    if window > x.shape[-1]:
+        return out
+    finite = np.isfinite(x)
+    # Prefix sums with a leading zero so window sums are one subtraction
+    sums = np.zeros(x.shape[:-1] + (x.shape[-1] + 1,))
+    np.cumsum(np.where(finite, x, 0.0), axis=-1, out=sums[..., 1:])
+    counts = np.zeros(sums.shape, dtype=np.int64)
+    np.cumsum(finite, axis=-1, out=counts[..., 1:])
+    total = sums[..., window:] - sums[..., :-window]
+    full = (counts[..., window:] - counts[..., :-window]) == window
+    out[..., window - 1:] = np.where(full, total, np.nan)
+    return out
+
+
+def sma(x, window):
+    """Simple moving average (ta SMAIndicator)."""
+    return rolling_sum(x, window) / window
+
+
+def rolling_std(x, window):
+    """Population standard deviation over the last `window` values (pandas std(ddof=0))."""
+    x = as_series(x)
+    if x.shape[-1] == 0:
+        return x.copy()
+    # Center on each row's first value so the sum of squares does not lose precision
+    centered = x - _row_seed(x, _first_valid(x))
+    mean = rolling_sum(centered, window) / window
+    mean_sq = rolling_sum(centered * centered, window) / window
+    return np.sqrt(np.maximum(mean_sq - mean * mean, 0.0))
+
+
+_weights_cache = {}
+
+
+def _block_weights(alpha, block):
+    """(transposed block matrix, carry weights) for one smoothing factor, memoized."""
+    key = (alpha, block)
+    if key not in _weights_cache:
+        # Within a block: y[j] = decay**(j+1) * carry + alpha * sum_k decay**(j-k) * x[k]
+        decay = 1.0 - alpha
+        j = np.arange(block)
+        lags = j[:, None] - j[None, :]
+        weights = np.where(lags >= 0, alpha * decay ** np.maximum(lags, 0), 0.0)
+        _weights_cache[key] = (np.ascontiguousarray(weights.T), decay ** (j + 1))
+    return _weights_cache[key]
+
+
+def _ema_blocks(x, alpha):
+    """adjust=False EMA along the last axis of a NaN-free array, seeded with x[..., 0]."""
+    n = x.shape[-1]
+    block = EMA_BLOCK
+    blocks = -(-n // block)
+    padded = np.zeros(x.shape[:-1] + (blocks * block,))
+    padded[..., :n] = x
+    padded = padded.reshape(x.shape[:-1] + (blocks, block))
+
+    weights, carry_weights = _block_weights(alpha, block)
+    partial = padded @ weights
+
+    out = np.empty_like(partial)
+    carry = x[..., 0]
+    for b in range(blocks):
+        out[..., b, :] = partial[..., b, :] + carry[..., None] * carry_weights
+        carry = out[..., b, -1]
+    return out.reshape(x.shape[:-1] + (blocks * block,))[..., :n]
+
+
+def ewm_mean(x, alpha, min_periods):
+    """pandas ewm(alpha=alpha, adjust=False, min_periods=min_periods).mean() for
+    series that are finite after their leading NaNs."""
+    x = as_series(x)
+    if x.shape[-1] == 0:
+        return x.copy()
+    first = _first_valid(x)
+    # Seed each row's recurrence with its first finite value by back-filling the padding
+    filled = np.where(_positions(x) < first[..., None], _row_seed(x, first), x)
+    filled = np.where(np.isfinite(filled), filled, 0.0)
+    out = _ema_blocks(filled, alpha)
+    out[_positions(x) < (first + max(min_periods, 1) - 1)[..., None]] = np.nan
+    return out
+
+
+def ema(x, window):
+    """Exponential moving average (ta EMAIndicator)."""
+    return ewm_mean(x, 2.0 / (window + 1), window)
+
+
+def ewm_extend(last, values, alpha):
+    """Continue an adjust=False EMA whose latest value is `last` over new values."""
+    values = as_series(values)
+    if values.shape[-1] == 0:
+        return values.copy()
+    # Seeding the block recurrence with `last` makes its first output `last` itself
+    seeded = np.concatenate([np.asarray(last, dtype=np.float64)[..., None], values], axis=-1)
+    return _ema_blocks(seeded, alpha)[..., 1:]
+
+
+def rsi_from_averages(avg_up, avg_down):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        value = 100.0 - 100.0 / (1.0 + avg_up / avg_down)
+    return np.where(avg_down == 0, 100.0, value)
+
+
+def rsi_averages(close, window=14):
+    """Wilder-smoothed (average gain, average loss) series behind rsi()."""
+    close = as_series(close)
+    diff = np.diff(close, axis=-1, prepend=np.nan)
+    # ta turns the undefined first difference into 0 for both directions
+    first = _first_valid(close)
+    at_first = _positions(close) == first[..., None]
+    diff = np.where(at_first, 0.0, diff)
+    up = np.where(diff > 0, diff, np.where(np.isnan(diff), np.nan, 0.0))
+    down = np.where(diff < 0, -diff, np.where(np.isnan(diff), np.nan, 0.0))
+    return ewm_mean(up, 1.0 / window, window), ewm_mean(down, 1.0 / window, window)
+
+
+def rsi(close, window=14):
+    """Wilder's relative strength index (ta RSIIndicator)."""
+    return rsi_from_averages(*rsi_averages(close, window))
+
+
+def rsi_extend(last_close, avg_up, avg_down, closes, window=14):
+    """(rsi, avg_up, avg_down) for new closes, continuing from the previous averages."""
+    closes = as_series(closes)
+    diff = np.diff(closes, prepend=last_close)
+    up = ewm_extend(avg_up, np.where(diff > 0, diff, 0.0), 1.0 / window)
+    down = ewm_extend(avg_down, np.where(diff < 0, -diff, 0.0), 1.0 / window)
+    return rsi_from_averages(up, down), up, down
+
+
+def macd(close, fast=12, slow=26, signal=9, fast_ema=None, slow_ema=None):
+    """(macd, signal, histogram) as in ta's MACD; precomputed EMAs may be passed in."""
+    fast_ema = ema(close, fast) if fast_ema is None else fast_ema
+    slow_ema = ema(close, slow) if slow_ema is None else slow_ema
+    line = fast_ema - slow_ema
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger(close, window=20, window_dev=2, mid=None):
+    """(upper, middle, lower) Bollinger bands (ta BollingerBands)."""
+    mid = sma(close, window) if mid is None else mid
+    width = window_dev * rolling_std(close, window)
+    return mid + width, mid, mid - width
+
+
+def vwap(high, low, close, volume, window=14):
+    """Rolling volume-weighted average of the typical price (ta VolumeWeightedAveragePrice)."""
+    volume = as_series(volume)
+    typical = (as_series(high) + as_series(low) + as_series(close)) / 3.0
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return rolling_sum(typical * volume, window) / rolling_sum(volume, window)
+
+
+def parse_spec(spec):
+    """'macd:12,26,9' -> ('macd', (12, 26, 9)); a bare name takes the defaults."""
+    name, _, params = spec.partition(':')
+    name = name.strip().lower()
+    if name not in DEFAULT_PARAMS:
+        raise ValueError(f"Unknown indicator: {name}")
+    if not params:
+        return name, DEFAULT_PARAMS[name]
+    values = tuple(float(p) if '.' in p else int(p) for p in params.split(','))
+    return name, values + DEFAULT_PARAMS[name][len(values):]
+
+
+def spec_key(name, params):
+    """Output key prefix for an indicator, e.g. 'sma_50' or 'macd_12_26_9'."""
+    return '_'.join([name] + [f"{p:g}" for p in params])
+
+
+def compute_indicators(close, specs, high=None, low=None, volume=None):
+    """{output name: array} for every spec, computed in one pass.
+
+    close (and high/low/volume, needed for vwap) are 1-D series or 2-D
+    (symbols, bars) arrays. Multi-output indicators add suffixes: macd gives
+    '<key>', '<key>_signal' and '<key>_hist'; bollinger gives '<key>_high',
+    '<key>_mid' and '<key>_low'.
+    """
+    close = as_series(close)
+    smas = {}
+    emas = {}
+
+    def _sma(window):
+        if window not in smas:
+            smas[window] = sma(close, window)
+        return smas[window]
+
+    def _ema(window):
+        if window not in emas:
+            emas[window] = ema(close, window)
+        return emas[window]
+
+    results = {}
+    for spec in specs:
+        name, params = parse_spec(spec) if isinstance(spec, str) else spec
+        key = spec_key(name, params)
+        if name == 'sma':
+            results[key] = _sma(params[0])
+        elif name == 'ema':
+            results[key] = _ema(params[0])
+        elif name == 'rsi':
+            results[key] = rsi(close, params[0])
+        elif name == 'macd':
+            fast, slow, signal = params
+            line, signal_line, hist = macd(close, fast, slow, signal, _ema(fast), _ema(slow))
+            results[key] = line
+            results[f"{key}_signal"] = signal_line
+            results[f"{key}_hist"] = hist
+        elif name == 'bollinger':
+            window, window_dev = params
+            upper, middle, lower = bollinger(close, window, window_dev, _sma(window))
+            results[f"{key}_high"] = upper
+            results[f"{key}_mid"] = middle
+            results[f"{key}_low"] = lower
+        elif name == 'vwap':
+            if high is None or low is None or volume is None:
+                raise ValueError("vwap needs high, low and volume")
+            results[key] = vwap(high, low, close, volume, params[0])
+    return results
+
+
+def to_list(values):
+    """JSON-friendly list with NaN warm-up values as None."""
+    values = np.asarray(values, dtype=np.float64)
+    return np.where(np.isfinite(values), values, None).tolist()
@@ -0,0 +1,193 @@
+# src/services/industry_index.py
+"""
+Inverted industry -> symbols and sector -> symbols index over reference data.
+
+The index is built offline, after the nightly reference-data refresh, and
+stored as one Redis key with a Firestore copy for cold starts. Each group's
+symbols are kept in descending market-cap order, so finding a symbol's peers
+is a dictionary lookup plus a slice instead of a Ticker.info call per
+candidate.
+
+Without the nightly task (or before its first run) the first lookup that
+finds no index builds it in the background under a Redis lease, fetching any
+reference records that are missing, and an index older than
+INDEX_MAX_AGE is rebuilt the same way.
+"""
+
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.db import db, redis_client
+from utils.constants import POPULAR_STOCKS
+from services.circuit_breaker import breakers
+from services.reference_data import get_reference, get_references
+from services.screener import screener_universe
+from services.singleflight import RedisLease
+
+INDEX_KEY = 'reference:industry_index'
+INDEX_DOCUMENT = ('reference_index', 'industry')
+# Workers re-read the shared index this often
+INDEX_RELOAD_SECONDS = int(os.environ.get('INDUSTRY_INDEX_RELOAD', 600))
+# Lookups rebuild an index the nightly task has not replaced for this long
+INDEX_MAX_AGE = int(os.environ.get('INDUSTRY_INDEX_MAX_AGE', 36 * 3600))
+# A cold build fetches Ticker.info for every symbol it has no record of
+REBUILD_LEASE_MS = 15 * 60 * 1000
+
+_index = {'data': None, 'loaded_at': 0, 'rebuilding': False}
+_index_lock = threading.Lock()
+_rebuild_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='industry-index')
+
+
+def index_universe():
+    """Popular and screener symbols, the universe lookups build the index over."""
+    return list(dict.fromkeys([stock["symbol"] for stock in POPULAR_STOCKS] + screener_universe()))
+
+
+def build_industry_index(records):
+    """Index dict from {symbol: reference record}."""
+    names = {}
+    caps = {}
+    groups = {'industry': {}, 'sector': {}}
+    for symbol, record in records.items():
+        names[symbol] = record.get('company_name') or symbol
+        caps[symbol] = record.get('market_cap') or 0
+        for field, group in groups.items():
+            value = record.get(field)
+            if value:
+                group.setdefault(value, []).append(symbol)
+
+    for group in groups.values():
+        for value, symbols in group.items():
+            symbols.sort(key=lambda s: (-caps[s], s))
+    return {
+        'industry': groups['industry'],
+        'sector': groups['sector'],
+        'names': names,
+        'market_caps': caps,
+        'built_at': time.time()
+    }
+
+
+def save_industry_index(index):
+    payload = json.dumps(index)
+    try:
+        redis_client.set(INDEX_KEY, payload)
+    except Exception as e:
+        print(f"[INDUSTRY_INDEX] ⚠️ Redis write failed: {str(e)}")
+    try:
+        collection, document = INDEX_DOCUMENT
+        breakers['database'].call(db.collection(collection).document(document).set, {'index': payload})
+    except Exception as e:
+        print(f"[INDUSTRY_INDEX] ⚠️ Could not persist index: {str(e)}")
+    with _index_lock:
+        _index['data'] = index
+        _index['loaded_at'] = time.time()
+
+
+def rebuild_industry_index(symbols, fetch_missing=False):
+    """Build the index from the reference records of symbols and store it.
+
+    The nightly task has just refreshed every record and only reads the
+    cache; fetch_missing=True fetches the records nobody has fetched yet.
+    """
+    records = get_references(symbols, fetch_missing=fetch_missing)
+    index = build_industry_index(records)
+    save_industry_index(index)
+    print(f"[INDUSTRY_INDEX] ✅ Indexed {len(records)} symbols in "
+          f"{len(index['industry'])} industries and {len(index['sector'])} sectors")
+    return index
+
+
+def _load_index():
+    payload = None
+    try:
+        payload = redis_client.get(INDEX_KEY)
+    except Exception as e:
+        print(f"[INDUSTRY_INDEX] ⚠️ Redis read failed: {str(e)}")
+    if not payload:
+        try:
+            collection, document = INDEX_DOCUMENT
+            doc = breakers['database'].call(db.collection(collection).document(document).get)
+            if doc.exists:
+                payload = doc.to_dict().get('index')
+                if payload:
+                    redis_client.set(INDEX_KEY, payload)
+        except Exception as e:
+            print(f"[INDUSTRY_INDEX] ⚠️ Firestore read failed: {str(e)}")
+    try:
+        return json.loads(payload) if payload else None
+    except (TypeError, ValueError):
+        return None
+
+
+def get_industry_index():
+    """The shared index, re-read at most every INDEX_RELOAD_SECONDS; None if never built."""
+    with _index_lock:
+        if _index['data'] is not None and time.time() - _index['loaded_at'] < INDEX_RELOAD_SECONDS:
+            return _index['data']
+    index = _load_index()
+    with _index_lock:
+        # Keep serving the previous copy if the reload came back empty
+        if index is not None or _index['data'] is None:
+            _index['data'] = index
+        _index['loaded_at'] = time.time()
+        return _index['data']
+
+
+def _rebuild_in_background():
+    """Build the index off the request path; one worker at a time holds the lease."""
+    with _index_lock:
+        if _index['rebuilding']:
+            return
+        _index['rebuilding'] = True
+
+    def _rebuild():
+        lease = RedisLease('industry_index:rebuild', ttl_ms=REBUILD_LEASE_MS)
+        try:
+            if lease.acquire():
+                rebuild_industry_index(index_universe(), fetch_missing=True)
+        except Exception as e:
+            print(f"[INDUSTRY_INDEX] ❌ Background rebuild failed: {str(e)}")
+        finally:
+            lease.release()
+            with _index_lock:
+                _index['rebuilding'] = False
+
+    _rebuild_executor.submit(_rebuild)
+
+
+def related_symbols(symbol, limit=5, rank_by_market_cap=True):
+    """Up to limit peers of symbol as [{'symbol', 'name', 'market_cap'}].
+
+    Peers come from the same industry, topped up from the same sector. With
+    rank_by_market_cap the largest companies come first, otherwise peers are
+    ordered alphabetically.
+    """
+    index = get_industry_index()
+    if not index or time.time() - index.get('built_at', 0) >= INDEX_MAX_AGE:
+        _rebuild_in_background()
+    if not index:
+        return []
+    symbol = symbol.upper()
+    record = get_reference(symbol, fetch_missing=False, queue_missing=True) or {}
+
+    peers = []
+    for field in ('industry', 'sector'):
+        for peer in index[field].get(record.get(field), ()):
+            if peer != symbol and peer not in peers:
+                peers.append(peer)
+        if len(peers) >= limit:
+            break
+
+    if rank_by_market_cap:
+        peers = peers[:limit]
+    else:
+        peers = sorted(peers[:limit])
+    return [{
+        'symbol': peer,
+        'name': index['names'].get(peer, peer),
+        'market_cap': index['market_caps'].get(peer)
+    } for peer in peers]
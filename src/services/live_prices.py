@@ -0,0 +1,146 @@
+# src/services/live_prices.py
+"""
+Live last-trade price table fed by the Finnhub WebSocket ingester.
+
+stream_worker.py writes every trade it receives into one Redis hash
+(symbol -> {'price', 'ts', 'volume'}) and publishes it on a pubsub channel.
+The web app reads the hash before making any REST call, so prices for held
+and watched symbols cost no upstream requests while the worker is running.
+
+The worker streams every symbol held in a portfolio or on a watchlist. Routes
+that add a symbol call request_subscription() so streaming starts within
+seconds, without waiting for the worker's next Firestore scan.
+
+Browsers receive the updates from price_stream.py, a separate event-loop
+service, when PRICE_STREAM_URL is set. Pages authenticate to it with a signed
+token carrying the user id, since it does not share the web app's origin or
+session cookie.
+"""
+
+import json
+import os
+import time
+
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+
+from utils.config import Config
+from utils.db import redis_client
+from services.quote_cache import quote_cache
+
+LIVE_PRICES_KEY = os.environ.get('LIVE_PRICES_KEY', 'live:prices')
+LIVE_PRICES_CHANNEL = os.environ.get('LIVE_PRICES_CHANNEL', 'live:prices:updates')
+SUBSCRIPTION_REQUESTS_KEY = 'live:subscription_requests'
+# Requested symbols are dropped after this long; by then the Firestore scan covers them
+SUBSCRIPTION_REQUEST_TTL = int(os.environ.get('LIVE_SUBSCRIPTION_REQUEST_TTL', 3600))
+# Base URL of the price stream service; unset, pages stream from the web app itself
+PRICE_STREAM_URL = os.environ.get('PRICE_STREAM_URL', '')
+# EventSource reconnects with the URL it was given, so a token outlives the page view
+STREAM_TOKEN_MAX_AGE = int(os.environ.get('PRICE_STREAM_TOKEN_MAX_AGE', 12 * 3600))
+
+
+def record_trades(trades, redis=None):
+    """Store the newest trade per symbol and publish each update.
+
+    trades is an iterable of {'symbol', 'price', 'ts', 'volume'} dicts with ts in
+    epoch seconds. Returns the number of symbols updated.
+    """
+    redis = redis if redis is not None else redis_client
+    latest = {}
+    for trade in trades:
+        current = latest.get(trade['symbol'])
+        if current is None or trade['ts'] >= current['ts']:
+            latest[trade['symbol']] = trade
+    if not latest:
+        return 0
+
+    pipe = redis.pipeline(transaction=False)
+    for symbol, trade in latest.items():
+        payload = json.dumps({
+            'symbol': symbol,
+            'price': trade['price'],
+            'ts': trade['ts'],
+            'volume': trade.get('volume', 0)
+        })
+        pipe.hset(LIVE_PRICES_KEY, symbol, payload)
+        pipe.publish(LIVE_PRICES_CHANNEL, payload)
+    pipe.execute()
+    return len(latest)
+
+
+def get_live_price(symbol, max_age=None, redis=None):
+    """Last streamed trade for symbol as {'price', 'ts', 'volume'}, or None.
+
+    Trades older than max_age seconds are ignored.
+    """
+    redis = redis if redis is not None else redis_client
+    try:
+        raw = redis.hget(LIVE_PRICES_KEY, symbol)
+    except Exception:
+        # No Redis (or the dummy fallback): there is no live table to read
+        return None
+    if not raw:
+        return None
+    try:
+        trade = json.loads(raw)
+    except (TypeError, ValueError):
+        return None
+    if max_age is not None and time.time() - trade.get('ts', 0) >= max_age:
+        return None
+    return trade
+
+
+def request_subscription(symbol, redis=None):
+    """Ask the stream worker to start streaming symbol now."""
+    redis = redis if redis is not None else redis_client
+    try:
+        redis.zadd(SUBSCRIPTION_REQUESTS_KEY, {symbol.upper(): time.time()})
+    except Exception as e:
+        print(f"[LIVE_PRICES] ⚠️ Could not request a subscription for {symbol}: {str(e)}")
+
+
+def requested_symbols(redis=None):
+    """Symbols requested through request_subscription() that have not expired."""
+    redis = redis if redis is not None else redis_client
+    cutoff = time.time() - SUBSCRIPTION_REQUEST_TTL
+    try:
+        redis.zremrangebyscore(SUBSCRIPTION_REQUESTS_KEY, '-inf', cutoff)
+        return set(redis.zrange(SUBSCRIPTION_REQUESTS_KEY, 0, -1))
+    except Exception as e:
+        print(f"[LIVE_PRICES] ⚠️ Could not read subscription requests: {str(e)}")
+        return set()
+
+
+def last_known_price(symbol, redis=None):
+    """Last streamed trade, else the cached quote, for a new stream connection; no upstream call."""
+    live = get_live_price(symbol, redis=redis)
+    if live:
+        return live
+    entry = quote_cache.get_entry(symbol)
+    if entry and entry['data'].get('close'):
+        return {'symbol': symbol, 'price': entry['data']['close'], 'ts': entry['as_of'], 'volume': 0}
+    return None
+
+
+def stream_base_url():
+    """PRICE_STREAM_URL with a scheme; Render passes the service's bare host name."""
+    url = PRICE_STREAM_URL.rstrip('/')
+    if url and '://' not in url:
+        url = f"https://{url}"
+    return url
+
+
+def _token_serializer():
+    return URLSafeTimedSerializer(Config.SECRET_KEY, salt='price-stream')
+
+
+def stream_token(user_id):
+    """Signed token that lets user_id open a price stream."""
+    return _token_serializer().dumps(user_id)
+
+
+def read_stream_token(token):
+    """The user id in a stream token, or None if it is forged or expired."""
+    try:
+        return _token_serializer().loads(token, max_age=STREAM_TOKEN_MAX_AGE)
+    except BadSignature:
+        return None
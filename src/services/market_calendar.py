@@ -0,0 +1,224 @@
+# src/services/market_calendar.py
+"""
+US equity market calendar and calendar-aware cache TTLs.
+
+Covers the NYSE/NASDAQ regular session, pre-market and after-hours, exchange
+holidays (with weekend observance) and 1:00 PM early closes. Crypto trades
+24/7 and is kept on its own schedule.
+"""
+
+import os
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+MARKET_TZ = ZoneInfo('America/New_York')
+
+PRE_MARKET_OPEN = time(4, 0)
+REGULAR_OPEN = time(9, 30)
+REGULAR_CLOSE = time(16, 0)
+EARLY_CLOSE = time(13, 0)
+# After-hours trading runs for four hours after the close
+AFTER_HOURS_LENGTH = timedelta(hours=4)
+# Closing prints keep settling for a few minutes after the bell
+CLOSE_SETTLE = timedelta(minutes=15)
+
+# Quote freshness (soft TTL, seconds) by session
+REGULAR_SOFT_TTL = int(os.environ.get('QUOTE_SOFT_TTL', 300))
+EXTENDED_SOFT_TTL = int(os.environ.get('EXTENDED_HOURS_SOFT_TTL', 900))
+CRYPTO_SOFT_TTL = int(os.environ.get('CRYPTO_SOFT_TTL', 60))
+# Hard TTL while quotes are still moving; closed-market entries live until the next open
+OPEN_HARD_TTL = int(os.environ.get('QUOTE_CACHE_TTL', 1800))
+MAX_HARD_TTL = 4 * 24 * 3600
+
+
+def _nth_weekday(year, month, weekday, n):
+    """Date of the nth (1-based) weekday in a month; n=-1 gives the last one."""
+    if n > 0:
+        first = date(year, month, 1)
+        offset = (weekday - first.weekday()) % 7
+        return first + timedelta(days=offset + 7 * (n - 1))
+    last = date(year + (month == 12), month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def _easter(year):
+    """Gregorian Easter Sunday (anonymous Gregorian algorithm)."""
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return date(year, month, day + 1)
+
+
+def _observed(day):
+    """Saturday holidays move to Friday, Sunday holidays to Monday."""
+    if day.weekday() == 5:
+        return day - timedelta(days=1)
+    if day.weekday() == 6:
+        return day + timedelta(days=1)
+    return day
+
+
+@lru_cache(maxsize=16)
+def market_holidays(year):
+    """Full-day exchange closures for a year as {date: name}."""
+    holidays = {}
+
+    # New Year's Day is not moved back into the previous year when it falls on a Saturday
+    new_year = date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays[_observed(new_year)] = "New Year's Day"
+
+    holidays[_nth_weekday(year, 1, 0, 3)] = 'Martin Luther King Jr. Day'
+    holidays[_nth_weekday(year, 2, 0, 3)] = "Washington's Birthday"
+    holidays[_easter(year) - timedelta(days=2)] = 'Good Friday'
+    holidays[_nth_weekday(year, 5, 0, -1)] = 'Memorial Day'
+    if year >= 2022:
+        holidays[_observed(date(year, 6, 19))] = 'Juneteenth'
+    holidays[_observed(date(year, 7, 4))] = 'Independence Day'
+    holidays[_nth_weekday(year, 9, 0, 1)] = 'Labor Day'
+    holidays[_nth_weekday(year, 11, 3, 4)] = 'Thanksgiving Day'
+    holidays[_observed(date(year, 12, 25))] = 'Christmas Day'
+    return holidays
+
+
+@lru_cache(maxsize=16)
+def early_closes(year):
+    """Days the regular session ends at 1:00 PM, as {date: close_time}."""
+    closes = {}
+
+    # The day before Independence Day, when both are regular weekdays
+    july_3 = date(year, 7, 3)
+    if july_3.weekday() < 4:
+        closes[july_3] = EARLY_CLOSE
+
+    closes[_nth_weekday(year, 11, 3, 4) + timedelta(days=1)] = EARLY_CLOSE
+
+    christmas_eve = date(year, 12, 24)
+    if christmas_eve.weekday() < 4:
+        closes[christmas_eve] = EARLY_CLOSE
+    return closes
+
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in market_holidays(day.year)
+
+
+def session_times(day):
+    """(pre_open, open, close, after_close) as aware datetimes, or None on closed days."""
+    if not is_trading_day(day):
+        return None
+    close = early_closes(day.year).get(day, REGULAR_CLOSE)
+    close_dt = datetime.combine(day, close, MARKET_TZ)
+    return (
+        datetime.combine(day, PRE_MARKET_OPEN, MARKET_TZ),
+        datetime.combine(day, REGULAR_OPEN, MARKET_TZ),
+        close_dt,
+        close_dt + AFTER_HOURS_LENGTH
+    )
+
+
+def _now(now=None):
+    if now is None:
+        return datetime.now(MARKET_TZ)
+    if now.tzinfo is None:
+        now = now.replace(tzinfo=MARKET_TZ)
+    return now.astimezone(MARKET_TZ)
+
+
+def market_status(now=None):
+    """'open', 'pre_market', 'after_hours' or 'closed' for US equities."""
+    now = _now(now)
+    times = session_times(now.date())
+    if times is None:
+        return 'closed'
+    pre_open, open_dt, close_dt, after_close = times
+    if open_dt <= now < close_dt:
+        return 'open'
+    if pre_open <= now < open_dt:
+        return 'pre_market'
+    if close_dt <= now < after_close:
+        return 'after_hours'
+    return 'closed'
+
+
+def is_market_open(now=None):
+    return market_status(now) == 'open'
+
+
+def next_open(now=None):
+    """Start of the next regular session strictly after now."""
+    now = _now(now)
+    day = now.date()
+    for _ in range(15):
+        times = session_times(day)
+        if times and times[1] > now:
+            return times[1]
+        day += timedelta(days=1)
+    return None
+
+
+def last_close(now=None):
+    """End of the most recent regular session at or before now."""
+    now = _now(now)
+    day = now.date()
+    for _ in range(15):
+        times = session_times(day)
+        if times and times[2] <= now:
+            return times[2]
+        day -= timedelta(days=1)
+    return None
+
+
+def is_crypto_symbol(symbol):
+    """Crypto symbols are passed as CRYPTO:BTC or BTC-USD."""
+    symbol = (symbol or '').upper()
+    return symbol.startswith('CRYPTO:') or symbol.endswith('-USD')
+
+
+def quote_soft_ttl(symbol=None, now=None):
+    """How old a cached quote may be before it should be refreshed.
+
+    During the session quotes go stale quickly; once the close has settled a
+    quote fetched afterwards stays fresh until the next pre-market.
+    """
+    if is_crypto_symbol(symbol):
+        return CRYPTO_SOFT_TTL
+
+    now = _now(now)
+    status = market_status(now)
+    if status == 'open':
+        return REGULAR_SOFT_TTL
+    if status in ('pre_market', 'after_hours'):
+        return EXTENDED_SOFT_TTL
+
+    settled = last_close(now)
+    if settled is None:
+        return EXTENDED_SOFT_TTL
+    settled += CLOSE_SETTLE
+    if now < settled:
+        return EXTENDED_SOFT_TTL
+    # Anything fetched after the close settled is as good as it gets until trading resumes
+    return max(EXTENDED_SOFT_TTL, int((now - settled).total_seconds()))
+
+
+def quote_hard_ttl(symbol=None, now=None):
+    """How long a quote written now may be kept at all."""
+    if is_crypto_symbol(symbol):
+        return OPEN_HARD_TTL
+
+    now = _now(now)
+    if market_status(now) != 'closed':
+        return OPEN_HARD_TTL
+    upcoming = next_open(now)
+    if upcoming is None:
+        return OPEN_HARD_TTL
+    until_open = int((upcoming - now).total_seconds()) + OPEN_HARD_TTL
+    return min(MAX_HARD_TTL, max(OPEN_HARD_TTL, until_open))
@@ -1,21 +1,57 @@
 # src/services/market_data.py
-import finnhub
-import requests
-from datetime import datetime, timedelta
+from datetime import datetime, timezone
 import pandas as pd
 from utils.constants import api_keys
 from utils.db import db
-import random
+from services.quote_cache import quote_cache
+from services.singleflight import SingleFlight, RedisLease, wait_for
+from services.rate_limiter import TokenBucketLimiter
+from services.http_clients import get_finnhub_client, get_session, get_timeout
+from services.market_calendar import quote_soft_ttl, quote_hard_ttl, market_status, is_crypto_symbol, MARKET_TZ
+from services.crypto_quotes import fetch_crypto_quotes, crypto_quotes
+from services.live_prices import get_live_price
+from services.price_hub import price_hub
+from services.tick_store import tick_store
+from services.history_store import history_store
+from services.quote_persistence import quote_store
+from services.reference_data import reference_stats
+from services.indicator_cache import indicator_cache
+from services.resample import resample_stats
+from services.chart_specs import chart_spec_stats
+from services.circuit_breaker import breakers, CircuitOpenError, OPEN, HALF_OPEN
 import yfinance as yf
 from google.cloud import firestore
 import traceback
 import time
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Cache for API call results to reduce redundant calls
-_price_cache = {}
-# Track API call times to prevent rate limiting
-_last_call_time = {}
+# Upper bound on concurrent provider calls made by a single batch quote request
+MAX_QUOTE_WORKERS = int(os.environ.get('MAX_QUOTE_WORKERS', 8))
+# Extra grouped downloads for symbols missing from a batch history download
+HISTORY_BATCH_RETRIES = int(os.environ.get('HISTORY_BATCH_RETRIES', 1))
+# Parallel yfinance requests in one batch history download
+HISTORY_DOWNLOAD_THREADS = int(os.environ.get('HISTORY_DOWNLOAD_THREADS', 8))
+# How long one worker may hold the cross-process fetch lease for a symbol
+QUOTE_LEASE_MS = int(os.environ.get('QUOTE_LEASE_MS', 5000))
+# Finnhub's free tier allows 60 calls per minute per API key
+FINNHUB_CALLS_PER_MINUTE = int(os.environ.get('FINNHUB_CALLS_PER_MINUTE', 60))
+
+# A quote older than its soft TTL (see services.market_calendar) is refreshed; in
+# 'swr' mode it is still served until its hard TTL expires it
+QUOTE_SERVING_MODE = os.environ.get('QUOTE_SERVING_MODE', 'swr')  # 'swr' or 'blocking'
+
+_quote_flight = SingleFlight()
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='quote-refresh')
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_swr_stats = {'stale_served': 0, 'background_refreshes': 0, 'live_served': 0}
+finnhub_limiter = TokenBucketLimiter(
+    'finnhub',
+    capacity=FINNHUB_CALLS_PER_MINUTE,
+    refill_per_sec=FINNHUB_CALLS_PER_MINUTE / 60.0
+)
 
 def get_api_key_index(api_key):
     """Get the index of the given API key in the api_keys list."""
@@ -27,111 +63,259 @@ def get_api_key_index(api_key):
     except ValueError:
         return -1
 
-def get_random_api_key():
-    """Select a random API key from the list with basic load balancing."""
+def acquire_api_key(api_key=None):
+    """Take one Finnhub call from the key with the most quota left.
+    
+    If api_key is given only that key is considered. Returns None without
+    waiting when every candidate key is out of tokens, so callers can fall
+    through to the next provider instead of blocking the worker.
+    """
     if not api_keys or len(api_keys) == 0:
         print("\n[MARKET_DATA] ⚠️ No Finnhub API keys available - FALLING BACK TO ALTERNATIVE SOURCES ⚠️")
         return None
     
-    # Select key with least recent usage if we have timing data
-    if len(_last_call_time) > 0 and len(_last_call_time) == len(api_keys):
-        # Find the least recently used key
-        selected_key = min(_last_call_time.items(), key=lambda x: x[1])[0]
-    else:
-        # Otherwise just pick randomly
-        selected_key = random.choice(api_keys)
-    
-    # Update the last call time for this key
-    _last_call_time[selected_key] = time.time()
-    
-    key_index = api_keys.index(selected_key)
+    candidates = [api_key] if api_key else list(api_keys)
+    selected_key = finnhub_limiter.acquire(candidates)
+    if not selected_key:
+        print(f"[MARKET_DATA] ⚠️ Finnhub quota exhausted on {len(candidates)} key(s), skipping Finnhub")
+        return None
     
-    # Create a emphasized visible log entry with the key details
-    print("\n" + "="*50)
-    print(f"[MARKET_DATA] SELECTED API KEY #{key_index + 1} OF {len(api_keys)}")
+    key_index = get_api_key_index(selected_key)
     masked_key = f"{selected_key[:4]}...{selected_key[-4:]}" if len(selected_key) > 8 else "****"
-    print(f"[MARKET_DATA] KEY: {masked_key}")
-    print("="*50 + "\n")
+    print(f"[MARKET_DATA] Selected API key #{key_index + 1} of {len(api_keys)}: {masked_key}")
     
     return selected_key
 
-def fetch_stock_data(symbol, api_key=None, force_refresh=False):
-    """Fetch stock data with multiple API sources for reliability."""
-    cache_key = f"{symbol}:{api_key if api_key else 'default'}"
-    current_time = time.time()
+def fetch_stock_data(symbol, api_key=None, force_refresh=False, allow_stale=None):
+    """Fetch stock data with multiple API sources for reliability.
     
-    # Check cache first
-    if not force_refresh and cache_key in _price_cache:
-        cache_entry = _price_cache[cache_key]
-        if current_time - cache_entry['timestamp'] < 300:  # 5 minutes cache
+    In stale-while-revalidate mode (allow_stale, defaulting to QUOTE_SERVING_MODE)
+    a quote past its soft TTL is returned immediately and refreshed in the
+    background; only a quote past the hard TTL forces a blocking fetch. Both
+    TTLs follow the market calendar, so closed-market quotes live much longer.
+    Every result carries 'as_of' (ISO timestamp of the quote) and 'stale'.
+    """
+    if allow_stale is None:
+        allow_stale = QUOTE_SERVING_MODE == 'swr'
+    
+    if is_crypto_symbol(symbol):
+        # Crypto is priced from one shared, short-lived Coinbase rates table
+        return fetch_crypto_quotes([symbol])[symbol]
+    
+    if not force_refresh:
+        # Symbols streamed by stream_worker.py are priced from the live trade table
+        live = live_quote(symbol)
+        if live is not None:
+            print(f"[MARKET_DATA] Using live streamed price for {symbol}")
+            return live
+        
+        # Then the shared two-tier cache (in-process LRU, then Redis)
+        entry = quote_cache.get_entry(symbol, max_age=quote_soft_ttl(symbol))
+        if entry is not None:
             print(f"[MARKET_DATA] Using cached data for {symbol}")
-            return cache_entry['data']
+            return _with_freshness(entry['data'], entry['as_of'], False)
+        
+        if allow_stale:
+            entry = quote_cache.get_entry(symbol)
+            if entry is not None:
+                print(f"[MARKET_DATA] Serving stale data for {symbol}, refreshing in background")
+                _swr_stats['stale_served'] += 1
+                _refresh_in_background(symbol)
+                return _with_freshness(entry['data'], entry['as_of'], True)
     
+    # Concurrent misses for the same symbol share a single upstream fetch
+    return _quote_flight.do(symbol, lambda: _fetch_with_lease(symbol, api_key, force_refresh))
+
+def live_quote(symbol):
+    """Quote from the streamed last trade merged with today's cached reference fields.
+    
+    The stream only carries trade prices, so open/high/low/prev_close come from the
+    last REST quote cached for the same market day. Returns None when there is no
+    recent trade or no usable reference quote.
+    """
+    trade = get_live_price(symbol, max_age=quote_soft_ttl(symbol))
+    if trade is None:
+        return None
+    entry = quote_cache.get_entry(symbol)
+    if entry is None:
+        return None
+    # Yesterday's reference would carry the wrong prev_close and day range
+    today = datetime.now(MARKET_TZ).date()
+    if datetime.fromtimestamp(entry['as_of'], MARKET_TZ).date() != today:
+        return None
+    
+    price = float(trade['price'])
+    data = dict(entry['data'])
+    data['close'] = price
+    if data.get('high'):
+        data['high'] = max(data['high'], price)
+    if data.get('low'):
+        data['low'] = min(data['low'], price)
+    data['source'] = 'finnhub_ws'
+    _swr_stats['live_served'] += 1
+    return _with_freshness(data, max(trade['ts'], entry['as_of']), False)
+
+def _with_freshness(data, as_of, stale):
+    """Copy a quote and tag it with when it was fetched and whether it is stale."""
+    result = dict(data)
+    result['as_of'] = datetime.utcfromtimestamp(as_of).isoformat() + 'Z' if as_of else None
+    result['stale'] = stale
+    return result
+
+def _as_of_epoch(as_of):
+    """Epoch seconds of an ISO 'as_of' tag written by _with_freshness; 0 if missing."""
+    if not as_of:
+        return 0.0
+    return datetime.fromisoformat(as_of.rstrip('Z')).replace(tzinfo=timezone.utc).timestamp()
+
+def _persist(symbol, quote):
+    """Queue a fetched quote for write-behind into stock_prices and pass it through."""
+    try:
+        quote_store.record(symbol, quote)
+    except Exception as e:
+        print(f"[MARKET_DATA] ⚠️ Could not queue {symbol} for persistence: {str(e)}")
+    return quote
+
+def _read_fresh_snapshot(symbol):
+    """Warm the cache from the persisted snapshot if it is within the soft TTL."""
+    if breakers['database'].state == OPEN:
+        return None
+    try:
+        stored = breakers['database'].call(quote_store.read, symbol)
+        if not stored or not stored.get('as_of') or not stored.get('close'):
+            return None
+        as_of = _as_of_epoch(stored['as_of'])
+        if time.time() - as_of >= quote_soft_ttl(symbol):
+            return None
+    except Exception as e:
+        print(f"[MARKET_DATA] ⚠️ Snapshot read failed for {symbol}: {str(e)}")
+        return None
+    
+    data = {field: stored.get(field) for field in ('open', 'high', 'low', 'prev_close', 'close', 'source')}
+    data['symbol'] = symbol
+    entry = quote_cache.set(symbol, data, ttl=quote_hard_ttl(symbol), as_of=as_of)
+    print(f"[MARKET_DATA] Using persisted snapshot for {symbol}")
+    return _with_freshness(data, entry['as_of'], False)
+
+def _refresh_in_background(symbol):
+    """Queue one background refresh per symbol; duplicates are dropped."""
+    with _refresh_lock:
+        if symbol in _refreshing:
+            return
+        _refreshing.add(symbol)
+    
+    def _refresh():
+        try:
+            _quote_flight.do(symbol, lambda: _fetch_with_lease(symbol, None, True))
+            _swr_stats['background_refreshes'] += 1
+        except Exception as e:
+            print(f"[MARKET_DATA] ❌ Background refresh failed for {symbol}: {str(e)}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(symbol)
+    
+    _refresh_executor.submit(_refresh)
+
+def _fetch_with_lease(symbol, api_key=None, force_refresh=False):
+    """Fetch a quote while holding a short Redis lease so other workers wait for it."""
+    lease = RedisLease(f"quote:{symbol}", ttl_ms=QUOTE_LEASE_MS)
+    if not lease.acquire():
+        # Another worker is already fetching this symbol; wait for it to land in L2
+        print(f"[MARKET_DATA] Waiting on another worker's fetch for {symbol}")
+        soft_ttl = quote_soft_ttl(symbol)
+        entry = wait_for(lambda: quote_cache.get_entry(symbol, max_age=soft_ttl), QUOTE_LEASE_MS / 1000.0)
+        if entry is not None:
+            return _with_freshness(entry['data'], entry['as_of'], False)
+        print(f"[MARKET_DATA] ⚠️ Lease wait timed out for {symbol}, fetching directly")
+    
+    try:
+        if not force_refresh and lease.acquired:
+            # The previous lease holder may have just filled the cache
+            entry = quote_cache.get_entry(symbol, max_age=quote_soft_ttl(symbol))
+            if entry is not None:
+                return _with_freshness(entry['data'], entry['as_of'], False)
+            # After a restart the persisted snapshot is often still fresh enough to serve
+            snapshot = _read_fresh_snapshot(symbol)
+            if snapshot is not None:
+                return snapshot
+        return _fetch_from_providers(symbol, api_key)
+    finally:
+        lease.release()
+
+def parse_finnhub_quote(symbol, data):
+    """Validate a raw Finnhub /quote payload and convert it to our quote dict, or None."""
+    # Validate the response data thoroughly
+    if not isinstance(data, dict) or 'c' not in data:
+        print(f"[MARKET_DATA] ⚠️ Invalid response format for {symbol}: {data}")
+        return None
+    
+    current_price = float(data['c'] or 0)
+    prev_close = float(data.get('pc') or current_price)
+    
+    # Additional validation to ensure prices are reasonable
+    if current_price <= 0 or prev_close <= 0:
+        print(f"[MARKET_DATA] ⚠️ Invalid price values for {symbol}: {data}")
+        return None
+    
+    return {
+        'symbol': symbol,
+        'open': float(data.get('o') or current_price),
+        'high': float(data.get('h') or current_price),
+        'low': float(data.get('l') or current_price),
+        'prev_close': prev_close,
+        'close': current_price,
+        'source': 'finnhub'
+    }
+
+def store_quote(symbol, result):
+    """Cache and persist a freshly fetched quote and return it tagged as fresh."""
+    entry = quote_cache.set(symbol, result, ttl=quote_hard_ttl(symbol))
+    tick_store.append(symbol, entry['as_of'], result.get('close'))
+    print(f"[MARKET_DATA] ✅ Successfully fetched {symbol} price from {result['source']}: ${result['close']}")
+    return _persist(symbol, _with_freshness(result, entry['as_of'], False))
+
+def handle_finnhub_error(symbol, api_key, error):
+    """Drain or retire an API key depending on how Finnhub rejected it."""
+    print(f"[MARKET_DATA] ❌ Finnhub error for {symbol}: {str(error)}")
+    if getattr(error, 'status_code', None) == 429 and api_key:
+        # Finnhub says this key is over quota; stop drawing on it until it refills
+        finnhub_limiter.drain(api_key)
+    if "Invalid API key" in str(error):
+        # Remove invalid key if possible
+        if api_key in api_keys and len(api_keys) > 1:
+            api_keys.remove(api_key)
+            print(f"[MARKET_DATA] Removed invalid API key. {len(api_keys)} keys remaining.")
+
+def _fetch_from_providers(symbol, api_key=None):
+    """Walk the provider fallback chain (Finnhub, yfinance, database) for one symbol."""
     print(f"\n[MARKET_DATA] Fetching fresh data for {symbol}")
     
     # Try Finnhub first - this is our primary source
     try:
-        if not api_key:
-            api_key = get_random_api_key()
+        # A provider known to be failing is skipped instead of waiting for it to fail again
+        if breakers['finnhub'].state == OPEN:
+            print(f"[MARKET_DATA] Skipping Finnhub for {symbol}: circuit open")
+            api_key = None
+        else:
+            api_key = acquire_api_key(api_key)
         
         if api_key:
-            print(f"[MARKET_DATA] Using Finnhub API key: {api_key[:4]}...{api_key[-4:]}")
-            
-            # Add delay to prevent rate limiting
-            if symbol in _last_call_time:
-                since_last_call = current_time - _last_call_time[symbol]
-                if since_last_call < 0.5:  # At least 500ms between calls
-                    sleep_time = 0.5 - since_last_call
-                    time.sleep(sleep_time)
-            
-            _last_call_time[symbol] = current_time
-            
             # Make API call with proper error handling
-            finnhub_client = finnhub.Client(api_key=api_key)
-            data = finnhub_client.quote(symbol)
-            
-            # Validate the response data thoroughly
-            if isinstance(data, dict) and 'c' in data:
-                current_price = float(data['c'])
-                prev_close = float(data.get('pc', current_price))
-                
-                # Additional validation to ensure prices are reasonable
-                if current_price > 0 and prev_close > 0:
-                    result = {
-                        'symbol': symbol,
-                        'open': float(data.get('o', current_price)),
-                        'high': float(data.get('h', current_price)),
-                        'low': float(data.get('l', current_price)),
-                        'prev_close': prev_close,
-                        'close': current_price,
-                        'source': 'finnhub'
-                    }
-                    
-                    # Cache successful result
-                    _price_cache[cache_key] = {
-                        'timestamp': current_time,
-                        'data': result
-                    }
-                    
-                    print(f"[MARKET_DATA] ✅ Successfully fetched {symbol} price: ${current_price}")
-                    return result
-                else:
-                    print(f"[MARKET_DATA] ⚠️ Invalid price values for {symbol}: {data}")
-            else:
-                print(f"[MARKET_DATA] ⚠️ Invalid response format for {symbol}: {data}")
+            finnhub_client = get_finnhub_client(api_key)
+            data = breakers['finnhub'].call(finnhub_client.quote, symbol)
+            result = parse_finnhub_quote(symbol, data)
+            if result:
+                return store_quote(symbol, result)
     except Exception as e:
-        print(f"[MARKET_DATA] ❌ Finnhub error for {symbol}: {str(e)}")
-        if "Invalid API key" in str(e):
-            # Remove invalid key if possible
-            if api_key in api_keys and len(api_keys) > 1:
-                api_keys.remove(api_key)
-                print(f"[MARKET_DATA] Removed invalid API key. {len(api_keys)} keys remaining.")
+        handle_finnhub_error(symbol, api_key, e)
     
     # If Finnhub fails, try yfinance
     try:
+        if breakers['yfinance'].state == OPEN:
+            raise CircuitOpenError('yfinance')
         print(f"[MARKET_DATA] Trying yfinance for {symbol}")
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period='2d')
+        ticker = yf.Ticker(symbol, session=get_session('yfinance'))
+        hist = breakers['yfinance'].call(ticker.history, period='2d', timeout=get_timeout('yfinance')[1])
         
         if len(hist) >= 1:
             today = hist.iloc[-1]
@@ -150,23 +334,15 @@ def fetch_stock_data(symbol, api_key=None, force_refresh=False):
                 }
                 
                 # Cache successful result
-                _price_cache[cache_key] = {
-                    'timestamp': current_time,
-                    'data': result
-                }
-                
-                print(f"[MARKET_DATA] ✅ Successfully fetched {symbol} price from yfinance: ${current_price}")
-                return result
+                return store_quote(symbol, result)
     except Exception as e:
         print(f"[MARKET_DATA] ❌ yfinance error for {symbol}: {str(e)}")
     
     # As a last resort, check database cache
     try:
-        stock_ref = db.collection('stock_prices').document(symbol)
-        stock_doc = stock_ref.get()
-        if stock_doc.exists:
-            stock_data = stock_doc.to_dict()
-            cached_price = stock_data.get('close', 0)
+        stock_data = breakers['database'].call(quote_store.read, symbol)
+        if stock_data:
+            cached_price = stock_data.get('close') or 0
             if cached_price > 0:
                 print(f"[MARKET_DATA] Using database cache for {symbol}")
                 return {
@@ -176,7 +352,9 @@ def fetch_stock_data(symbol, api_key=None, force_refresh=False):
                     'low': stock_data.get('low', cached_price),
                     'prev_close': stock_data.get('prev_close', cached_price),
                     'close': cached_price,
-                    'source': 'database_cache'
+                    'source': 'database_cache',
+                    'as_of': stock_data.get('as_of'),
+                    'stale': True
                 }
     except Exception as e:
         print(f"[MARKET_DATA] ❌ Database cache error for {symbol}: {str(e)}")
@@ -186,53 +364,148 @@ def fetch_stock_data(symbol, api_key=None, force_refresh=False):
         'symbol': symbol,
         'error': f'Unable to fetch price data for {symbol}',
         'close': 0,
-        'source': 'error'
+        'source': 'error',
+        'as_of': None,
+        'stale': False
     }
 
-def fetch_crypto_data(symbol):
-    """Fetch cryptocurrency data using Coinbase API."""
-    try:
-        response = requests.get(f'https://api.coinbase.com/v2/prices/{symbol}-USD/spot')
-        if response.status_code == 200:
-            data = response.json()
-            price = float(data['data']['amount'])
+def fetch_trade_quote(symbol):
+    """Quote a trade may execute at, or None.
+
+    Only a fresh quote counts. The persisted-snapshot fallback used when every
+    provider fails (source 'database_cache') can be arbitrarily old, so it is
+    refused along with any other stale or failed result.
+    """
+    quote = fetch_stock_data(symbol, allow_stale=False)
+    if not quote or quote.get('error') or quote.get('stale') or quote.get('source') == 'database_cache':
+        return None
+    if not quote.get('close') or quote['close'] <= 0:
+        return None
+    return quote
+
+def fetch_stock_quotes(symbols, api_key=None, force_refresh=False, allow_stale=None):
+    """Fetch quotes for many symbols in one deduplicated, concurrent pass.
+
+    Returns a dict mapping each requested symbol to the same quote dict that
+    fetch_stock_data would return for it, so page latency tracks the slowest
+    quote instead of the sum of all of them.
+    """
+    unique_symbols = list(dict.fromkeys(s for s in symbols if s))
+    if not unique_symbols:
+        return {}
+
+    # Every crypto symbol in the batch is served by a single Coinbase request
+    crypto_symbols = [s for s in unique_symbols if is_crypto_symbol(s)]
+    if crypto_symbols:
+        quotes = fetch_crypto_quotes(crypto_symbols)
+        equities = [s for s in unique_symbols if not is_crypto_symbol(s)]
+        if equities:
+            quotes.update(fetch_stock_quotes(equities, api_key=api_key, force_refresh=force_refresh, allow_stale=allow_stale))
+        return {symbol: quotes[symbol] for symbol in unique_symbols}
+
+    if len(unique_symbols) == 1:
+        symbol = unique_symbols[0]
+        return {symbol: fetch_stock_data(symbol, api_key=api_key, force_refresh=force_refresh, allow_stale=allow_stale)}
+
+    print(f"[MARKET_DATA] Batch fetching {len(unique_symbols)} symbols")
+
+    def _fetch(symbol):
+        try:
+            return fetch_stock_data(symbol, api_key=api_key, force_refresh=force_refresh, allow_stale=allow_stale)
+        except Exception as e:
+            print(f"[MARKET_DATA] ❌ Batch fetch error for {symbol}: {str(e)}")
             return {
                 'symbol': symbol,
-                'price': price,
-                'prev_close': price * 0.99,  # Approximation as Coinbase doesn't provide previous close
-                'change_percent': 0.0  # Placeholder as we don't have historical data here
+                'error': f'Unable to fetch price data for {symbol}',
+                'close': 0,
+                'source': 'error',
+                'as_of': None,
+                'stale': False
             }
-        else:
-            return {'error': f'Failed to fetch crypto data: API returned status {response.status_code}'}
+
+    workers = min(MAX_QUOTE_WORKERS, len(unique_symbols))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(_fetch, unique_symbols)
+        return dict(zip(unique_symbols, results))
+
+def fetch_crypto_data(symbol):
+    """Fetch cryptocurrency data using Coinbase API.
+
+    symbol is a bare coin such as 'BTC'. prev_close is the price about 24 hours
+    ago, see services.crypto_quotes.
+    """
+    quote = fetch_crypto_quotes([symbol])[symbol]
+    if quote.get('error'):
+        return {'error': f"Failed to fetch crypto data: {quote['error']}"}
+    price = quote['close']
+    prev_close = quote['prev_close']
+    return {
+        'symbol': symbol,
+        'price': price,
+        'prev_close': prev_close,
+        'change_percent': calculate_price_change(price, prev_close)[0]
+    }
+
+def _split_batch_download(data, symbols):
+    """Per-symbol frames from a yf.download(group_by='ticker') result; empty ones are left out."""
+    frames = {}
+    if data is None or data.empty:
+        return frames
+    available = set(data.columns.get_level_values(0)) if isinstance(data.columns, pd.MultiIndex) else set()
+    for symbol in symbols:
+        if symbol not in available:
+            continue
+        hist = data[symbol].dropna(how='all')
+        if hist.empty or hist['Close'].isna().all():
+            continue
+        index = hist.index.tz_localize(None) if hist.index.tz is not None else hist.index
+        frames[symbol] = pd.DataFrame({
+            'date': index,
+            'open': hist['Open'].to_numpy(),
+            'high': hist['High'].to_numpy(),
+            'low': hist['Low'].to_numpy(),
+            'close': hist['Close'].to_numpy(),
+            'volume': hist['Volume'].to_numpy()
+        }, index=pd.DatetimeIndex(index, name='date'))
+    return frames
+
+def fetch_historical_batch(symbols, period='1mo', interval='1d'):
+    """Fetch price history for many symbols in one grouped yfinance download.
     
-    except requests.exceptions.RequestException as e:
-        return {'error': f'Failed to fetch crypto data: {str(e)}'}
+    The download runs up to HISTORY_DOWNLOAD_THREADS symbol requests at once.
+    Returns {symbol: DataFrame} indexed by date with date, open, high, low,
+    close and volume columns. Symbols missing from the download are retried
+    together, up to HISTORY_BATCH_RETRIES more times; symbols that still fail
+    are left out.
+    """
+    pending = list(dict.fromkeys(s for s in symbols if s))
+    frames = {}
+    for attempt in range(1 + HISTORY_BATCH_RETRIES):
+        if not pending:
+            break
+        # yfinance fetches one symbol per request, so the batch is spread over a bounded pool
+        threads = max(1, min(HISTORY_DOWNLOAD_THREADS, len(pending)))
+        try:
+            data = breakers['yfinance'].call(
+                yf.download, pending, period=period, interval=interval, group_by='ticker',
+                threads=threads, progress=False, session=get_session('yfinance'),
+                timeout=get_timeout('yfinance')[1]
+            )
+        except Exception as e:
+            print(f"[MARKET_DATA] ❌ Batch history download failed for {len(pending)} symbols: {str(e)}")
+            continue
+        frames.update(_split_batch_download(data, pending))
+        pending = [symbol for symbol in pending if symbol not in frames]
+        if pending:
+            print(f"[MARKET_DATA] ⚠️ No history for {len(pending)} symbol(s) after attempt {attempt + 1}: {', '.join(pending)}")
+    return frames
 
-def fetch_historical_data(symbol, period='1y'):
-    """Fetch historical price data for a stock symbol."""
-    try:
-        ticker = yf.Ticker(symbol)
-        hist = ticker.history(period=period)
-        
-        if hist.empty:
-            return None
-            
-        # Convert the DataFrame to the expected format
-        df = pd.DataFrame()
-        df['date'] = hist.index
-        df['open'] = hist['Open']
-        df['high'] = hist['High']
-        df['low'] = hist['Low']
-        df['close'] = hist['Close']
-        df['volume'] = hist['Volume']
-        
-        return df
-    except Exception as e:
-        print(f"Error fetching historical data for {symbol}: {e}")
-        return None
+def fetch_user_portfolio(user_id, quotes=None):
+    """Fetch the current user's portfolio data including performance metrics and detailed positions.
 
-def fetch_user_portfolio(user_id):
-    """Fetch the current user's portfolio data including performance metrics and detailed positions."""
+    quotes ({symbol: quote}) is used as-is for the symbols it covers, so a
+    caller valuing many portfolios fetches each quote once.
+    """
     try:
         user_doc = db.collection('users').document(user_id).get()
         if not user_doc.exists:
@@ -258,24 +531,36 @@ def fetch_user_portfolio(user_id):
         total_day_change_value = 0.0
         active_positions_count = 0
 
+        # Collect open positions first so all quotes can be fetched in one batch
+        open_positions = []
         for item_doc in portfolio_items_query:
             item_data = item_doc.to_dict()
+            if float(item_data.get('shares', 0)) > 0: # Skip positions with no shares
+                open_positions.append(item_data)
+
+        quotes = dict(quotes or {})
+        missing = [item['symbol'] for item in open_positions if item['symbol'] not in quotes]
+        if missing:
+            quotes.update(fetch_stock_quotes(missing))
+
+        for item_data in open_positions:
             symbol = item_data['symbol']
             shares = float(item_data.get('shares', 0))
             purchase_price = float(item_data.get('purchase_price', 0))
-
-            if shares <= 0: # Skip positions with no shares
-                continue
             
             active_positions_count += 1
             
-            price_data = fetch_stock_data(symbol) # This already has caching
+            price_data = quotes.get(symbol)
             current_price = purchase_price # Fallback to purchase price
             prev_close_price = purchase_price # Fallback for day change calculation
 
             if price_data and 'close' in price_data and price_data['close'] is not None and price_data['close'] > 0:
                 current_price = float(price_data['close'])
                 prev_close_price = float(price_data.get('prev_close', current_price)) # Use current if prev_close is missing
+                # A streamed tick newer than the quote is the better current price
+                tick = tick_store.latest(symbol)
+                if tick is not None and tick[0] > _as_of_epoch(price_data.get('as_of')):
+                    current_price = tick[1]
             elif price_data and price_data.get('source') == 'error':
                  print(f"⚠️ API failed for {symbol} in fetch_user_portfolio, using purchase price.")
             
@@ -354,13 +639,14 @@ def fetch_user_portfolio(user_id):
             'positions': []
         }
 
-def calculate_total_portfolio_value(user_id):
+def calculate_total_portfolio_value(user_id, quotes=None):
     """
     Calculate a simplified total value of a user's portfolio.
     This function is kept for potential quick summaries if the full fetch_user_portfolio is too heavy,
     but fetch_user_portfolio is now the recommended function for comprehensive data.
+    quotes is passed through to fetch_user_portfolio.
     """
-    portfolio_summary = fetch_user_portfolio(user_id)['summary']
+    portfolio_summary = fetch_user_portfolio(user_id, quotes)['summary']
     return {
             'total_value': portfolio_summary['total_value_raw'],
             'invested_value': portfolio_summary['invested_value_raw'],
@@ -404,14 +690,27 @@ def fetch_recent_orders(user_id, limit=5):
         print(f"Error fetching recent orders: {e}")
         return []
 
+def _provider_status(provider, default):
+    """Status label that reflects the provider's live circuit breaker state."""
+    health = breakers[provider].health()
+    if health['state'] == OPEN:
+        return f"Circuit open (retry in {health['retry_in_seconds']}s)"
+    if health['state'] == HALF_OPEN:
+        return 'Recovering (probing)'
+    return default
+
 def get_api_keys_status():
     """Get the status of all API keys for display in the UI."""
     # Check Finnhub keys
+    token_levels = finnhub_limiter.levels(api_keys)
     finnhub_status = {
         'available': len(api_keys) > 0,
         'count': len(api_keys),
         'keys': [f"{key[:4]}...{key[-4:]}" if len(key) > 8 else "****" for key in api_keys],
-        'status': 'Available' if len(api_keys) > 0 else 'Not configured'
+        'tokens_remaining': [round(token_levels.get(key, 0), 1) for key in api_keys],
+        'calls_per_minute': FINNHUB_CALLS_PER_MINUTE,
+        'status': _provider_status('finnhub', 'Available' if len(api_keys) > 0 else 'Not configured'),
+        'breaker': breakers['finnhub'].health()
     }
     
     # Check if we have Alpha Vantage
@@ -424,19 +723,39 @@ def get_api_keys_status():
     # YFinance is always available as a fallback
     yfinance_status = {
         'available': True,
-        'status': 'Available (rate-limited)'
+        'status': _provider_status('yfinance', 'Available (rate-limited)'),
+        'breaker': breakers['yfinance'].health()
     }
     
     # Coinbase is also always available for crypto
     coinbase_status = {
         'available': True,
-        'status': 'Available'
+        'status': _provider_status('coinbase', 'Available'),
+        'breaker': breakers['coinbase'].health(),
+        'quotes': crypto_quotes.stats()
+    }
+    
+    # The stock_prices snapshot is the last link in the quote fallback chain
+    database_status = {
+        'available': True,
+        'status': _provider_status('database', 'Available'),
+        'breaker': breakers['database'].health()
     }
     
     return {
         'finnhub': finnhub_status,
         'alpha_vantage': alpha_vantage_status,
         'yfinance': yfinance_status,
-        'coinbase': coinbase_status
+        'coinbase': coinbase_status,
+        'database': database_status,
+        'price_hub': price_hub.stats(),
+        'tick_store': tick_store.stats(),
+        'history_store': history_store.stats(),
+        'indicator_cache': indicator_cache.stats(),
+        'resample': resample_stats(),
+        'chart_specs': chart_spec_stats(),
+        'quote_cache': dict(quote_cache.stats(), serving_mode=QUOTE_SERVING_MODE, market_status=market_status(), **_swr_stats),
+        'quote_persistence': quote_store.stats(),
+        'reference_data': reference_stats()
     }
 
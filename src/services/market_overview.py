@@ -0,0 +1,176 @@
+# src/services/market_overview.py
+"""
+Market-overview snapshot shared by every /lookup page view.
+
+Index quotes, top movers, volume leaders and sector ETF performance are the
+same for every user, so a Celery beat task computes them every
+MARKET_OVERVIEW_INTERVAL seconds while the market is trading and publishes
+them as one versioned snapshot (services/snapshot_store.py), which page views
+read without upstream calls.
+"""
+
+import logging
+import os
+import time
+
+from utils.constants import POPULAR_STOCKS, MARKET_INDICES
+from services.market_data import fetch_stock_quotes, fetch_historical_batch
+from services.market_calendar import market_status
+from services.snapshot_store import VersionedSnapshot
+
+MARKET_OVERVIEW_INTERVAL = int(os.environ.get('MARKET_OVERVIEW_INTERVAL', 60))
+MARKET_OVERVIEW_TOP_K = int(os.environ.get('MARKET_OVERVIEW_TOP_K', 5))
+
+
+SECTOR_ETFS = {
+    'Technology': 'XLK',
+    'Healthcare': 'XLV',
+    'Financial': 'XLF',
+    'Consumer Discretionary': 'XLY',
+    'Consumer Staples': 'XLP',
+    'Energy': 'XLE',
+    'Utilities': 'XLU',
+    'Materials': 'XLB',
+    'Industrial': 'XLI',
+    'Real Estate': 'XLRE',
+    'Communication': 'XLC'
+}
+
+
+def _build_market_overview(index_quotes):
+    """Index name, close and day change for every index that returned a quote."""
+    market_overview = {}
+    for index, name in MARKET_INDICES.items():
+        try:
+            data = index_quotes.get(index)
+            if data and 'error' not in data:
+                market_overview[index] = {
+                    'name': name,
+                    'close': data['close'],
+                    'prev_close': data['prev_close'],
+                    'change': ((data['close'] - data['prev_close']) / data['prev_close'] * 100) if data['prev_close'] > 0 else 0
+                }
+        except Exception as e:
+            logging.error(f"Error fetching market data for {index}: {str(e)}")
+            # Skip this index if we can't get data - no mock data
+            continue
+    return market_overview
+
+
+def _latest_volumes(history):
+    """Most recent daily volume per symbol from fetch_historical_batch output."""
+    volumes = {}
+    for symbol, df in history.items():
+        volume = df['volume'].iloc[-1]
+        volumes[symbol] = int(volume) if volume == volume else 0  # NaN check
+    return volumes
+
+
+def _build_market_movers(sample_tickers, mover_quotes, volumes, top_k=5):
+    """Top top_k gainers, losers and volume leaders among sample_tickers."""
+    gainers = []
+    losers = []
+    volume_leaders = []
+    
+    for stock in sample_tickers:
+        ticker = stock["symbol"]
+        try:
+            price_data = mover_quotes.get(ticker)
+            if price_data and 'error' not in price_data:
+                current_price = price_data['close']
+                prev_price = price_data['prev_close']
+                change_pct = ((current_price - prev_price) / prev_price * 100) if prev_price > 0 else 0
+                
+                stock_info = {
+                    'symbol': ticker,
+                    'name': stock["name"],
+                    'price': current_price,
+                    'change_pct': change_pct,
+                    'volume': volumes.get(ticker, 0)
+                }
+                
+                # Add to appropriate list
+                if change_pct > 0:
+                    gainers.append(stock_info)
+                else:
+                    losers.append(stock_info)
+                
+                # Add to volume leaders
+                volume_leaders.append(stock_info)
+        except Exception as e:
+            logging.error(f"Error processing {ticker}: {str(e)}")
+            continue
+    
+    # Sort and limit
+    gainers = sorted(gainers, key=lambda x: x['change_pct'], reverse=True)[:top_k]
+    losers = sorted(losers, key=lambda x: x['change_pct'])[:top_k]
+    volume_leaders = sorted(volume_leaders, key=lambda x: x['volume'], reverse=True)[:top_k]
+    return gainers, losers, volume_leaders
+
+
+def _build_sector_performance(history):
+    """Day change of each sector ETF, best performing sector first."""
+    sector_performance = {}
+    for sector, etf in SECTOR_ETFS.items():
+        try:
+            hist = history.get(etf)
+            
+            if hist is not None and len(hist) >= 2:
+                today = hist.iloc[-1]
+                yesterday = hist.iloc[-2]
+                change_pct = ((float(today['close']) - float(yesterday['close'])) / float(yesterday['close'])) * 100
+                
+                sector_performance[sector] = {
+                    'symbol': etf,
+                    'price': float(today['close']),
+                    'change_pct': change_pct
+                }
+        except Exception as e:
+            continue
+    
+    # Sort sectors by performance
+    return dict(sorted(
+        sector_performance.items(), 
+        key=lambda item: item[1]['change_pct'], 
+        reverse=True
+    ))
+
+
+def compute_market_overview(universe=None, top_k=MARKET_OVERVIEW_TOP_K):
+    """Build the snapshot from batched quotes and one grouped history download."""
+    universe = universe or POPULAR_STOCKS
+    mover_symbols = [stock["symbol"] for stock in universe]
+    quotes = fetch_stock_quotes(list(MARKET_INDICES) + mover_symbols)
+    try:
+        # Sector ETFs and mover volumes share one grouped history download
+        history = fetch_historical_batch(list(SECTOR_ETFS.values()) + mover_symbols, '5d')
+    except Exception as e:
+        logging.error(f"Error fetching market overview history: {str(e)}")
+        history = {}
+
+    gainers, losers, volume_leaders = _build_market_movers(universe, quotes, _latest_volumes(history), top_k)
+    return {
+        'built_at': time.time(),
+        'market_status': market_status(),
+        'market_overview': _build_market_overview(quotes),
+        'gainers': gainers,
+        'losers': losers,
+        'volume_leaders': volume_leaders,
+        'sector_performance': _build_sector_performance(history)
+    }
+
+
+overview_snapshots = VersionedSnapshot(
+    'market_overview', lambda: compute_market_overview(), MARKET_OVERVIEW_INTERVAL,
+    lease_ms=60 * 1000, build_timeout=60
+)
+
+
+def refresh_market_overview(force=False):
+    """Rebuild and publish the snapshot if the calendar says it is due; returns the current one."""
+    return overview_snapshots.refresh(force)
+
+
+def get_market_overview():
+    """Snapshot for a /lookup page view; see VersionedSnapshot.get."""
+    return overview_snapshots.get()
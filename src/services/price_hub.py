@@ -0,0 +1,193 @@
+# src/services/price_hub.py
+"""
+In-process fan-out of live price updates to Server-Sent Events connections.
+
+One hub thread per worker process subscribes to the Redis pubsub channel the
+stream worker publishes on (services.live_prices), records each update in the
+tick store and hands it to every connection watching that symbol. A
+connection holds only the newest pending update per symbol, so a slow client
+skips intermediate ticks instead of queueing them; memory per connection is
+bounded by its symbol count.
+
+The same hub fans out on an asyncio event loop in price_stream.py, the
+service that holds the browsers' connections in production: there the
+listener is a task on the loop (listen_async) and each connection is an
+AsyncPriceSubscription, so thousands of idle connections cost no threads.
+"""
+
+import asyncio
+import json
+import os
+import threading
+import time
+
+from utils.db import redis_client
+from services.live_prices import LIVE_PRICES_CHANNEL
+from services.tick_store import tick_store
+
+# Delay before resubscribing after the pubsub connection drops
+HUB_RECONNECT_DELAY = float(os.environ.get('PRICE_HUB_RECONNECT_DELAY', 2))
+
+
+class PriceSubscription:
+    """One SSE connection's symbol filter and its pending updates."""
+
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+        self._pending = {}
+        self._cond = threading.Condition()
+        self.dropped = 0
+
+    def push(self, symbol, update):
+        with self._cond:
+            if symbol in self._pending:
+                # The client has not caught up; keep only the newest price
+                self.dropped += 1
+            self._pending[symbol] = update
+            self._cond.notify()
+
+    def wait(self, timeout):
+        """Pending updates as {symbol: update}, or {} if none arrived within timeout."""
+        with self._cond:
+            if not self._pending:
+                self._cond.wait(timeout)
+            pending, self._pending = self._pending, {}
+        return pending
+
+
+class AsyncPriceSubscription:
+    """PriceSubscription for a connection served on an event loop; push from that loop only."""
+
+    def __init__(self, symbols):
+        self.symbols = frozenset(symbols)
+        self._pending = {}
+        self._ready = asyncio.Event()
+        self.dropped = 0
+
+    def push(self, symbol, update):
+        if symbol in self._pending:
+            self.dropped += 1
+        self._pending[symbol] = update
+        self._ready.set()
+
+    async def wait(self, timeout):
+        """Pending updates as {symbol: update}, or {} if none arrived within timeout."""
+        if not self._pending:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        pending, self._pending = self._pending, {}
+        return pending
+
+
+class PriceHub:
+    """Redis pubsub listener that fans price updates out to subscriptions."""
+
+    def __init__(self, redis=None, channel=LIVE_PRICES_CHANNEL, record_ticks=True):
+        self.redis = redis if redis is not None else redis_client
+        self.channel = channel
+        self.record_ticks = record_ticks
+        self._by_symbol = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self.messages = 0
+        self.deliveries = 0
+
+    def subscribe(self, symbols):
+        """Register a connection for symbols and start the hub thread if needed."""
+        subscription = self.add(PriceSubscription(symbols))
+        self.start()
+        return subscription
+
+    def add(self, subscription):
+        """Register a subscription without starting the hub thread."""
+        with self._lock:
+            for symbol in subscription.symbols:
+                self._by_symbol.setdefault(symbol, set()).add(subscription)
+        return subscription
+
+    def start(self):
+        """Start the pubsub listener thread unless it is already running."""
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='price-hub', daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for symbol in subscription.symbols:
+                subscribers = self._by_symbol.get(symbol)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._by_symbol[symbol]
+
+    def publish_local(self, update):
+        """Deliver one update ({'symbol', 'price', ...}) to matching subscriptions."""
+        symbol = update.get('symbol')
+        if self.record_ticks:
+            try:
+                tick_store.append(symbol, update['ts'], update['price'], update.get('volume', 0))
+            except (KeyError, TypeError, ValueError):
+                pass
+        with self._lock:
+            subscribers = list(self._by_symbol.get(symbol, ()))
+        for subscription in subscribers:
+            subscription.push(symbol, update)
+        self.messages += 1
+        self.deliveries += len(subscribers)
+
+    def _publish_message(self, message):
+        if message.get('type') != 'message':
+            return
+        try:
+            update = json.loads(message['data'])
+        except (TypeError, ValueError):
+            return
+        self.publish_local(update)
+
+    def _run(self):
+        if not hasattr(self.redis, 'pubsub'):
+            print("[PRICE_HUB] ⚠️ Redis unavailable, live price updates disabled")
+            return
+        while True:
+            try:
+                pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(self.channel)
+                print(f"[PRICE_HUB] Listening on {self.channel}")
+                for message in pubsub.listen():
+                    self._publish_message(message)
+            except Exception as e:
+                print(f"[PRICE_HUB] ⚠️ Pubsub connection lost: {str(e)}")
+            time.sleep(HUB_RECONNECT_DELAY)
+
+    async def listen_async(self, redis):
+        """Event-loop counterpart of the hub thread; redis is a redis.asyncio client."""
+        while True:
+            try:
+                pubsub = redis.pubsub(ignore_subscribe_messages=True)
+                await pubsub.subscribe(self.channel)
+                print(f"[PRICE_HUB] Listening on {self.channel}")
+                async for message in pubsub.listen():
+                    self._publish_message(message)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"[PRICE_HUB] ⚠️ Pubsub connection lost: {str(e)}")
+            await asyncio.sleep(HUB_RECONNECT_DELAY)
+
+    def stats(self):
+        with self._lock:
+            connections = len({sub for subs in self._by_symbol.values() for sub in subs})
+            symbols = len(self._by_symbol)
+        return {
+            'connections': connections,
+            'symbols': symbols,
+            'messages': self.messages,
+            'deliveries': self.deliveries
+        }
+
+
+price_hub = PriceHub()
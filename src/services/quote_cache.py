@@ -0,0 +1,151 @@
+# src/services/quote_cache.py
+"""
+Two-tier cache for market data.
+
+L1 is a bounded in-process LRU so hot symbols never leave the worker, L2 is the
+shared Redis instance from utils.db so one upstream fetch serves every gunicorn
+worker. Entries are stored as {'data': ..., 'as_of': epoch_seconds, 'ttl': seconds}
+so each entry can carry its own hard TTL.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.db import redis_client
+
+
+class QuoteCache:
+    """Bounded LRU (L1) in front of Redis (L2) with TTLs and hit/miss counters."""
+
+    def __init__(self, namespace, ttl=300, l1_ttl=None, max_entries=1024, redis=None):
+        self.namespace = namespace
+        self.ttl = ttl
+        # L1 entries expire sooner so workers converge on the shared L2 copy
+        self.l1_ttl = l1_ttl if l1_ttl is not None else ttl
+        self.max_entries = max_entries
+        self.redis = redis if redis is not None else redis_client
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {
+            'l1_hits': 0,
+            'l2_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0,
+            'l2_errors': 0
+        }
+
+    def _redis_key(self, key):
+        return f"{self.namespace}:{key}"
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _store_l1(self, key, entry):
+        expires_at = min(time.time() + self.l1_ttl, entry['as_of'] + entry.get('ttl', self.ttl))
+        with self._lock:
+            self._entries[key] = (expires_at, entry)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def _is_live(self, entry, now, max_age):
+        age = now - entry.get('as_of', 0)
+        if age >= entry.get('ttl', self.ttl):
+            return False
+        return max_age is None or age < max_age
+
+    def get_entry(self, key, max_age=None):
+        """Return the cached {'data', 'as_of'} entry for key, or None on a miss.
+
+        max_age narrows the entry's TTL for this lookup; an L1 entry that is too old
+        falls through to L2 in case another worker already refreshed it.
+        """
+        now = time.time()
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                expires_at, entry = cached
+                if now >= expires_at:
+                    del self._entries[key]
+                elif max_age is None or now - entry['as_of'] < max_age:
+                    self._entries.move_to_end(key)
+                    self._stats['l1_hits'] += 1
+                    return entry
+
+        try:
+            raw = self.redis.get(self._redis_key(key))
+        except Exception as e:
+            print(f"[QUOTE_CACHE] ⚠️ Redis read failed for {key}: {str(e)}")
+            self._count('l2_errors')
+            raw = None
+
+        if raw:
+            try:
+                entry = json.loads(raw)
+            except (TypeError, ValueError):
+                entry = None
+            if entry and self._is_live(entry, now, max_age):
+                self._store_l1(key, entry)
+                self._count('l2_hits')
+                return entry
+
+        self._count('misses')
+        return None
+
+    def get(self, key, max_age=None):
+        """Return the cached value for key, or None on a miss."""
+        entry = self.get_entry(key, max_age)
+        return entry['data'] if entry else None
+
+    def set(self, key, data, ttl=None, as_of=None):
+        """Store data in both tiers."""
+        ttl = ttl or self.ttl
+        entry = {'data': data, 'as_of': as_of if as_of is not None else time.time(), 'ttl': int(ttl)}
+        self._store_l1(key, entry)
+        self._count('sets')
+
+        try:
+            self.redis.setex(self._redis_key(key), int(ttl), json.dumps(entry))
+        except Exception as e:
+            print(f"[QUOTE_CACHE] ⚠️ Redis write failed for {key}: {str(e)}")
+            self._count('l2_errors')
+        return entry
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+        try:
+            self.redis.delete(self._redis_key(key))
+        except Exception as e:
+            print(f"[QUOTE_CACHE] ⚠️ Redis delete failed for {key}: {str(e)}")
+            self._count('l2_errors')
+
+    def clear(self):
+        """Drop the in-process tier; Redis entries expire on their own."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['l1_size'] = len(self._entries)
+        lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses']
+        stats['max_entries'] = self.max_entries
+        stats['hit_rate'] = round((stats['l1_hits'] + stats['l2_hits']) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+# Shared quote cache used by services.market_data. The TTL here is the hard
+# limit; market_data applies its own soft TTL for stale-while-revalidate.
+quote_cache = QuoteCache(
+    'quote',
+    ttl=int(os.environ.get('QUOTE_CACHE_TTL', 1800)),
+    l1_ttl=int(os.environ.get('QUOTE_CACHE_L1_TTL', 60)),
+    max_entries=int(os.environ.get('QUOTE_CACHE_MAX_ENTRIES', 2048))
+)
@@ -0,0 +1,144 @@
+# src/services/quote_persistence.py
+"""
+Write-behind persistence of quotes into the Firestore stock_prices collection.
+
+Successful quotes are buffered in memory and flushed as one batched write every
+QUOTE_FLUSH_BATCH symbols or QUOTE_FLUSH_INTERVAL seconds. Symbols are spread
+over a fixed number of shard documents (stock_prices/shard_NN, one map field
+per symbol) so a flush touches a handful of documents and a read returns many
+symbols at once. After a restart this gives fetch_stock_data a warm, cheap
+snapshot to read before going to the providers.
+
+After a failed flush the quotes stay buffered and the writer waits before
+retrying, starting at one interval and doubling up to
+QUOTE_FLUSH_MAX_BACKOFF, so an unavailable Firestore is not hammered.
+"""
+
+import atexit
+import os
+import threading
+import time
+import zlib
+
+from utils.db import db
+
+QUOTE_SHARDS = int(os.environ.get('QUOTE_SHARDS', 16))
+QUOTE_FLUSH_BATCH = int(os.environ.get('QUOTE_FLUSH_BATCH', 25))
+QUOTE_FLUSH_INTERVAL = float(os.environ.get('QUOTE_FLUSH_INTERVAL', 30))
+QUOTE_FLUSH_MAX_BACKOFF = float(os.environ.get('QUOTE_FLUSH_MAX_BACKOFF', 300))
+# Shard documents read back are reused in-process for this long
+SHARD_READ_TTL = float(os.environ.get('QUOTE_SHARD_READ_TTL', 60))
+
+PERSISTED_FIELDS = ('open', 'high', 'low', 'prev_close', 'close', 'source', 'as_of')
+
+
+def shard_id(symbol):
+    # crc32 is stable across processes, unlike hash()
+    return f"shard_{zlib.crc32(symbol.encode('utf-8')) % QUOTE_SHARDS:02d}"
+
+
+class QuoteWriteBehind:
+    """Buffers quotes and flushes them to sharded snapshot documents in batches."""
+
+    def __init__(self, collection='stock_prices', batch_size=QUOTE_FLUSH_BATCH, interval=QUOTE_FLUSH_INTERVAL):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.interval = interval
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._shard_cache = {}
+        self._shard_lock = threading.Lock()
+        self.flushes = 0
+        self.written = 0
+        # Consecutive failed flushes
+        self.failures = 0
+
+    def _ensure_thread(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._run, name='quote-write-behind', daemon=True)
+        self._thread.start()
+
+    def record(self, symbol, quote):
+        """Queue a quote for persistence; the newest quote per symbol wins."""
+        row = {field: quote.get(field) for field in PERSISTED_FIELDS}
+        with self._cond:
+            self._pending[symbol] = row
+            self._ensure_thread()
+            if len(self._pending) >= self.batch_size:
+                self._cond.notify()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self._pending) >= self.batch_size, timeout=self.interval)
+            self.flush()
+            if self.failures:
+                time.sleep(self.backoff())
+
+    def backoff(self):
+        """Seconds to wait after the current run of failed flushes."""
+        return min(self.interval * 2 ** (self.failures - 1), QUOTE_FLUSH_MAX_BACKOFF)
+
+    def flush(self):
+        """Write every buffered quote in one Firestore batch, grouped by shard."""
+        with self._cond:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+
+        shards = {}
+        for symbol, row in pending.items():
+            shards.setdefault(shard_id(symbol), {})[symbol] = row
+
+        try:
+            batch = db.batch()
+            for shard, quotes in shards.items():
+                ref = db.collection(self.collection).document(shard)
+                batch.set(ref, {'quotes': quotes, 'updated_at': time.time()}, merge=True)
+            batch.commit()
+        except Exception as e:
+            print(f"[QUOTE_PERSISTENCE] ❌ Flush of {len(pending)} quotes failed: {str(e)}")
+            # Put the quotes back unless something newer arrived meanwhile
+            with self._cond:
+                for symbol, row in pending.items():
+                    self._pending.setdefault(symbol, row)
+            self.failures += 1
+            return 0
+
+        # Keep this process' view of the shards in step with what it just wrote
+        with self._shard_lock:
+            for shard, quotes in shards.items():
+                if shard in self._shard_cache:
+                    self._shard_cache[shard][1].update(quotes)
+
+        self.failures = 0
+        self.flushes += 1
+        self.written += len(pending)
+        print(f"[QUOTE_PERSISTENCE] Flushed {len(pending)} quotes into {len(shards)} shard(s)")
+        return len(pending)
+
+    def read(self, symbol):
+        """Last persisted quote for symbol, or None."""
+        shard = shard_id(symbol)
+        now = time.time()
+        with self._shard_lock:
+            cached = self._shard_cache.get(shard)
+        if cached is None or now - cached[0] >= SHARD_READ_TTL:
+            doc = db.collection(self.collection).document(shard).get()
+            quotes = (doc.to_dict() or {}).get('quotes', {}) if doc.exists else {}
+            with self._shard_lock:
+                self._shard_cache[shard] = (now, quotes)
+        else:
+            quotes = cached[1]
+        return quotes.get(symbol)
+
+    def stats(self):
+        with self._cond:
+            pending = len(self._pending)
+        return {'pending': pending, 'flushes': self.flushes, 'written': self.written, 'failures': self.failures}
+
+
+quote_store = QuoteWriteBehind()
+atexit.register(quote_store.flush)
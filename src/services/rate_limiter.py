@@ -0,0 +1,156 @@
+# src/services/rate_limiter.py
+"""
+Token-bucket rate limiting for upstream API keys.
+
+Buckets live in Redis so every gunicorn worker draws from the same quota. The
+refill/consume step runs as a Lua script against Redis' own clock, which keeps
+it atomic and immune to clock skew between workers. When Redis is unavailable
+the limiter falls back to per-process buckets.
+"""
+
+import hashlib
+import threading
+import time
+
+from utils.db import redis_client
+
+# Pick the bucket with the most tokens among KEYS and take ARGV[3] tokens from it.
+# Returns the 1-based index of the chosen key, or 0 when every bucket is short.
+_ACQUIRE_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local best, best_tokens = 0, -1
+for i, key in ipairs(KEYS) do
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+    if tokens > best_tokens then
+        best, best_tokens = i, tokens
+    end
+end
+if best > 0 and best_tokens >= requested then
+    redis.call('HSET', KEYS[best], 'tokens', tostring(best_tokens - requested), 'ts', tostring(now))
+    redis.call('EXPIRE', KEYS[best], ARGV[4])
+    return best
+end
+return 0
+"""
+
+# Report the current token level of every bucket in KEYS without consuming.
+_PEEK_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local levels = {}
+for i, key in ipairs(KEYS) do
+    local state = redis.call('HMGET', key, 'tokens', 'ts')
+    local tokens = tonumber(state[1]) or capacity
+    local ts = tonumber(state[2]) or now
+    levels[i] = tostring(math.min(capacity, tokens + math.max(0, now - ts) * rate))
+end
+return levels
+"""
+
+# Empty a bucket, e.g. after the upstream answered 429.
+_DRAIN_SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+redis.call('HSET', KEYS[1], 'tokens', '0', 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class TokenBucketLimiter:
+    """Per-key token buckets shared across workers through Redis."""
+
+    def __init__(self, name, capacity, refill_per_sec, redis=None):
+        self.name = name
+        self.capacity = float(capacity)
+        self.refill_per_sec = float(refill_per_sec)
+        self.redis = redis if redis is not None else redis_client
+        # Idle buckets are back to full after this long, so Redis can drop them
+        self._expire = int(self.capacity / self.refill_per_sec) + 60
+        self._local = {}
+        self._lock = threading.Lock()
+        self._scripts = None
+        try:
+            self._scripts = {
+                'acquire': self.redis.register_script(_ACQUIRE_SCRIPT),
+                'peek': self.redis.register_script(_PEEK_SCRIPT),
+                'drain': self.redis.register_script(_DRAIN_SCRIPT)
+            }
+        except Exception as e:
+            print(f"[RATE_LIMITER] ⚠️ Redis scripts unavailable for {name}, using local buckets: {str(e)}")
+
+    def _bucket_key(self, key):
+        # Never put raw API keys into Redis key names
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+        return f"ratelimit:{self.name}:{digest}"
+
+    def _local_level(self, key, now):
+        tokens, ts = self._local.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + max(0.0, now - ts) * self.refill_per_sec)
+
+    def acquire(self, keys, tokens=1):
+        """Take tokens from whichever key has the most left. Returns that key, or None."""
+        keys = list(keys)
+        if not keys:
+            return None
+
+        if self._scripts:
+            try:
+                index = self._scripts['acquire'](
+                    keys=[self._bucket_key(k) for k in keys],
+                    args=[self.capacity, self.refill_per_sec, tokens, self._expire]
+                )
+                return keys[int(index) - 1] if int(index) > 0 else None
+            except Exception as e:
+                print(f"[RATE_LIMITER] ⚠️ Redis acquire failed, using local buckets: {str(e)}")
+
+        now = time.time()
+        with self._lock:
+            levels = {k: self._local_level(k, now) for k in keys}
+            best = max(keys, key=lambda k: levels[k])
+            if levels[best] < tokens:
+                return None
+            self._local[best] = (levels[best] - tokens, now)
+            return best
+
+    def try_acquire(self, key, tokens=1):
+        """Take tokens from one specific key. Returns True if they were available."""
+        return self.acquire([key], tokens) is not None
+
+    def drain(self, key):
+        """Mark a key as exhausted until it refills."""
+        if self._scripts:
+            try:
+                self._scripts['drain'](keys=[self._bucket_key(key)], args=[self._expire])
+                return
+            except Exception as e:
+                print(f"[RATE_LIMITER] ⚠️ Redis drain failed, using local buckets: {str(e)}")
+        with self._lock:
+            self._local[key] = (0.0, time.time())
+
+    def levels(self, keys):
+        """Current token level for each key, without consuming any."""
+        keys = list(keys)
+        if not keys:
+            return {}
+        if self._scripts:
+            try:
+                levels = self._scripts['peek'](
+                    keys=[self._bucket_key(k) for k in keys],
+                    args=[self.capacity, self.refill_per_sec]
+                )
+                return {k: float(level) for k, level in zip(keys, levels)}
+            except Exception as e:
+                print(f"[RATE_LIMITER] ⚠️ Redis peek failed, using local buckets: {str(e)}")
+        now = time.time()
+        with self._lock:
+            return {k: self._local_level(k, now) for k in keys}
@@ -0,0 +1,222 @@
+# src/services/reference_data.py
+"""
+Cached company reference data: names, sector, industry, market cap, 52-week
+range and the other slow-moving fields the symbol detail panel shows.
+
+yfinance's Ticker.info is one of its slowest calls, so records are fetched once
+a day and kept in the two-tier quote cache (in-process LRU and Redis) and in
+the Firestore reference_data collection. A record older than REFERENCE_TTL is
+still served while a background refresh replaces it. The nightly
+refresh_reference_data Celery task keeps every held, watched and popular
+symbol warm, so page views should never wait on Ticker.info.
+
+Ticker.info takes no timeout, so it runs on a small bounded pool and its
+caller stops waiting after REFERENCE_INFO_TIMEOUT seconds; a hung call then
+counts as a yfinance failure instead of holding a refresh worker.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import yfinance as yf
+
+from utils.db import db
+from services.circuit_breaker import breakers
+from services.http_clients import get_session, get_timeout
+from services.quote_cache import QuoteCache
+from services.singleflight import SingleFlight
+
+REFERENCE_TTL = int(os.environ.get('REFERENCE_TTL', 24 * 3600))
+REFERENCE_COLLECTION = 'reference_data'
+# Concurrent Ticker.info calls during a bulk refresh
+REFERENCE_REFRESH_WORKERS = int(os.environ.get('REFERENCE_REFRESH_WORKERS', 4))
+REFERENCE_INFO_TIMEOUT = float(os.environ.get('REFERENCE_INFO_TIMEOUT', get_timeout('yfinance')[1]))
+# Ticker.info calls in flight at once, including any that have timed out but not returned
+REFERENCE_INFO_WORKERS = int(os.environ.get('REFERENCE_INFO_WORKERS', 8))
+
+# Our field name -> Ticker.info key
+REFERENCE_FIELDS = {
+    'company_name': 'shortName',
+    'long_name': 'longName',
+    'exchange': 'exchange',
+    'sector': 'sector',
+    'industry': 'industry',
+    'market_cap': 'marketCap',
+    'year_high': 'fiftyTwoWeekHigh',
+    'year_low': 'fiftyTwoWeekLow',
+    'long_business_summary': 'longBusinessSummary',
+    'forward_pe': 'forwardPE',
+    'trailing_pe': 'trailingPE',
+    'dividend_yield': 'dividendYield',
+    'ex_dividend_date': 'exDividendDate',
+    'beta': 'beta',
+    'eps': 'trailingEPS',
+    'target_price': 'targetMeanPrice',
+    'recommendation': 'recommendationKey'
+}
+
+reference_cache = QuoteCache(
+    'reference',
+    ttl=REFERENCE_TTL,
+    l1_ttl=int(os.environ.get('REFERENCE_L1_TTL', 3600)),
+    max_entries=int(os.environ.get('REFERENCE_MAX_ENTRIES', 2048))
+)
+
+_reference_flight = SingleFlight()
+_refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='reference-refresh')
+_info_executor = ThreadPoolExecutor(max_workers=REFERENCE_INFO_WORKERS, thread_name_prefix='reference-info')
+_refreshing = set()
+_refresh_lock = threading.Lock()
+_stats = {'fetches': 0, 'firestore_hits': 0, 'stale_served': 0}
+
+
+def normalize_info(symbol, info):
+    """Reference record from a Ticker.info dict."""
+    record = {field: info.get(key) for field, key in REFERENCE_FIELDS.items()}
+    record['symbol'] = symbol
+    record['company_name'] = record['company_name'] or record['long_name'] or symbol
+    record['recommendation'] = (record['recommendation'] or 'N/A').upper()
+    return record
+
+
+def _info_with_timeout(ticker):
+    # Raises concurrent.futures.TimeoutError after REFERENCE_INFO_TIMEOUT seconds
+    return _info_executor.submit(lambda: ticker.info).result(timeout=REFERENCE_INFO_TIMEOUT)
+
+
+def _fetch_info(symbol):
+    ticker = yf.Ticker(symbol, session=get_session('yfinance'))
+    info = breakers['yfinance'].call(_info_with_timeout, ticker)
+    _stats['fetches'] += 1
+    if not info:
+        raise ValueError(f"No reference data for {symbol}")
+    return normalize_info(symbol, info)
+
+
+def _store(symbol, record, fetched_at=None, persist=True):
+    fetched_at = fetched_at if fetched_at is not None else time.time()
+    reference_cache.set(symbol, record, as_of=fetched_at)
+    if persist:
+        try:
+            breakers['database'].call(
+                db.collection(REFERENCE_COLLECTION).document(symbol).set,
+                dict(record, fetched_at=fetched_at)
+            )
+        except Exception as e:
+            print(f"[REFERENCE_DATA] ⚠️ Could not persist {symbol}: {str(e)}")
+    return record
+
+
+def refresh_reference(symbol):
+    """Fetch a symbol's record from yfinance and store it everywhere."""
+    return _reference_flight.do(symbol, lambda: _store(symbol, _fetch_info(symbol)))
+
+
+def _refresh_in_background(symbol):
+    with _refresh_lock:
+        if symbol in _refreshing:
+            return
+        _refreshing.add(symbol)
+
+    def _refresh():
+        try:
+            refresh_reference(symbol)
+        except Exception as e:
+            print(f"[REFERENCE_DATA] ❌ Background refresh failed for {symbol}: {str(e)}")
+        finally:
+            with _refresh_lock:
+                _refreshing.discard(symbol)
+
+    _refresh_executor.submit(_refresh)
+
+
+def _from_firestore(symbols):
+    """{symbol: record} for the symbols with a Firestore document; stale ones are refreshed."""
+    refs = [db.collection(REFERENCE_COLLECTION).document(symbol) for symbol in symbols]
+    try:
+        docs = breakers['database'].call(db.get_all, refs)
+    except Exception as e:
+        print(f"[REFERENCE_DATA] ⚠️ Firestore read failed: {str(e)}")
+        return {}
+
+    records = {}
+    now = time.time()
+    for doc in docs:
+        if not doc.exists:
+            continue
+        record = doc.to_dict()
+        fetched_at = record.pop('fetched_at', 0) or 0
+        symbol = doc.id
+        if now - fetched_at >= REFERENCE_TTL:
+            _stats['stale_served'] += 1
+            _refresh_in_background(symbol)
+        else:
+            # Only fresh documents go back into the cache, so a stale one is re-read until refreshed
+            _store(symbol, record, fetched_at=fetched_at, persist=False)
+        _stats['firestore_hits'] += 1
+        records[symbol] = record
+    return records
+
+
+def get_references(symbols, fetch_missing=True, queue_missing=False):
+    """{symbol: record} from the cache, then Firestore, then yfinance.
+
+    With fetch_missing=False symbols nobody has fetched yet are left out
+    instead of blocking on Ticker.info; queue_missing=True also hands them to
+    the background refresh workers, so a later call finds them without the
+    nightly task having run.
+    """
+    symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+    records = {}
+    misses = []
+    for symbol in symbols:
+        record = reference_cache.get(symbol)
+        if record is not None:
+            records[symbol] = record
+        else:
+            misses.append(symbol)
+
+    if misses:
+        records.update(_from_firestore(misses))
+        missing = [symbol for symbol in misses if symbol not in records]
+        if missing and fetch_missing:
+            workers = min(REFERENCE_REFRESH_WORKERS, len(missing))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for symbol, record in zip(missing, executor.map(_safe_refresh, missing)):
+                    if record is not None:
+                        records[symbol] = record
+        elif missing and queue_missing:
+            for symbol in missing:
+                _refresh_in_background(symbol)
+    return records
+
+
+def get_reference(symbol, fetch_missing=True, queue_missing=False):
+    """One symbol's reference record, or None."""
+    return get_references([symbol], fetch_missing, queue_missing).get(symbol.upper())
+
+
+def _safe_refresh(symbol):
+    try:
+        return refresh_reference(symbol)
+    except Exception as e:
+        print(f"[REFERENCE_DATA] ❌ Could not fetch reference data for {symbol}: {str(e)}")
+        return None
+
+
+def refresh_reference_data(symbols):
+    """Refresh every symbol's record from yfinance; returns how many succeeded."""
+    symbols = list(dict.fromkeys(s.upper() for s in symbols if s))
+    if not symbols:
+        return 0
+    workers = min(REFERENCE_REFRESH_WORKERS, len(symbols))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        refreshed = sum(1 for record in executor.map(_safe_refresh, symbols) if record is not None)
+    print(f"[REFERENCE_DATA] ✅ Refreshed {refreshed}/{len(symbols)} symbols")
+    return refreshed
+
+
+def reference_stats():
+    return dict(_stats, cache=reference_cache.stats())
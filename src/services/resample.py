@@ -0,0 +1,178 @@
+# src/services/resample.py
+"""
+Weekly, monthly and intraday bar series resampled from base bars.
+
+Weekly and monthly bars are built from the daily bars in the history store;
+intraday bars are built from one-minute bars downloaded from yfinance and
+cached for INTRADAY_BARS_TTL seconds. Aggregation is a few NumPy reductions
+over group boundaries (first open, max high, min low, last close, summed
+volume), and each resampled series is kept in process until its base bars
+change, so a multi-year weekly or monthly chart costs a dictionary lookup.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+import yfinance as yf
+
+from services.circuit_breaker import breakers
+from services.http_clients import get_session, get_timeout
+from services.market_calendar import MARKET_TZ
+from services.quote_cache import QuoteCache
+from services.history_store import history_store, frame_to_bars, period_start, PERIOD_DAYS
+from services.history_store import DATE, OPEN, HIGH, LOW, CLOSE, VOLUME
+
+# Timeframe -> bucket: 'week'/'month' for calendar groups, seconds for intraday
+TIMEFRAMES = {
+    'D': None,
+    'W': 'week',
+    'M': 'month',
+    '1m': 60,
+    '5m': 300,
+    '15m': 900,
+    '30m': 1800,
+    '1h': 3600
+}
+DEFAULT_PERIODS = {'D': '1y', 'W': '5y', 'M': '10y'}
+INTRADAY_PERIODS = ('1d', '5d')
+
+INTRADAY_BARS_TTL = int(os.environ.get('INTRADAY_BARS_TTL', 60))
+RESAMPLE_CACHE_ENTRIES = int(os.environ.get('RESAMPLE_CACHE_ENTRIES', 512))
+
+intraday_cache = QuoteCache('intraday_bars', ttl=INTRADAY_BARS_TTL, max_entries=256)
+
+_resampled = OrderedDict()
+_resampled_lock = threading.Lock()
+
+
+def is_intraday(timeframe):
+    return isinstance(TIMEFRAMES.get(timeframe), int)
+
+
+def _bucket_keys(dates, bucket):
+    if bucket == 'week':
+        # Epoch day 0 was a Thursday; shifting by 3 days starts weeks on Monday
+        return (dates // 86400 + 3) // 7
+    if bucket == 'month':
+        return dates.astype('datetime64[s]').astype('datetime64[M]').astype(np.int64)
+    # Hourly buckets start on the half hour, like the 9:30 open
+    offset = 1800 % bucket
+    return (dates - offset) // bucket
+
+
+def aggregate_bars(bars, starts):
+    """One bar per group of consecutive (n, 6) bars; groups begin at the sorted indices in starts.
+
+    Each output bar is stamped with the timestamp of its first input bar.
+    """
+    ends = np.append(starts[1:], len(bars)) - 1
+    out = np.empty((len(starts), 6), dtype=np.float64)
+    out[:, DATE] = bars[starts, DATE]
+    out[:, OPEN] = bars[starts, OPEN]
+    out[:, HIGH] = np.maximum.reduceat(bars[:, HIGH], starts)
+    out[:, LOW] = np.minimum.reduceat(bars[:, LOW], starts)
+    out[:, CLOSE] = bars[ends, CLOSE]
+    out[:, VOLUME] = np.add.reduceat(bars[:, VOLUME], starts)
+    return out
+
+
+def resample_bars(bars, bucket):
+    """Aggregate (n, 6) bars into week, month or N-second buckets."""
+    if bars is None or len(bars) == 0:
+        return np.empty((0, 6), dtype=np.float64)
+    keys = _bucket_keys(bars[:, DATE].astype(np.int64), bucket)
+    return aggregate_bars(bars, np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]])))
+
+
+def _cached_resample(symbol, timeframe, base):
+    """Resampled bars, recomputed only when the base series has changed."""
+    if not len(base):
+        return resample_bars(base, TIMEFRAMES[timeframe])
+    fingerprint = (len(base), float(base[0, DATE]), float(base[-1, DATE]), float(base[-1, CLOSE]))
+    key = (symbol, timeframe)
+    with _resampled_lock:
+        cached = _resampled.get(key)
+        if cached is not None and cached[0] == fingerprint:
+            _resampled.move_to_end(key)
+            return cached[1]
+    bars = resample_bars(base, TIMEFRAMES[timeframe])
+    bars.setflags(write=False)
+    with _resampled_lock:
+        _resampled[key] = (fingerprint, bars)
+        _resampled.move_to_end(key)
+        while len(_resampled) > RESAMPLE_CACHE_ENTRIES:
+            _resampled.popitem(last=False)
+    return bars
+
+
+def intraday_base(symbol):
+    """The last five sessions of one-minute bars, shared through the cache."""
+    cached = intraday_cache.get(symbol)
+    if cached is not None:
+        return np.asarray(cached, dtype=np.float64).reshape(-1, 6)
+    ticker = yf.Ticker(symbol, session=get_session('yfinance'))
+    hist = breakers['yfinance'].call(
+        ticker.history, period='5d', interval='1m', timeout=get_timeout('yfinance')[1]
+    )
+    bars = frame_to_bars(hist, daily=False)
+    intraday_cache.set(symbol, bars.tolist())
+    return bars
+
+
+def _intraday_start(bars, period):
+    """Index of the first bar of the latest session for '1d', 0 for '5d'."""
+    if period != '1d' or not len(bars):
+        return 0
+    last_day = datetime.fromtimestamp(bars[-1, DATE], MARKET_TZ).date()
+    session_start = datetime(last_day.year, last_day.month, last_day.day, tzinfo=MARKET_TZ).timestamp()
+    return int(np.searchsorted(bars[:, DATE], session_start, side='left'))
+
+
+def get_bars(symbol, timeframe='D', period=None):
+    """(all bars at timeframe, index of the first bar in period).
+
+    Bars before the index are lookback for indicators; charts show
+    bars[start:]. Raises ValueError for an unknown timeframe or period.
+    """
+    if timeframe not in TIMEFRAMES:
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+    symbol = symbol.upper()
+
+    if is_intraday(timeframe):
+        period = period or '1d'
+        if period not in INTRADAY_PERIODS:
+            raise ValueError(f"Unsupported intraday period: {period}")
+        base = intraday_base(symbol)
+        bars = base if timeframe == '1m' else _cached_resample(symbol, timeframe, base)
+        return bars, _intraday_start(bars, period)
+
+    period = period or DEFAULT_PERIODS[timeframe]
+    if period not in PERIOD_DAYS and period not in ('ytd', 'max'):
+        raise ValueError(f"Unsupported period: {period}")
+    daily, start = history_store.get_with_lookback(symbol, period)
+    if daily is None or timeframe == 'D':
+        return daily, start
+    bars = _cached_resample(symbol, timeframe, daily)
+    return bars, int(np.searchsorted(bars[:, DATE], period_start(period), side='left'))
+
+
+def serialize_bars(bars, decimals=4):
+    """Columnar JSON-friendly bars: {'t', 'o', 'h', 'l', 'c', 'v'} lists."""
+    bars = np.asarray(bars, dtype=np.float64).reshape(-1, 6)
+    return {
+        't': bars[:, DATE].astype(np.int64).tolist(),
+        'o': np.round(bars[:, OPEN], decimals).tolist(),
+        'h': np.round(bars[:, HIGH], decimals).tolist(),
+        'l': np.round(bars[:, LOW], decimals).tolist(),
+        'c': np.round(bars[:, CLOSE], decimals).tolist(),
+        'v': bars[:, VOLUME].astype(np.int64).tolist()
+    }
+
+
+def resample_stats():
+    with _resampled_lock:
+        entries = len(_resampled)
+    return {'resampled_series': entries, 'intraday_cache': intraday_cache.stats()}
@@ -0,0 +1,254 @@
+# src/services/screener.py
+"""
+Columnar price and fundamentals snapshot behind the stock screener.
+
+A Celery beat task builds one snapshot of the screener universe (the S&P 500
+plus the popular stocks) every SCREENER_INTERVAL seconds while the market is
+trading: prices, changes and volumes from one grouped yfinance download, and
+market cap, P/E, beta, sector and dividend yield from the cached reference
+records. It is published as one versioned snapshot of columns
+(services/snapshot_store.py).
+
+Each worker keeps the decoded columns as NumPy arrays and only re-reads them
+when the version changes, so a screen is a handful of vectorized comparisons
+combined into one boolean mask, then a partial sort for the top results,
+with no upstream calls.
+
+Symbols without a reference record are queued for the background reference
+workers, and a snapshot missing some of them is rebuilt after an interval
+even with the market closed, so the fundamentals columns fill in without
+the nightly reference refresh.
+"""
+
+import os
+import time
+
+import numpy as np
+
+from utils.constants import POPULAR_STOCKS, SP500_SYMBOLS
+from services.indicators import to_list
+from services.market_data import fetch_historical_batch
+from services.market_calendar import market_status
+from services.reference_data import get_references
+from services.snapshot_store import VersionedSnapshot
+
+SCREENER_INTERVAL = int(os.environ.get('SCREENER_INTERVAL', 300))
+SCREENER_DEFAULT_LIMIT = 50
+SCREENER_MAX_LIMIT = 500
+
+NUMERIC_COLUMNS = (
+    'price', 'change', 'change_percent', 'volume', 'market_cap',
+    'pe', 'forward_pe', 'beta', 'dividend_yield', 'year_high', 'year_low'
+)
+TEXT_COLUMNS = ('symbol', 'name', 'sector', 'industry', 'exchange')
+# Text columns matched case-insensitively by substring
+SEARCH_COLUMNS = ('sector', 'industry')
+
+MARKET_CAP_TIERS = {
+    'mega': (200e9, np.inf),
+    'large': (10e9, 200e9),
+    'mid': (2e9, 10e9),
+    'small': (300e6, 2e9),
+    'micro': (50e6, 300e6),
+    'nano': (0, 50e6)
+}
+
+# yfinance exchange codes -> the names the screener filters on
+EXCHANGES = {
+    'NMS': 'NASDAQ', 'NGM': 'NASDAQ', 'NCM': 'NASDAQ', 'NAS': 'NASDAQ',
+    'NYQ': 'NYSE', 'NYS': 'NYSE',
+    'ASE': 'AMEX', 'AMEX': 'AMEX',
+    'PCX': 'NYSE ARCA', 'BTS': 'BATS'
+}
+
+
+def screener_universe():
+    """S&P 500 and popular symbols, or SCREENER_UNIVERSE (comma-separated) when set."""
+    override = os.environ.get('SCREENER_UNIVERSE')
+    if override:
+        return list(dict.fromkeys(s.strip().upper() for s in override.split(',') if s.strip()))
+    return list(dict.fromkeys(SP500_SYMBOLS + [stock["symbol"] for stock in POPULAR_STOCKS]))
+
+
+def compute_screener_snapshot(symbols=None):
+    """Build the column snapshot; symbols without price history are left out."""
+    symbols = symbols or screener_universe()
+    history = fetch_historical_batch(symbols, '5d')
+    # Records nobody has fetched yet are queued and picked up by a later snapshot
+    references = get_references(symbols, fetch_missing=False, queue_missing=True)
+
+    rows = [symbol for symbol in symbols if symbol in history]
+    columns = {name: np.full(len(rows), np.nan) for name in NUMERIC_COLUMNS}
+    text = {name: [] for name in TEXT_COLUMNS}
+    for i, symbol in enumerate(rows):
+        frame = history[symbol].dropna(subset=['close'])
+        closes = frame['close'].to_numpy()
+        if len(closes):
+            columns['price'][i] = closes[-1]
+            columns['volume'][i] = frame['volume'].iloc[-1]
+        if len(closes) > 1 and closes[-2]:
+            columns['change'][i] = closes[-1] - closes[-2]
+            columns['change_percent'][i] = (closes[-1] - closes[-2]) / closes[-2] * 100
+
+        record = references.get(symbol, {})
+        for name, field in (('market_cap', 'market_cap'), ('pe', 'trailing_pe'), ('forward_pe', 'forward_pe'),
+                            ('beta', 'beta'), ('dividend_yield', 'dividend_yield'),
+                            ('year_high', 'year_high'), ('year_low', 'year_low')):
+            value = record.get(field)
+            if isinstance(value, (int, float)):
+                columns[name][i] = value
+        text['symbol'].append(symbol)
+        text['name'].append(record.get('company_name') or symbol)
+        text['sector'].append(record.get('sector') or '')
+        text['industry'].append(record.get('industry') or '')
+        exchange = record.get('exchange') or ''
+        text['exchange'].append(EXCHANGES.get(exchange, exchange))
+
+    missing = sum(1 for symbol in rows if symbol not in references)
+    print(f"[SCREENER] ✅ Snapshot of {len(rows)}/{len(symbols)} symbols "
+          f"({len(references)} with reference data)")
+    return {
+        'built_at': time.time(),
+        'market_status': market_status(),
+        'missing_references': missing,
+        'columns': dict({name: to_list(values) for name, values in columns.items()}, **text)
+    }
+
+
+def _decode(snapshot):
+    """Snapshot with its columns as NumPy arrays, ready to screen."""
+    columns = snapshot['columns']
+    arrays = {name: np.array(columns[name], dtype=np.float64) for name in NUMERIC_COLUMNS}
+    arrays.update({name: np.array(columns[name], dtype=str) for name in TEXT_COLUMNS})
+    # Lowercased copies so text filters do not lowercase on every screen
+    arrays.update({f"{name}_key": np.char.lower(arrays[name]) for name in SEARCH_COLUMNS})
+    return dict(snapshot, columns=arrays, size=len(arrays['symbol']))
+
+
+def _missing_references(snapshot, age):
+    # Rebuild after an interval so records queued during the build are picked up
+    return bool(snapshot.get('missing_references')) and age >= SCREENER_INTERVAL
+
+
+screener_snapshots = VersionedSnapshot(
+    'screener', lambda: compute_screener_snapshot(), SCREENER_INTERVAL,
+    decode=_decode, expired=_missing_references, lease_ms=5 * 60 * 1000, build_timeout=300
+)
+
+
+def refresh_screener_snapshot(force=False):
+    """Rebuild and publish the snapshot if the calendar says it is due; returns the current one."""
+    return screener_snapshots.refresh(force)
+
+
+def get_screener_snapshot():
+    """Decoded snapshot for a screen; see VersionedSnapshot.get."""
+    return screener_snapshots.get()
+
+
+def _as_list(value):
+    if value is None or value == '':
+        return []
+    return value if isinstance(value, (list, tuple)) else [value]
+
+
+def _range_mask(values, bounds, name):
+    if not isinstance(bounds, dict):
+        raise ValueError(f"Filter for {name} must be an object with min and/or max")
+    mask = np.ones(len(values), dtype=bool)
+    # NaN fails every comparison, so symbols missing the value drop out
+    if bounds.get('min') is not None:
+        mask &= values >= float(bounds['min'])
+    if bounds.get('max') is not None:
+        mask &= values <= float(bounds['max'])
+    return mask
+
+
+def screen_mask(columns, size, criteria):
+    """Boolean mask of the rows matching every criterion."""
+    mask = np.ones(size, dtype=bool)
+
+    for name in SEARCH_COLUMNS:
+        terms = [str(term).lower() for term in _as_list(criteria.get(name))]
+        if terms:
+            keys = columns[f"{name}_key"]
+            mask &= np.logical_or.reduce([np.char.find(keys, term) >= 0 for term in terms])
+
+    exchanges = [str(term).upper() for term in _as_list(criteria.get('exchange'))]
+    if exchanges:
+        mask &= np.isin(columns['exchange'], exchanges)
+
+    tiers = _as_list(criteria.get('market_cap'))
+    if tiers:
+        unknown = [tier for tier in tiers if tier not in MARKET_CAP_TIERS]
+        if unknown:
+            raise ValueError(f"Unknown market cap tier: {', '.join(map(str, unknown))}")
+        caps = columns['market_cap']
+        mask &= np.logical_or.reduce([
+            (caps >= MARKET_CAP_TIERS[tier][0]) & (caps < MARKET_CAP_TIERS[tier][1]) for tier in tiers
+        ])
+
+    filters = criteria.get('filters') or {}
+    if not isinstance(filters, dict):
+        raise ValueError("filters must be an object of {column: {min, max}}")
+    for name, bounds in filters.items():
+        if name not in NUMERIC_COLUMNS:
+            raise ValueError(f"Unknown filter column: {name}")
+        mask &= _range_mask(columns[name], bounds, name)
+    return mask
+
+
+def top_k(values, rows, limit, descending=True):
+    """The limit rows (indices) with the largest or smallest values, in order; missing values last."""
+    if values.dtype.kind == 'f':
+        keys = -values[rows] if descending else values[rows]
+        keys = np.where(np.isnan(keys), np.inf, keys)
+    else:
+        keys = values[rows]
+    if limit < len(rows) and values.dtype.kind == 'f':
+        part = np.argpartition(keys, limit - 1)[:limit]
+        order = part[np.argsort(keys[part], kind='stable')]
+    else:
+        order = np.argsort(keys, kind='stable')
+        if descending and values.dtype.kind != 'f':
+            order = order[::-1]
+        order = order[:limit]
+    return rows[order]
+
+
+def screen(snapshot, criteria):
+    """Run criteria over a decoded snapshot.
+
+    criteria may hold sector/industry (substring, one or a list), exchange
+    (NYSE, NASDAQ, AMEX...), market_cap (tier names in MARKET_CAP_TIERS),
+    filters ({column: {'min', 'max'}} over NUMERIC_COLUMNS), sort (a column,
+    default market_cap), order ('asc' or 'desc') and limit. Raises ValueError
+    for an unknown column, tier or sort key.
+    """
+    criteria = criteria or {}
+    columns = snapshot['columns']
+    sort = criteria.get('sort') or 'market_cap'
+    if sort not in NUMERIC_COLUMNS and sort not in ('symbol', 'name'):
+        raise ValueError(f"Unknown sort column: {sort}")
+    descending = str(criteria.get('order', 'desc')).lower() != 'asc'
+    try:
+        limit = int(criteria.get('limit') or SCREENER_DEFAULT_LIMIT)
+    except (TypeError, ValueError):
+        raise ValueError("limit must be a number")
+    limit = min(max(limit, 1), SCREENER_MAX_LIMIT)
+
+    rows = np.flatnonzero(screen_mask(columns, snapshot['size'], criteria))
+    picked = top_k(columns[sort], rows, limit, descending)
+
+    values = {name: to_list(columns[name][picked]) for name in NUMERIC_COLUMNS}
+    values.update({name: columns[name][picked].tolist() for name in TEXT_COLUMNS})
+    results = [dict(zip(values, row)) for row in zip(*values.values())]
+    return {
+        'results': results,
+        'matches': len(rows),
+        'universe': snapshot['size'],
+        'sort': sort,
+        'order': 'desc' if descending else 'asc',
+        'as_of': snapshot.get('built_at'),
+        'version': snapshot.get('version')
+    }
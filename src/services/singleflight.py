@@ -0,0 +1,105 @@
+# src/services/singleflight.py
+"""
+Request coalescing for expensive upstream fetches.
+
+SingleFlight collapses concurrent calls for the same key inside one process so
+only the first caller runs the fetch and the rest wait for its result.
+RedisLease extends the idea across gunicorn workers with a short-lived lock.
+"""
+
+import threading
+import time
+import uuid
+
+from utils.db import redis_client
+
+
+class _Call:
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Run at most one in-flight call per key; concurrent callers share its result."""
+
+    def __init__(self, timeout=30):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if not call.event.wait(self.timeout):
+                # The leader is stuck; do the work ourselves rather than hang
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.event.set()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls)
+
+
+class RedisLease:
+    """Short cross-process lease so only one worker refreshes a key at a time."""
+
+    def __init__(self, key, ttl_ms=5000, redis=None):
+        self.key = f"lease:{key}"
+        self.ttl_ms = ttl_ms
+        self.redis = redis if redis is not None else redis_client
+        self.token = uuid.uuid4().hex
+        self.acquired = False
+
+    def acquire(self):
+        try:
+            self.acquired = bool(self.redis.set(self.key, self.token, nx=True, px=self.ttl_ms))
+        except Exception as e:
+            # Without Redis there is nothing to coordinate with, so proceed
+            print(f"[SINGLEFLIGHT] ⚠️ Lease unavailable for {self.key}: {str(e)}")
+            self.acquired = True
+        return self.acquired
+
+    def release(self):
+        if not self.acquired:
+            return
+        try:
+            if self.redis.get(self.key) == self.token:
+                self.redis.delete(self.key)
+        except Exception as e:
+            print(f"[SINGLEFLIGHT] ⚠️ Lease release failed for {self.key}: {str(e)}")
+        self.acquired = False
+
+
+def wait_for(lookup, timeout, interval=0.1):
+    """Poll lookup() until it returns a value or timeout seconds pass."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        time.sleep(interval)
+        value = lookup()
+        if value is not None:
+            return value
+    return None
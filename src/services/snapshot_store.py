@@ -0,0 +1,169 @@
+# src/services/snapshot_store.py
+"""
+Versioned snapshots shared by every worker through Redis.
+
+The market overview and the screener are each one object computed on a
+schedule and read on every page view. A VersionedSnapshot stores it as one
+JSON value next to a small version counter: readers fetch the counter and
+only download and decode the snapshot when another worker has published a
+newer version.
+
+A Celery beat task normally rebuilds the snapshot every interval while the
+market is trading, and once after the close. If beat falls behind or is not
+running, a reader that finds an out-of-date snapshot still serves it while
+one worker rebuilds it in the background under a Redis lease; a reader that
+finds none builds it itself, once per process.
+"""
+
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.db import redis_client
+from services.market_calendar import market_status, last_close, CLOSE_SETTLE
+from services.singleflight import SingleFlight, RedisLease
+
+# A snapshot survives a long weekend; the beat task replaces it well before then
+DEFAULT_SNAPSHOT_TTL = 4 * 24 * 3600
+
+
+class VersionedSnapshot:
+    """One Redis-backed snapshot named name, built by compute() every interval seconds.
+
+    decode turns the stored JSON object into what readers get (e.g. NumPy
+    columns); expired(snapshot, age) can mark a snapshot out of date whatever
+    the market calendar says.
+    """
+
+    def __init__(self, name, compute, interval, ttl=DEFAULT_SNAPSHOT_TTL, decode=None, expired=None,
+                 lease_ms=60 * 1000, build_timeout=60):
+        self.name = name
+        self.compute = compute
+        self.interval = interval
+        self.ttl = ttl
+        self.decode = decode or (lambda snapshot: snapshot)
+        self.expired = expired
+        self.lease_ms = lease_ms
+        self.snapshot_key = f"{name}:snapshot"
+        self.version_key = f"{name}:version"
+        # Readers leave the beat task this much slack before rebuilding themselves
+        self.request_refresh_age = interval * 1.5
+        self._local = {'version': None, 'snapshot': None, 'refreshing': False}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight(timeout=build_timeout)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{name}-refresh")
+        self._log = f"[{name.upper()}]"
+
+    def _next_version(self):
+        try:
+            return int(redis_client.incr(self.version_key))
+        except Exception:
+            # No shared counter available; milliseconds still increase monotonically
+            return int(time.time() * 1000)
+
+    def publish(self, snapshot):
+        """Store a snapshot under a new version number and return it decoded."""
+        snapshot = dict(snapshot, version=self._next_version())
+        try:
+            pipe = redis_client.pipeline(transaction=True)
+            pipe.set(self.snapshot_key, json.dumps(snapshot), ex=self.ttl)
+            pipe.set(self.version_key, snapshot['version'], ex=self.ttl)
+            pipe.execute()
+        except Exception as e:
+            print(f"{self._log} ⚠️ Could not publish snapshot: {str(e)}")
+        decoded = self.decode(snapshot)
+        with self._lock:
+            self._local['version'] = snapshot['version']
+            self._local['snapshot'] = decoded
+        return decoded
+
+    def read(self):
+        """The current decoded snapshot, or None; it is only re-read when its version changes."""
+        try:
+            version = redis_client.get(self.version_key)
+        except Exception:
+            version = None
+        with self._lock:
+            if self._local['snapshot'] is not None and (version is None or int(version) == self._local['version']):
+                return self._local['snapshot']
+        if version is None:
+            return None
+        try:
+            raw = redis_client.get(self.snapshot_key)
+            snapshot = self.decode(json.loads(raw)) if raw else None
+        except (TypeError, ValueError, KeyError) as e:
+            print(f"{self._log} ⚠️ Unreadable snapshot: {str(e)}")
+            snapshot = None
+        if snapshot is not None:
+            with self._lock:
+                self._local['version'] = snapshot.get('version')
+                self._local['snapshot'] = snapshot
+        return snapshot
+
+    def is_current(self, snapshot, now=None, max_age=None):
+        """False when the snapshot should be rebuilt according to the market calendar.
+
+        While trading, a snapshot older than max_age seconds is out of date; the
+        default of half an interval lets a beat tick that fires slightly early
+        still rebuild.
+        """
+        if snapshot is None:
+            return False
+        now = now or time.time()
+        built_at = snapshot.get('built_at', 0)
+        if self.expired is not None and self.expired(snapshot, now - built_at):
+            return False
+        if market_status() != 'closed':
+            return now - built_at < (max_age or self.interval / 2)
+        # Closed: one snapshot taken after the last close has settled stays valid
+        closed = last_close()
+        return closed is None or built_at >= (closed + CLOSE_SETTLE).timestamp()
+
+    def refresh(self, force=False):
+        """Rebuild and publish the snapshot if the calendar says it is due; returns the current one."""
+        snapshot = self.read()
+        if not force and self.is_current(snapshot):
+            return snapshot
+        return self._flight.do(self.name, lambda: self.publish(self.compute()))
+
+    def refresh_in_background(self):
+        """Rebuild the snapshot off the request path; one worker at a time holds the lease."""
+        with self._lock:
+            if self._local['refreshing']:
+                return
+            self._local['refreshing'] = True
+
+        def _refresh():
+            lease = RedisLease(f"{self.name}:refresh", ttl_ms=self.lease_ms)
+            try:
+                if lease.acquire():
+                    self.refresh()
+            except Exception as e:
+                logging.error(f"Error refreshing {self.name} snapshot: {str(e)}")
+            finally:
+                lease.release()
+                with self._lock:
+                    self._local['refreshing'] = False
+
+        self._executor.submit(_refresh)
+
+    def get(self):
+        """Snapshot for a page view or API call.
+
+        Normally this is whatever the beat task published last. An out-of-date
+        snapshot is still served while it is rebuilt in the background. Without
+        one (beat not running, or a cold Redis) the first caller builds it and
+        concurrent callers in the process wait on that single build.
+        """
+        snapshot = self.read()
+        if snapshot is not None:
+            if not self.is_current(snapshot, max_age=self.request_refresh_age):
+                self.refresh_in_background()
+            return snapshot
+        try:
+            return self.refresh(force=True)
+        except Exception as e:
+            logging.error(f"Error building {self.name} snapshot: {str(e)}")
+            return None
@@ -1,16 +1,28 @@
 # src/services/tasks.py
 from utils.db import db
 from .market_data import fetch_stock_data
+from .market_calendar import market_status
+from .reference_data import refresh_reference_data as refresh_references
+from .industry_index import rebuild_industry_index
+from .market_overview import refresh_market_overview
+from .screener import refresh_screener_snapshot, screener_universe
+from utils.constants import POPULAR_STOCKS
 from celery import Celery
+from celerybeat_schedule import CELERYBEAT_SCHEDULE
 
 celery_app = Celery(
     "stock_trading",
     broker="redis://localhost:6379/0",  # Make sure Redis is running
     backend="redis://localhost:6379/0"
 )
+celery_app.conf.beat_schedule = CELERYBEAT_SCHEDULE
 
-@celery_app.task
+@celery_app.task(bind=True)
 def update_stock_prices(self):
+    # Equity quotes do not move while the market is shut, so skip the refresh entirely
+    if market_status() == 'closed':
+        print("[TASK] Market closed, skipping stock price refresh")
+        return
     try:
         portfolios = db.collection('portfolios').get()
         for portfolio in portfolios:
@@ -19,4 +31,39 @@ def update_stock_prices(self):
             if data and 'error' not in data:
                 portfolio.reference.update({'latest_price': data['close']})
     except Exception as e:
-        self.retry(exc=e)
\ No newline at end of file
+        self.retry(exc=e)
+
+@celery_app.task(bind=True)
+def refresh_reference_data(self):
+    # Nightly: re-fetch company info for every held, watched, popular and screened symbol
+    from stream_worker import held_and_watched_symbols
+    try:
+        symbols = sorted({stock["symbol"] for stock in POPULAR_STOCKS} | held_and_watched_symbols() | set(screener_universe()))
+        refreshed = refresh_references(symbols)
+        # Related-stock lookups read this index instead of scanning reference records
+        rebuild_industry_index(symbols)
+        # The screener's fundamentals columns come from the records just refreshed
+        refresh_screener_snapshot(force=True)
+        return refreshed
+    except Exception as e:
+        self.retry(exc=e)
+
+@celery_app.task(bind=True)
+def update_market_overview(self):
+    # Runs every MARKET_OVERVIEW_INTERVAL; refresh_market_overview skips the rebuild
+    # once the post-close snapshot exists
+    try:
+        snapshot = refresh_market_overview()
+        return snapshot.get('version') if snapshot else None
+    except Exception as e:
+        self.retry(exc=e)
+
+@celery_app.task(bind=True)
+def update_screener_snapshot(self):
+    # Runs every SCREENER_INTERVAL; like the market overview, one post-close snapshot
+    # is kept until the next session
+    try:
+        snapshot = refresh_screener_snapshot()
+        return snapshot.get('version') if snapshot else None
+    except Exception as e:
+        self.retry(exc=e)
@@ -0,0 +1,179 @@
+# src/services/tick_store.py
+"""
+In-memory intraday tick store backed by NumPy ring buffers.
+
+Each symbol gets a preallocated float64 array of (ts, price, volume) rows.
+Every row is written twice, at slot i and at slot i + capacity, so the most
+recent n rows are always one contiguous slice: windows are zero-copy views
+and appends are O(1) with no reallocation. Ticks that fall in the same
+TICK_RESOLUTION-second bucket are merged into one row, which bounds memory
+per symbol no matter how busy the stream is.
+
+The live price hub and the quote refresh path write here; intraday charts and
+day-change calculations read straight from the arrays.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from services.market_calendar import MARKET_TZ, session_times
+
+TS, PRICE, VOLUME = 0, 1, 2
+
+TICK_CAPACITY = int(os.environ.get('TICK_CAPACITY', 4096))
+TICK_RESOLUTION = float(os.environ.get('TICK_RESOLUTION', 1.0))
+TICK_MAX_SYMBOLS = int(os.environ.get('TICK_MAX_SYMBOLS', 128))
+
+
+class TickRing:
+    """Fixed-size ring of (ts, price, volume) rows for one symbol."""
+
+    def __init__(self, capacity=TICK_CAPACITY, resolution=TICK_RESOLUTION):
+        self.capacity = capacity
+        self.resolution = resolution
+        self._buf = np.zeros((2 * capacity, 3), dtype=np.float64)
+        self._next = 0
+        self._size = 0
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+    def __len__(self):
+        return self._size
+
+    def append(self, ts, price, volume=0.0):
+        """Add a tick; ticks older than the newest one are dropped."""
+        with self._lock:
+            if self._size:
+                last = (self._next - 1) % self.capacity
+                last_ts = self._buf[last, TS]
+                if ts < last_ts:
+                    self.dropped += 1
+                    return False
+                if ts // self.resolution == last_ts // self.resolution:
+                    # Same time bucket: the row keeps the bucket's first timestamp,
+                    # takes the latest price and accumulates volume
+                    volume += self._buf[last, VOLUME]
+                    self._write(last, last_ts, price, volume)
+                    return True
+            self._write(self._next, ts, price, volume)
+            self._next = (self._next + 1) % self.capacity
+            self._size = min(self._size + 1, self.capacity)
+            return True
+
+    def _write(self, slot, ts, price, volume):
+        row = (ts, price, volume)
+        self._buf[slot] = row
+        self._buf[slot + self.capacity] = row
+
+    def last(self, n=None):
+        """View of the newest n rows (all rows if n is None), oldest first.
+
+        The view shares memory with the ring; copy it if it must survive
+        later appends unchanged.
+        """
+        with self._lock:
+            size = self._size if n is None else max(0, min(n, self._size))
+            end = self._next + self.capacity
+            return self._buf[end - size:end]
+
+    def since(self, ts):
+        """View of the rows with timestamp >= ts."""
+        window = self.last()
+        start = np.searchsorted(window[:, TS], ts, side='left')
+        return window[start:]
+
+    def latest(self):
+        """Newest (ts, price, volume) row, or None."""
+        window = self.last(1)
+        return tuple(float(value) for value in window[0]) if len(window) else None
+
+
+class TickStore:
+    """Tick rings for many symbols; the least recently written symbol is evicted."""
+
+    def __init__(self, capacity=TICK_CAPACITY, max_symbols=TICK_MAX_SYMBOLS, resolution=TICK_RESOLUTION):
+        self.capacity = capacity
+        self.max_symbols = max_symbols
+        self.resolution = resolution
+        self._rings = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _ring(self, symbol, create=False):
+        with self._lock:
+            ring = self._rings.get(symbol)
+            if ring is None:
+                if not create:
+                    return None
+                ring = TickRing(self.capacity, self.resolution)
+                self._rings[symbol] = ring
+                while len(self._rings) > self.max_symbols:
+                    self._rings.popitem(last=False)
+            self._rings.move_to_end(symbol)
+            return ring
+
+    def append(self, symbol, ts, price, volume=0.0):
+        if not price:
+            return False
+        return self._ring(symbol, create=True).append(float(ts), float(price), float(volume or 0))
+
+    def window(self, symbol, seconds=None, since=None):
+        """Zero-copy (n, 3) view of a symbol's ticks: all of them, the last
+        `seconds`, or those at or after the `since` timestamp."""
+        ring = self._ring(symbol)
+        if ring is None:
+            return np.empty((0, 3), dtype=np.float64)
+        if seconds is not None:
+            latest = ring.latest()
+            if latest is None:
+                return ring.last(0)
+            return ring.since(latest[TS] - seconds)
+        if since is not None:
+            return ring.since(since)
+        return ring.last()
+
+    def latest(self, symbol):
+        """Newest (ts, price, volume) for symbol, or None."""
+        ring = self._ring(symbol)
+        return ring.latest() if ring is not None else None
+
+    def session_ticks(self, symbol, now=None):
+        """View of today's ticks from the start of pre-market."""
+        now = now or datetime.now(MARKET_TZ)
+        times = session_times(now.astimezone(MARKET_TZ).date())
+        if times is None:
+            return np.empty((0, 3), dtype=np.float64)
+        return self.window(symbol, since=times[0].timestamp())
+
+    def session_stats(self, symbol, now=None):
+        """Open/high/low/last/volume of today's ticks, or None without ticks."""
+        ticks = self.session_ticks(symbol, now)
+        if not len(ticks):
+            return None
+        prices = ticks[:, PRICE]
+        return {
+            'open': float(prices[0]),
+            'high': float(prices.max()),
+            'low': float(prices.min()),
+            'last': float(prices[-1]),
+            'volume': float(ticks[:, VOLUME].sum()),
+            'ts': float(ticks[-1, TS]),
+            'ticks': len(ticks)
+        }
+
+    def stats(self):
+        with self._lock:
+            rings = list(self._rings.values())
+        return {
+            'symbols': len(rings),
+            'ticks': sum(len(ring) for ring in rings),
+            'dropped': sum(ring.dropped for ring in rings),
+            'capacity': self.capacity,
+            'bytes': sum(ring._buf.nbytes for ring in rings)
+        }
+
+
+tick_store = TickStore()
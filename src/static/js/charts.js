@@ -0,0 +1,41 @@
+// Charts drawn from the JSON figure specs served by /api/chart/<symbol>.
+// Any element with data-chart-url is drawn on page load. TouZiCharts.draw(el, params)
+// redraws it with some query parameters changed (e.g. {range: '5Y'}). The element's
+// width is sent along so the server only sends as many points as can be drawn. Specs
+// are sent with an ETag, so the browser cache revalidates an unchanged chart with a 304.
+(function () {
+    function chartUrl(el, params) {
+        const url = new URL(el.dataset.chartUrl, window.location.origin);
+        Object.entries(params || {}).forEach(([name, value]) => url.searchParams.set(name, value));
+        url.searchParams.set('width', Math.round(el.clientWidth || window.innerWidth));
+        return url.pathname + url.search;
+    }
+
+    async function draw(el, params) {
+        const url = chartUrl(el, params);
+        el.dataset.chartUrl = url;
+        el.classList.add('loading');
+        try {
+            const response = await fetch(url, {credentials: 'same-origin'});
+            if (!response.ok) {
+                throw new Error('HTTP ' + response.status);
+            }
+            const spec = await response.json();
+            // Another draw may have been started while this one was loading
+            if (el.dataset.chartUrl === url) {
+                Plotly.react(el, spec.data, spec.layout, {responsive: true, displaylogo: false});
+            }
+        } catch (error) {
+            console.error('Failed to load chart ' + url + ':', error);
+            el.textContent = 'Chart unavailable';
+        } finally {
+            el.classList.remove('loading');
+        }
+    }
+
+    window.TouZiCharts = {draw: draw};
+
+    document.addEventListener('DOMContentLoaded', () => {
+        document.querySelectorAll('[data-chart-url]').forEach(el => draw(el));
+    });
+})();
@@ -0,0 +1,37 @@
+// Live price updates over Server-Sent Events.
+// Any element with data-live-price="SYMBOL" has its text replaced with the latest
+// streamed price; data-decimals sets the number of decimals (default 2) and
+// data-prefix is put in front (e.g. "$").
+// The stream URL comes from this script tag's data-stream-url: the price stream
+// service (with a signed token) in production, the app's own route otherwise.
+(function () {
+    const streamUrl = document.currentScript && document.currentScript.dataset.streamUrl;
+
+    function liveElements() {
+        return document.querySelectorAll('[data-live-price]');
+    }
+
+    function connect() {
+        const elements = liveElements();
+        if (!elements.length || !window.EventSource || !streamUrl) {
+            return;
+        }
+
+        const symbols = new Set();
+        elements.forEach(el => symbols.add(el.dataset.livePrice.toUpperCase()));
+
+        const url = new URL(streamUrl, window.location.origin);
+        url.searchParams.set('symbols', Array.from(symbols).join(','));
+        const source = new EventSource(url.toString());
+        source.addEventListener('price', event => {
+            const update = JSON.parse(event.data);
+            document.querySelectorAll('[data-live-price="' + update.symbol + '"]').forEach(el => {
+                const decimals = parseInt(el.dataset.decimals || '2', 10);
+                el.textContent = (el.dataset.prefix || '') + Number(update.price).toFixed(decimals);
+            });
+        });
+        // EventSource reconnects on its own using the server's retry interval
+    }
+
+    document.addEventListener('DOMContentLoaded', connect);
+})();
@@ -0,0 +1,197 @@
+# src/stream_worker.py
+"""
+Finnhub WebSocket ingester.
+
+Streams trades for every symbol held in a portfolio or on a watchlist and
+keeps the live price table in services.live_prices up to date. Run it next to
+the Celery worker:
+
+    python stream_worker.py
+
+FINNHUB_WS_URL points the worker at another endpoint, e.g. a local stand-in
+such as ws://127.0.0.1:8765 for testing.
+"""
+
+import asyncio
+import json
+import os
+import random
+import time
+
+import aiohttp
+
+from utils.db import db, redis_client
+from services.live_prices import record_trades, requested_symbols
+from services.market_calendar import is_crypto_symbol
+
+FINNHUB_WS_URL = os.environ.get('FINNHUB_WS_URL', 'wss://ws.finnhub.io')
+# Finnhub's free tier streams at most 50 symbols per connection
+MAX_STREAM_SYMBOLS = int(os.environ.get('MAX_STREAM_SYMBOLS', 50))
+# How often subscriptions are reconciled against requests and Firestore
+SYNC_INTERVAL = float(os.environ.get('STREAM_SYNC_INTERVAL', 5))
+FIRESTORE_SCAN_INTERVAL = float(os.environ.get('STREAM_FIRESTORE_SCAN_INTERVAL', 300))
+# Reconnect backoff: doubles from the base up to the cap, with jitter
+RECONNECT_BASE_DELAY = float(os.environ.get('STREAM_RECONNECT_BASE_DELAY', 1))
+RECONNECT_MAX_DELAY = float(os.environ.get('STREAM_RECONNECT_MAX_DELAY', 60))
+# A connection that stayed up this long resets the backoff
+HEALTHY_CONNECTION_SECONDS = 60
+
+
+def held_and_watched_symbols():
+    """Every symbol in a portfolio or on a watchlist."""
+    symbols = set()
+    for doc in db.collection('portfolios').stream():
+        symbol = (doc.to_dict() or {}).get('symbol')
+        if symbol:
+            symbols.add(symbol.upper())
+    for doc in db.collection('watchlists').stream():
+        for symbol in (doc.to_dict() or {}).get('symbols', []):
+            if symbol:
+                symbols.add(symbol.upper())
+    return symbols
+
+
+def parse_trades(message):
+    """Trades in a Finnhub 'trade' message as record_trades() dicts."""
+    if message.get('type') != 'trade':
+        return []
+    trades = []
+    for trade in message.get('data') or []:
+        try:
+            trades.append({
+                'symbol': trade['s'],
+                'price': float(trade['p']),
+                'ts': trade['t'] / 1000.0,
+                'volume': trade.get('v', 0)
+            })
+        except (KeyError, TypeError, ValueError):
+            continue
+    return trades
+
+
+class FinnhubStreamIngester:
+    """Keeps one Finnhub WebSocket open and mirrors its trades into Redis."""
+
+    def __init__(self, url=FINNHUB_WS_URL, token=None, symbol_source=held_and_watched_symbols,
+                 redis=None, max_symbols=MAX_STREAM_SYMBOLS):
+        self.url = url
+        self.token = token
+        self.symbol_source = symbol_source
+        self.redis = redis if redis is not None else redis_client
+        self.max_symbols = max_symbols
+        self.subscribed = set()
+        self._scanned = set()
+        self._scanned_at = 0.0
+        self._ws = None
+        self.trades_received = 0
+        self.reconnects = 0
+
+    def desired_symbols(self):
+        """Symbols that should be streamed right now, capped at max_symbols."""
+        now = time.time()
+        if now - self._scanned_at >= FIRESTORE_SCAN_INTERVAL:
+            try:
+                self._scanned = set(self.symbol_source())
+                self._scanned_at = now
+            except Exception as e:
+                print(f"[STREAM_WORKER] ⚠️ Symbol scan failed, keeping previous set: {str(e)}")
+        wanted = {s for s in self._scanned | requested_symbols(self.redis) if not is_crypto_symbol(s)}
+        # Keep what is already streaming before adding new symbols
+        keep = sorted(wanted & self.subscribed)
+        add = sorted(wanted - self.subscribed)
+        return set((keep + add)[:self.max_symbols])
+
+    async def sync_subscriptions(self):
+        """Subscribe to new symbols and unsubscribe from ones no longer needed."""
+        desired = await asyncio.to_thread(self.desired_symbols)
+        for symbol in sorted(self.subscribed - desired):
+            await self._ws.send_str(json.dumps({'type': 'unsubscribe', 'symbol': symbol}))
+            self.subscribed.discard(symbol)
+        for symbol in sorted(desired - self.subscribed):
+            await self._ws.send_str(json.dumps({'type': 'subscribe', 'symbol': symbol}))
+            self.subscribed.add(symbol)
+        return desired
+
+    async def _sync_loop(self):
+        while True:
+            await asyncio.sleep(SYNC_INTERVAL)
+            try:
+                await self.sync_subscriptions()
+            except Exception as e:
+                print(f"[STREAM_WORKER] ⚠️ Subscription sync failed: {str(e)}")
+
+    async def _read_loop(self):
+        async for msg in self._ws:
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                try:
+                    message = json.loads(msg.data)
+                except ValueError:
+                    continue
+                if message.get('type') == 'error':
+                    print(f"[STREAM_WORKER] ⚠️ Finnhub error: {message.get('msg')}")
+                    continue
+                trades = parse_trades(message)
+                if trades:
+                    self.trades_received += len(trades)
+                    try:
+                        await asyncio.to_thread(record_trades, trades, self.redis)
+                    except Exception as e:
+                        print(f"[STREAM_WORKER] ⚠️ Could not record {len(trades)} trade(s): {str(e)}")
+            elif msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                break
+
+    async def run_once(self, session):
+        """Stream until the connection drops."""
+        url = f"{self.url}?token={self.token}" if self.token else self.url
+        async with session.ws_connect(url, heartbeat=30) as ws:
+            print(f"[STREAM_WORKER] Connected to {self.url}")
+            self._ws = ws
+            # Finnhub forgets subscriptions when a connection closes
+            self.subscribed = set()
+            desired = await self.sync_subscriptions()
+            print(f"[STREAM_WORKER] Streaming {len(desired)} symbol(s)")
+            sync_task = asyncio.ensure_future(self._sync_loop())
+            try:
+                await self._read_loop()
+            finally:
+                sync_task.cancel()
+                self._ws = None
+
+    async def run(self):
+        """Stream forever, reconnecting with exponential backoff and jitter."""
+        delay = RECONNECT_BASE_DELAY
+        async with aiohttp.ClientSession() as session:
+            while True:
+                started = time.time()
+                try:
+                    await self.run_once(session)
+                    print("[STREAM_WORKER] Connection closed by server")
+                except (aiohttp.ClientError, asyncio.TimeoutError, OSError) as e:
+                    print(f"[STREAM_WORKER] ❌ Connection failed: {str(e)}")
+                if time.time() - started >= HEALTHY_CONNECTION_SECONDS:
+                    delay = RECONNECT_BASE_DELAY
+                sleep_for = delay * random.uniform(0.5, 1.5)
+                print(f"[STREAM_WORKER] Reconnecting in {sleep_for:.1f}s")
+                await asyncio.sleep(sleep_for)
+                self.reconnects += 1
+                delay = min(RECONNECT_MAX_DELAY, delay * 2)
+
+
+def load_token():
+    """Finnhub key for the stream: FINNHUB_API_KEY, else the first key in api_keys.py."""
+    token = os.environ.get('FINNHUB_API_KEY')
+    if token:
+        return token
+    try:
+        import api_keys as api_keys_file
+        keys = [key for key in getattr(api_keys_file, 'FINNHUB_API_KEYS', []) if key]
+        return keys[0] if keys else None
+    except ImportError:
+        return None
+
+
+if __name__ == '__main__':
+    token = load_token()
+    if not token:
+        print("[STREAM_WORKER] ⚠️ No Finnhub API key configured; connecting without a token")
+    asyncio.run(FinnhubStreamIngester(token=token).run())
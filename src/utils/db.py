@@ -17,8 +17,9 @@ except redis.ConnectionError:
     print("Warning: Redis connection failed, falling back to dummy cache")
     class DummyRedis:
         def get(self, *args): return None
-        def set(self, *args, **kwargs): pass
+        def set(self, *args, **kwargs): return True
         def setex(self, *args, **kwargs): pass
+        def delete(self, *args): return 0
     redis_client = DummyRedis()
 
 def init_db():
@@ -0,0 +1,154 @@
+"""
+Tests for the Finnhub WebSocket ingester against a local aiohttp WebSocket server.
+Run with pytest, or run this script directly.
+"""
+
+import asyncio
+import json
+import sys
+import os
+import types
+
+from aiohttp import web, ClientSession
+
+# Add src to path to be able to import modules
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+
+class MemoryRedis:
+    """The few Redis commands the ingester and the live price table use."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.zsets = {}
+        self.published = []
+
+    def pipeline(self, transaction=True):
+        return self
+
+    def execute(self):
+        return []
+
+    def hset(self, key, field, value):
+        self.hashes.setdefault(key, {})[field] = value
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def zadd(self, key, mapping):
+        self.zsets.setdefault(key, {}).update(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        members = self.zsets.get(key, {})
+        for member, score in list(members.items()):
+            if score <= high:
+                del members[member]
+
+    def zrange(self, key, start, end):
+        return sorted(self.zsets.get(key, {}))
+
+
+# utils.db connects to Firestore on import; the ingester under test is handed its
+# symbol source and Redis, so it never reaches the database
+_db_stub = types.ModuleType('utils.db')
+_db_stub.db = None
+_db_stub.redis_client = MemoryRedis()
+_db_stub.REDIS_URL = 'redis://127.0.0.1:6379/0'
+sys.modules.setdefault('utils.db', _db_stub)
+
+import stream_worker
+from stream_worker import FinnhubStreamIngester
+from services.live_prices import get_live_price, request_subscription
+
+
+class FakeFinnhub:
+    """Local stand-in for wss://ws.finnhub.io that answers each subscribe with one trade."""
+
+    def __init__(self):
+        self.messages = []
+        self.sockets = []
+
+    async def handle(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self.sockets.append(ws)
+        async for msg in ws:
+            message = json.loads(msg.data)
+            self.messages.append((message['type'], message['symbol']))
+            if message['type'] == 'subscribe':
+                await ws.send_str(json.dumps({
+                    'type': 'trade',
+                    'data': [{'s': message['symbol'], 'p': 101.5, 't': 1700000000000, 'v': 10}]
+                }))
+        return ws
+
+    def sent(self, kind):
+        return {symbol for message_type, symbol in self.messages if message_type == kind}
+
+
+async def _wait_until(condition, timeout=5):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.02)
+
+
+async def _stream_against_local_server():
+    server = FakeFinnhub()
+    app = web.Application()
+    app.router.add_get('/', server.handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = runner.addresses[0][1]
+
+    redis = MemoryRedis()
+    held = {'AAPL', 'MSFT'}
+    ingester = FinnhubStreamIngester(url=f"ws://127.0.0.1:{port}/", symbol_source=lambda: set(held), redis=redis)
+    try:
+        async with ClientSession() as session:
+            stream = asyncio.ensure_future(ingester.run_once(session))
+
+            # Connecting subscribes to the held symbols and their trades reach the live table
+            await _wait_until(lambda: get_live_price('AAPL', redis=redis) is not None)
+            assert server.sent('subscribe') == {'AAPL', 'MSFT'}
+            trade = get_live_price('AAPL', redis=redis)
+            assert trade['price'] == 101.5
+            assert trade['ts'] == 1700000000.0
+
+            # Later syncs follow the symbol set: MSFT is sold, TSLA bought, NVDA requested
+            held.discard('MSFT')
+            held.add('TSLA')
+            request_subscription('nvda', redis=redis)
+            await _wait_until(lambda: ingester.subscribed == {'AAPL', 'TSLA', 'NVDA'}
+                              and {'TSLA', 'NVDA'} <= server.sent('subscribe')
+                              and 'MSFT' in server.sent('unsubscribe'))
+            assert server.sent('unsubscribe') == {'MSFT'}
+            await _wait_until(lambda: get_live_price('TSLA', redis=redis) is not None)
+
+            # The server closing the socket ends the run
+            await server.sockets[0].close()
+            await asyncio.wait_for(stream, timeout=5)
+    finally:
+        await runner.cleanup()
+    return ingester
+
+
+def test_stream_worker_records_trades_and_follows_symbols():
+    saved = stream_worker.SYNC_INTERVAL, stream_worker.FIRESTORE_SCAN_INTERVAL
+    # Re-read the symbol set on every quick sync
+    stream_worker.SYNC_INTERVAL, stream_worker.FIRESTORE_SCAN_INTERVAL = 0.05, 0
+    try:
+        ingester = asyncio.run(_stream_against_local_server())
+    finally:
+        stream_worker.SYNC_INTERVAL, stream_worker.FIRESTORE_SCAN_INTERVAL = saved
+    assert ingester.trades_received >= 4
+
+
+if __name__ == "__main__":
+    test_stream_worker_records_trades_and_follows_symbols()
+    print("✅ stream worker tests passed")
@@ -0,0 +1,43 @@
+"""
+Tests for the intraday tick ring buffers.
+Run with pytest, or run this script directly.
+"""
+
+import sys
+import os
+
+import numpy as np
+
+# Add src to path to be able to import modules
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+from services.tick_store import TickRing, TS, PRICE, VOLUME
+
+
+def test_sub_second_ticks_write_one_row_per_second():
+    """A symbol trading ten times a second still gets one row per second."""
+    ring = TickRing(capacity=64, resolution=1.0)
+    start = 1_700_000_000.0
+    for i in range(50):
+        ring.append(start + i * 0.1, 100.0 + i, 1.0)
+
+    rows = ring.last()
+    assert len(rows) == 5
+    assert rows[:, TS].tolist() == [start + second for second in range(5)]
+    # Each row closes on the bucket's last price and holds all of its volume
+    assert rows[:, PRICE].tolist() == [109.0, 119.0, 129.0, 139.0, 149.0]
+    assert np.all(rows[:, VOLUME] == 10.0)
+
+
+def test_out_of_order_ticks_are_dropped():
+    ring = TickRing(capacity=8, resolution=1.0)
+    ring.append(10.0, 1.0)
+    assert ring.append(9.0, 2.0) is False
+    assert ring.dropped == 1
+    assert ring.latest() == (10.0, 1.0, 0.0)
+
+
+if __name__ == "__main__":
+    test_sub_second_ticks_write_one_row_per_second()
+    test_out_of_order_ticks_are_dropped()
+    print("✅ tick store tests passed")
@@ -0,0 +1,85 @@
+"""
+Tests for the quotes buy and sell execute at.
+Run with pytest, or run this script directly.
+"""
+
+import sys
+import os
+import types
+from datetime import datetime, timedelta, timezone
+
+# Add src to path to be able to import modules
+sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
+
+
+class DummyRedis:
+    """Same shape as the fallback utils.db uses when Redis is down."""
+    def get(self, *args): return None
+    def set(self, *args, **kwargs): return True
+    def setex(self, *args, **kwargs): pass
+    def delete(self, *args): return 0
+
+
+# utils.db connects to Firestore on import; these tests never reach the database
+_db_stub = types.ModuleType('utils.db')
+_db_stub.db = None
+_db_stub.redis_client = DummyRedis()
+_db_stub.REDIS_URL = 'redis://127.0.0.1:6379/0'
+sys.modules.setdefault('utils.db', _db_stub)
+
+from services import market_data
+
+
+class _Patched:
+    """Set (object, attribute, value) replacements for the duration of a with block."""
+
+    def __init__(self, *replacements):
+        self.replacements = replacements
+        self.saved = []
+
+    def __enter__(self):
+        for target, attr, value in self.replacements:
+            self.saved.append((target, attr, getattr(target, attr)))
+            setattr(target, attr, value)
+
+    def __exit__(self, *exc):
+        for target, attr, value in reversed(self.saved):
+            setattr(target, attr, value)
+
+
+def _failing_ticker(*args, **kwargs):
+    raise ConnectionError('yfinance is down')
+
+
+def test_database_fallback_is_not_tradable():
+    """With every provider down the week-old persisted snapshot is shown, never traded at."""
+    week_old = (datetime.now(timezone.utc) - timedelta(days=7)).isoformat()
+    snapshot = {'open': 90.0, 'high': 91.0, 'low': 89.0, 'prev_close': 90.0, 'close': 90.5,
+                'source': 'finnhub', 'as_of': week_old}
+    failing_yf = types.SimpleNamespace(Ticker=_failing_ticker)
+    with _Patched((market_data, 'acquire_api_key', lambda *args: None),
+                  (market_data, 'yf', failing_yf),
+                  (market_data.quote_store, 'read', lambda symbol: snapshot)):
+        quote = market_data.fetch_stock_data('TRDQ', allow_stale=False)
+        assert quote['source'] == 'database_cache'
+        assert quote['close'] == 90.5
+        assert market_data.fetch_trade_quote('TRDQ') is None
+
+
+def test_only_fresh_quotes_are_tradable():
+    fresh = {'symbol': 'TRDQ', 'close': 101.0, 'source': 'finnhub', 'stale': False}
+    for quote, tradable in (
+        (fresh, True),
+        (dict(fresh, stale=True), False),
+        (dict(fresh, source='database_cache'), False),
+        ({'symbol': 'TRDQ', 'error': 'Unable to fetch price data for TRDQ', 'close': 0,
+          'source': 'error', 'stale': False}, False),
+    ):
+        with _Patched((market_data, 'fetch_stock_data', lambda symbol, allow_stale=None, quote=quote: quote)):
+            assert (market_data.fetch_trade_quote('TRDQ') is not None) == tradable
+
+
+if __name__ == "__main__":
+    test_database_fallback_is_not_tradable()
+    test_only_fresh_quotes_are_tradable()
+    print("✅ trade quote tests passed")